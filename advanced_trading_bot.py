@@ -1,143 +1,506 @@
+import asyncio
+import os
+import queue
+import signal
 import time
-import requests
-import pandas as pd
-import numpy as np
 import logging
-from binance.client import Client
-from ta.momentum import RSIIndicator, StochasticOscillator
-from ta.trend import EMAIndicator, MACD, ADXIndicator
-from ta.volatility import BollingerBands
-from ta.volume import VolumeWeightedAveragePrice
 from datetime import datetime, timedelta
 from config_secure import *
+from market_data import fetch_klines_concurrently
+from http_client import WeightGovernor, kline_weight, pooled_session, use_shared_pool
+from kline_cache import INTERVAL_MS, KlineCache
+from candle_archive import CandleArchive
+from telegram_dispatcher import TelegramDispatcher
+from subscribers import Broadcaster
+from incremental_indicators import IndicatorEngine, RecentValues
+from metrics import MetricsRegistry, start_metrics_server
+from timeframes import MultiTimeframe, is_bullish
+from universe import UniverseScanner
+from state_store import StateStore
+from scheduler import CandleScheduler
+import batch_indicators
+from signal_conditions import LazyIndicators, evaluate_conditions
+from snapshot import read_snapshot, write_snapshot
+from outcome_tracker import CLOSING_EVENTS, OutcomeTracker
+from order_book import OrderBookService
+from log_setup import setup_logging
+
+
+def configure_logging(worker_id=None):
+    """Logging por cola con rotación; cada worker del clúster escribe en su propio archivo"""
+    log_file = None
+    if SAVE_LOGS_TO_FILE:
+        base, extension = os.path.splitext(LOG_FILE)
+        log_file = f"{base}.{worker_id}{extension}" if worker_id else LOG_FILE
+    return setup_logging(
+        LOG_LEVEL, log_file,
+        json_lines=LOG_JSON,
+        max_bytes=LOG_MAX_BYTES,
+        backup_count=LOG_BACKUP_COUNT,
+        when=LOG_ROTATE_WHEN or None,
+        compress=LOG_COMPRESS
+    )
+
 
 # Configurar logging
-logging.basicConfig(
-    level=getattr(logging, LOG_LEVEL),
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.StreamHandler(),
-        logging.FileHandler(LOG_FILE) if SAVE_LOGS_TO_FILE else logging.NullHandler()
-    ]
-)
+configure_logging()
 logger = logging.getLogger(__name__)
 
+
+def _create_client():
+    # python-binance tarda en importarse: solo se carga si se usa la API síncrona
+    from binance.client import Client
+    return Client(BINANCE_API_KEY, BINANCE_API_SECRET)
+
+
+def _raise_keyboard_interrupt(signum, frame):
+    raise KeyboardInterrupt
+
 class AdvancedTradingBot:
-    def __init__(self):
-        self.client = Client(BINANCE_API_KEY, BINANCE_API_SECRET)
+    def __init__(self, cluster=None, worker_id=None, clock=time.time):
+        # Reloj (segundos UTC) de toda la lógica de velas y cooldowns; el replay usa uno virtual
+        self.clock = clock
+        # En modo clúster el coordinador reparte los símbolos y aplica el cooldown global
+        self.cluster = cluster
+        self.worker_id = worker_id
+        self.assigned_symbols = []
+        self._client = None
         self.alerted_symbols = set()
         self.last_signals = {}
+        # Resultados de entrega que llegan del hilo de Telegram; se aplican en el hilo principal
+        self._deliveries = queue.Queue()
+        self.kline_cache = KlineCache(capacity=KLINE_CACHE_SIZE, float32=KLINE_FLOAT32)
+        self.archive = CandleArchive(ARCHIVE_DIR) if ARCHIVE_ENABLED else None
+        self.metrics = MetricsRegistry()
+        self.governor = WeightGovernor(BINANCE_WEIGHT_LIMIT, headroom=BINANCE_WEIGHT_HEADROOM,
+                                       metrics=self.metrics)
+        self.metrics.gauge_callback('rest_weight_available', self.governor.available)
+        self.telegram = TelegramDispatcher(
+            TELEGRAM_TOKEN, CHAT_ID, MESSAGE_FORMAT,
+            base_url=TELEGRAM_API_URL,
+            timeout=REQUEST_TIMEOUT,
+            max_retries=TELEGRAM_MAX_RETRIES,
+            metrics=self.metrics,
+            session=pooled_session(),
+            workers=TELEGRAM_WORKERS,
+            global_rate=TELEGRAM_GLOBAL_RATE,
+            chat_interval=TELEGRAM_CHAT_INTERVAL,
+            group_interval=TELEGRAM_GROUP_INTERVAL
+        )
+        self.metrics.gauge_callback('telegram_queue_depth', self.telegram.pending)
+        # Señales y resultados van a los suscriptores; inicio y errores solo a CHAT_ID
+        self.broadcaster = Broadcaster(self.telegram, SUBSCRIBERS_FILE, CHAT_ID, DIGEST_WINDOW)
+        self.metrics.gauge_callback('subscribers', lambda: len(self.broadcaster.subscribers))
+        self.indicator_engine = IndicatorEngine(
+            rsi_period=RSI_PERIOD, ema_fast=EMA_FAST, ema_slow=EMA_SLOW, ema_signal=EMA_SIGNAL,
+            bb_period=BB_PERIOD, bb_std=BB_STD, adx_period=ADX_PERIOD,
+            stoch_k=STOCH_K, stoch_d=STOCH_D
+        )
+        self.timeframes = MultiTimeframe(
+            INTERVAL, HIGHER_TIMEFRAMES,
+            rsi_period=RSI_PERIOD, ema_fast=EMA_FAST, ema_slow=EMA_SLOW, ema_signal=EMA_SIGNAL,
+            bb_period=BB_PERIOD, bb_std=BB_STD, adx_period=ADX_PERIOD,
+            stoch_k=STOCH_K, stoch_d=STOCH_D
+        )
+        self.scanner = UniverseScanner(
+            base_url=BINANCE_API_URL,
+            timeout=REQUEST_TIMEOUT,
+            refresh_interval=SCANNER_REFRESH_INTERVAL,
+            fallback=SYMBOLS,
+            governor=self.governor,
+            quote_asset=SCANNER_QUOTE_ASSET,
+            top_n=SCANNER_TOP_N,
+            min_quote_volume=SCANNER_MIN_QUOTE_VOLUME,
+            max_spread=SCANNER_MAX_SPREAD,
+            min_price_change=SCANNER_MIN_PRICE_CHANGE,
+            max_price_change=SCANNER_MAX_PRICE_CHANGE
+        ) if SCANNER_MODE and cluster is None else None
         self.session_stats = {
             'signals_sent': 0,
             'errors': 0,
             'start_time': datetime.now()
         }
+        self.scheduler = CandleScheduler(
+            INTERVAL, CHECK_INTERVAL,
+            offset=SCHEDULER_OFFSET,
+            stagger=SCHEDULER_STAGGER,
+            batches=SCHEDULER_BATCHES,
+            clock=clock
+        )
+        # open_time de la última vela cerrada ya analizada de cada símbolo
+        self.evaluated = {}
+        # Niveles SL/TP de las señales enviadas y hasta dónde se comprobó cada símbolo (ms)
+        self.outcomes = OutcomeTracker(OUTCOME_MAX_AGE) if OUTCOME_TRACKING else None
+        self._outcomes_checked = {}
+        if self.outcomes is not None:
+            self.metrics.gauge_callback('open_signals', self.outcomes.open_count)
+        # Libros de órdenes locales (se arrancan con start_order_books)
+        self.order_books = None
+        # Nivel de los logs por símbolo: baja a DEBUG con muchos símbolos activos
+        self._detail_level = logging.INFO
+        self._symbol_count = 0
+        # Símbolos con series propias en las métricas (etiqueta symbol)
+        self._metric_symbols = frozenset()
+        self.state = StateStore(STATE_DB) if STATE_DB else None
+        if self.state is not None:
+            self._restore_state()
+        self._snapshot_saved = time.monotonic()
+        self.restore_snapshot()
         
         # Validar configuración
         self._validate_config()
         
     def _validate_config(self):
         """Valida la configuración del bot"""
-        if len(SYMBOLS) > 10:
-            logger.warning("⚠️  Monitoreando más de 10 símbolos puede afectar el rendimiento")
-        
         if CHECK_INTERVAL < 60:
             logger.warning("⚠️  Intervalos muy cortos pueden causar rate limiting")
             
-        logger.info(f"✅ Bot configurado para {len(SYMBOLS)} símbolos")
+        if SCANNER_MODE:
+            logger.info(f"✅ Bot configurado en modo escáner (top {SCANNER_TOP_N} pares {SCANNER_QUOTE_ASSET})")
+        else:
+            logger.info(f"✅ Bot configurado para {len(SYMBOLS)} símbolos")
+        
+        if self.archive is None:
+            # Sin archivo local solo se agregan las velas de la primera descarga
+            base_step = INTERVAL_MS[INTERVAL]
+            for interval in self.timeframes.intervals:
+                needed = (self.timeframes.min_candles + 1) * INTERVAL_MS[interval] // base_step
+                if needed > KLINE_CACHE_SIZE:
+                    hours = (needed - KLINE_CACHE_SIZE) * base_step / 3_600_000
+                    logger.warning(f"⚠️  {interval} necesita {needed} velas de {INTERVAL} y la caché descarga "
+                                   f"{KLINE_CACHE_SIZE}: no confirmará tendencia hasta dentro de ~{hours:.0f}h "
+                                   f"(ARCHIVE_ENABLED=true lo precarga)")
     
-    def send_telegram_message(self, text):
-        """Envía mensaje a Telegram con manejo de errores mejorado"""
-        url = f"https://api.telegram.org/bot{TELEGRAM_TOKEN}/sendMessage"
-        payload = {
-            "chat_id": CHAT_ID, 
-            "text": text, 
-            "parse_mode": MESSAGE_FORMAT
+    def _now_ms(self):
+        return int(self.clock() * 1000)
+    
+    @property
+    def client(self):
+        """Cliente de python-binance, creado la primera vez que se usa"""
+        if self._client is None:
+            self._client = _create_client()
+            use_shared_pool(self._client.session)
+        return self._client
+    
+    def _snapshot_path(self):
+        # Cada worker del clúster guarda su propia instantánea
+        if self.worker_id is None:
+            return SNAPSHOT_FILE
+        root, extension = os.path.splitext(SNAPSHOT_FILE)
+        return f"{root}-{self.worker_id}{extension}"
+    
+    def _snapshot_fingerprint(self):
+        return {
+            'interval': INTERVAL,
+            'kline_cache_size': KLINE_CACHE_SIZE,
+            'kline_float32': KLINE_FLOAT32,
+            'indicators': self.indicator_engine.params,
+            'higher_timeframes': list(self.timeframes.intervals),
         }
-        
+    
+    def save_snapshot(self):
+        """Guarda velas e indicadores en memoria para el próximo arranque"""
+        if not SNAPSHOT_FILE:
+            return
+        self._snapshot_saved = time.monotonic()
         try:
-            response = requests.post(url, json=payload, timeout=10)
-            if response.status_code == 200:
-                return True
-            else:
-                logger.error(f"Error Telegram API: {response.status_code}")
-                return False
+            with self.metrics.timer('phase_seconds', phase='snapshot'):
+                size = write_snapshot(self._snapshot_path(), self._snapshot_fingerprint(), {
+                    'kline_cache': self.kline_cache,
+                    'indicator_engine': self.indicator_engine,
+                    'timeframes': self.timeframes,
+                    'evaluated': self.evaluated,
+                })
+            logger.info(f"💾 Instantánea guardada ({size / 1e6:.1f} MB)")
         except Exception as e:
-            logger.error(f"Error enviando mensaje: {e}")
+            logger.warning(f"No se pudo guardar la instantánea: {e}")
+    
+    def restore_snapshot(self):
+        """Recupera la instantánea del último apagado; el primer ciclo solo completa las velas"""
+        if not SNAPSHOT_FILE:
+            return False
+        max_age = KLINE_CACHE_SIZE * INTERVAL_MS[INTERVAL] / 1000
+        state = read_snapshot(self._snapshot_path(), self._snapshot_fingerprint(), max_age)
+        if state is None:
             return False
+        self.kline_cache = state['kline_cache']
+        self.indicator_engine = state['indicator_engine']
+        self.timeframes = state['timeframes']
+        self.evaluated = state['evaluated']
+        logger.info(f"⚡ Arranque en caliente: {len(self.kline_cache)} series de velas restauradas")
+        return True
+    
+    def _maybe_save_snapshot(self):
+        if SNAPSHOT_FILE and time.monotonic() - self._snapshot_saved >= SNAPSHOT_INTERVAL:
+            self.save_snapshot()
+    
+    def _restore_state(self):
+        """Recupera cooldowns, alertas y contadores de la ejecución anterior"""
+        try:
+            since = self.clock() - MIN_TIME_BETWEEN_SIGNALS
+            self.last_signals = {
+                symbol: datetime.fromtimestamp(sent_at)
+                for symbol, sent_at in self.state.load_cooldowns(since).items()
+            }
+            self.alerted_symbols = self.state.load_alerted()
+            for key, value in self.state.load_stats(self.worker_id).items():
+                if key in ('signals_sent', 'errors'):
+                    self.session_stats[key] = int(value)
+            if self.outcomes is not None:
+                for record in self.state.load_open_signals(self.clock() - OUTCOME_MAX_AGE):
+                    self._outcomes_checked.setdefault(record['symbol'], int(record['sent_at'] * 1000))
+                    self.outcomes.open(record['symbol'], record['sent_at'], record['price'],
+                                       record['risk'], tp1_hit=record['tp1_hit'])
+            logger.info(f"💾 Estado recuperado: {len(self.last_signals)} señales en cooldown")
+        except Exception as e:
+            logger.warning(f"No se pudo recuperar el estado de {STATE_DB}: {e}")
+    
+    def _clear_alert(self, symbol):
+        """Quita el símbolo de las alertas activas si lo estaba"""
+        if symbol in self.alerted_symbols:
+            self.alerted_symbols.discard(symbol)
+            if self.state is not None:
+                self.state.set_alerted(symbol, False)
+    
+    def _count_error(self):
+        self.session_stats['errors'] += 1
+        self.metrics.inc('errors_total')
+    
+    def active_symbols(self):
+        """Símbolos a analizar: los asignados por el coordinador, SYMBOLS o los candidatos del escáner"""
+        if self.cluster is not None:
+            try:
+                self.assigned_symbols = self.cluster.assignment(self.worker_id)
+            except Exception as e:
+                logger.error(f"Coordinador no disponible, se mantienen los símbolos asignados: {e}")
+                self._count_error()
+            return self.assigned_symbols
+        if self.scanner is None:
+            return SYMBOLS
+        with self.metrics.timer('phase_seconds', phase='universe'):
+            return self.scanner.symbols()
+    
+    def start_order_books(self):
+        """Arranca los libros de órdenes locales de los símbolos activos si ORDERBOOK_ENABLED"""
+        if not ORDERBOOK_ENABLED or self.order_books is not None:
+            return
+        self.order_books = OrderBookService(
+            self.active_symbols(),
+            max_levels=ORDERBOOK_LEVELS,
+            ws_url=BINANCE_WS_URL,
+            rest_url=BINANCE_API_URL,
+            governor=self.governor,
+            metrics=self.metrics,
+            timeout=REQUEST_TIMEOUT,
+            reconnect_delay=WS_RECONNECT_DELAY,
+            max_reconnect_delay=WS_MAX_RECONNECT_DELAY
+        ).start()
+        self.metrics.gauge_callback('orderbooks_synced', self.order_books.synced_count)
+        logger.info(f"📚 Libros de órdenes locales para {len(self.order_books.symbols)} símbolos")
+    
+    def order_book_conditions(self, symbol):
+        """Condiciones del libro de órdenes local y sus valores ({}, None si está desactivado)
+        
+        Sin libro sincronizado las condiciones cuentan como no cumplidas.
+        """
+        if self.order_books is None:
+            return {}, None
+        book = self.order_books.book(symbol)
+        imbalance = book.imbalance(ORDERBOOK_IMBALANCE_LEVELS) if book is not None else None
+        spread = book.spread() if book is not None else None
+        conditions = {
+            'bid_imbalance': imbalance is not None and imbalance >= ORDERBOOK_MIN_IMBALANCE,
+            'tight_spread': spread is not None and spread <= ORDERBOOK_MAX_SPREAD,
+        }
+        return conditions, {'imbalance': imbalance, 'spread': spread}
+    
+    def queue_telegram_message(self, text):
+        """Encola un mensaje para Telegram sin esperar a la entrega (devuelve un Future)"""
+        return self.telegram.send(text)
+    
+    def send_telegram_message(self, text):
+        """Envía mensaje a Telegram y espera el resultado de la entrega"""
+        return self.telegram.send(text).result()
+    
+    def _warm_start(self, symbol, interval):
+        """Carga en la caché las últimas velas del archivo local si aún no hay datos"""
+        if self.archive is None or self.kline_cache.get(symbol, interval) is not None:
+            return
+        try:
+            # Historia suficiente para que los intervalos mayores estén listos desde el inicio
+            warmup_start = self.timeframes.warmup_start(self._now_ms())
+            if warmup_start is not None and interval == INTERVAL:
+                self.timeframes.update(symbol, self.archive.read(symbol, interval, warmup_start), self._now_ms())
+            klines = self.archive.tail_klines(symbol, interval, KLINE_CACHE_SIZE)
+            if klines:
+                self.kline_cache.update(symbol, interval, klines)
+        except Exception as e:
+            logger.warning(f"No se pudo leer el archivo local de {symbol}: {e}")
+    
+    def _store_klines(self, symbol, interval, klines):
+        """Actualiza la caché y guarda en el archivo local las velas cerradas"""
+        df = self.kline_cache.update(symbol, interval, klines)
+        if interval == INTERVAL:
+            self.timeframes.update(symbol, df, self._now_ms())
+        if self.archive is not None:
+            try:
+                self.archive.append(symbol, interval, klines)
+            except Exception as e:
+                logger.warning(f"No se pudo guardar velas de {symbol} en el archivo local: {e}")
+        return df
     
-    def get_klines(self, symbol, interval, limit=200):
+    def get_klines(self, symbol, interval, limit=KLINE_CACHE_SIZE):
         """Obtiene datos de velas con manejo de errores mejorado"""
         try:
-            klines = self.client.get_klines(symbol=symbol, interval=interval, limit=limit)
-            df = pd.DataFrame(klines, columns=[
-                "open_time","open","high","low","close","volume",
-                "close_time","quote_asset_volume","number_of_trades",
-                "taker_buy_base","taker_buy_quote","ignore"
-            ])
-            
-            # Convertir tipos de datos
-            numeric_columns = ["open","high","low","close","volume","quote_asset_volume"]
-            for col in numeric_columns:
-                df[col] = df[col].astype(float)
-            
-            # Convertir timestamps
-            df["open_time"] = pd.to_datetime(df["open_time"], unit='ms')
-            df["close_time"] = pd.to_datetime(df["close_time"], unit='ms')
-            
-            return df
+            self._warm_start(symbol, interval)
+            now_ms = self._now_ms()
+            start_time = self.kline_cache.start_time(symbol, interval, now_ms)
+            limit = self.kline_cache.fetch_limit(symbol, interval, limit, now_ms)
+            self.governor.acquire(kline_weight(limit))
+            from binance.exceptions import BinanceAPIException
+            try:
+                with self.metrics.timer('rest_latency_seconds', symbol=symbol):
+                    if start_time is None:
+                        klines = self.client.get_klines(symbol=symbol, interval=interval, limit=limit)
+                    else:
+                        klines = self.client.get_klines(symbol=symbol, interval=interval,
+                                                        limit=limit, startTime=start_time)
+            except BinanceAPIException as e:
+                self.governor.observe(e.status_code, e.response.headers)
+                raise
+            response = getattr(self.client, 'response', None)
+            if response is not None:
+                self.governor.observe(response.status_code, response.headers)
+            return self._store_klines(symbol, interval, klines)
         except Exception as e:
             logger.error(f"Error obteniendo datos para {symbol}: {e}")
-            self.session_stats['errors'] += 1
+            self._count_error()
             return None
     
-    def calculate_indicators(self, df):
-        """Calcula todos los indicadores técnicos con validación"""
+    def fetch_all_klines(self, symbols, interval, limit=KLINE_CACHE_SIZE):
+        """Descarga en paralelo las velas de todos los símbolos"""
+        # Solo se piden las velas nuevas de los símbolos ya en caché
+        start_times = {}
+        limits = {}
+        now_ms = self._now_ms()
+        for symbol in symbols:
+            self._warm_start(symbol, interval)
+            start_time = self.kline_cache.start_time(symbol, interval, now_ms)
+            if start_time is not None:
+                start_times[symbol] = start_time
+                limits[symbol] = self.kline_cache.fetch_limit(symbol, interval, limit, now_ms)
+        
+        results = fetch_klines_concurrently(
+            symbols, interval,
+            limit=limit,
+            limits=limits,
+            governor=self.governor,
+            max_concurrency=MAX_CONCURRENT_REQUESTS,
+            base_url=BINANCE_API_URL,
+            timeout=REQUEST_TIMEOUT,
+            start_times=start_times,
+            metrics=self.metrics
+        )
+        
+        frames = {}
+        for symbol, klines in results.items():
+            if isinstance(klines, Exception):
+                logger.error(f"Error obteniendo datos para {symbol}: {klines}")
+                self._count_error()
+                frames[symbol] = None
+                continue
+            try:
+                frames[symbol] = self._store_klines(symbol, interval, klines)
+            except Exception as e:
+                logger.error(f"Error procesando velas de {symbol}: {e}")
+                self._count_error()
+                frames[symbol] = None
+        return frames
+    
+    def calculate_indicators(self, df, lazy=False):
+        """Calcula todos los indicadores técnicos con validación
+        
+        Con lazy=True cada indicador se calcula la primera vez que se lee,
+        así que check_long_signal solo paga por los que llega a usar.
+        """
         try:
             if len(df) < max(RSI_PERIOD, BB_PERIOD, ADX_PERIOD, STOCH_K) + 10:
                 logger.warning("Datos insuficientes para calcular indicadores")
                 return None
-                
-            indicators = {}
-            
-            # RSI
-            indicators['rsi'] = RSIIndicator(df["close"], window=RSI_PERIOD).rsi()
-            
-            # EMAs
-            indicators['ema_fast'] = EMAIndicator(df["close"], window=EMA_FAST).ema_indicator()
-            indicators['ema_slow'] = EMAIndicator(df["close"], window=EMA_SLOW).ema_indicator()
-            
-            # MACD
-            macd = MACD(df["close"], window_slow=EMA_SLOW, window_fast=EMA_FAST, window_sign=EMA_SIGNAL)
-            indicators['macd'] = macd.macd()
-            indicators['macd_signal'] = macd.macd_signal()
-            indicators['macd_histogram'] = macd.macd_diff()
-            
-            # Bollinger Bands
-            bb = BollingerBands(df["close"], window=BB_PERIOD, window_dev=BB_STD)
-            indicators['bb_upper'] = bb.bollinger_hband()
-            indicators['bb_middle'] = bb.bollinger_mavg()
-            indicators['bb_lower'] = bb.bollinger_lband()
-            indicators['bb_width'] = (indicators['bb_upper'] - indicators['bb_lower']) / indicators['bb_middle']
-            
-            # ADX
-            indicators['adx'] = ADXIndicator(df["high"], df["low"], df["close"], window=ADX_PERIOD).adx()
             
-            # Stochastic
-            stoch = StochasticOscillator(df["high"], df["low"], df["close"], window=STOCH_K, smooth_window=STOCH_D)
-            indicators['stoch_k'] = stoch.stoch()
-            indicators['stoch_d'] = stoch.stoch_signal()
-            
-            # Volumen - usar SMA simple de pandas
-            indicators['volume_sma'] = df["volume"].rolling(window=20).mean()
+            indicators = LazyIndicators(
+                df, rsi_period=RSI_PERIOD, ema_fast=EMA_FAST, ema_slow=EMA_SLOW, ema_signal=EMA_SIGNAL,
+                bb_period=BB_PERIOD, bb_std=BB_STD, adx_period=ADX_PERIOD,
+                stoch_k=STOCH_K, stoch_d=STOCH_D
+            )
+            return indicators if lazy else dict(indicators)
+        except Exception as e:
+            logger.error(f"Error calculando indicadores: {e}")
+            return None
+    
+    def calculate_indicators_incremental(self, symbol, df):
+        """Calcula los indicadores actualizando solo con las velas nuevas"""
+        try:
+            if len(df) < max(RSI_PERIOD, BB_PERIOD, ADX_PERIOD, STOCH_K) + 10:
+                logger.warning("Datos insuficientes para calcular indicadores")
+                return None
             
-            return indicators
+            return self.indicator_engine.update(symbol, df)
         except Exception as e:
             logger.error(f"Error calculando indicadores: {e}")
+            self.indicator_engine.reset(symbol)
             return None
     
-    def analyze_trend_strength(self, indicators):
-        """Analiza la fuerza de la tendencia con puntuación"""
+    def screen_symbols(self, frames):
+        """Calcula indicadores y condiciones de todos los símbolos en bloque
+        
+        Devuelve {símbolo: (condiciones cumplidas, indicadores)} con los
+        indicadores en el mismo formato que calculate_indicators.
+        """
+        import numpy as np
+        min_length = max(RSI_PERIOD, BB_PERIOD, ADX_PERIOD, STOCH_K) + 10
+        
+        # Agrupar por longitud para apilar en matrices del mismo tamaño
+        groups = {}
+        for symbol, df in frames.items():
+            if df is not None and len(df) >= max(min_length, 50):
+                groups.setdefault(len(df), []).append(symbol)
+        
+        results = {}
+        for symbols in groups.values():
+            def stack(column):
+                return np.vstack([np.asarray(frames[symbol][column], dtype=float) for symbol in symbols])
+            
+            close = stack("close")
+            volume = stack("volume")
+            indicators = batch_indicators.compute_indicators(
+                stack("high"), stack("low"), close, volume,
+                rsi_period=RSI_PERIOD, ema_fast=EMA_FAST, ema_slow=EMA_SLOW,
+                ema_signal=EMA_SIGNAL, bb_period=BB_PERIOD, bb_std=BB_STD,
+                adx_period=ADX_PERIOD, stoch_k=STOCH_K, stoch_d=STOCH_D
+            )
+            conditions = batch_indicators.evaluate_long_conditions(
+                indicators, close, volume,
+                rsi_oversold=RSI_OVERSOLD,
+                adx_threshold=ADX_TREND_THRESHOLD,
+                volume_multiplier=VOLUME_MULTIPLIER,
+                trend_bonus=[self.timeframes.bullish_count(symbol) for symbol in symbols]
+            )
+            conditions_met = conditions.sum(axis=1)
+            
+            for row, symbol in enumerate(symbols):
+                results[symbol] = (
+                    int(conditions_met[row]),
+                    {name: RecentValues(values[row]) for name, values in indicators.items()}
+                )
+        return results
+    
+    def analyze_trend_strength(self, indicators, higher_timeframes=None):
+        """Analiza la fuerza de la tendencia con puntuación
+        
+        higher_timeframes ({intervalo: indicadores}) añade una condición por
+        intervalo mayor: tendencia alcista (EMAs y MACD) en ese intervalo.
+        """
         try:
             # ADX para fuerza de tendencia
             adx_strong = indicators['adx'].iloc[-1] > ADX_TREND_THRESHOLD
@@ -150,6 +513,12 @@ class AdvancedTradingBot:
             ema_bullish = indicators['ema_fast'].iloc[-1] > indicators['ema_slow'].iloc[-1]
             ema_separation = (indicators['ema_fast'].iloc[-1] - indicators['ema_slow'].iloc[-1]) / indicators['ema_slow'].iloc[-1]
             
+            # Confirmación en intervalos mayores
+            higher_trend = {
+                interval: is_bullish(values)
+                for interval, values in (higher_timeframes or {}).items()
+            }
+            
             # Puntuación de tendencia
             trend_score = sum([
                 adx_strong,
@@ -157,7 +526,7 @@ class AdvancedTradingBot:
                 macd_increasing,
                 ema_bullish,
                 ema_separation > 0.01  # EMAs separadas al menos 1%
-            ])
+            ]) + sum(higher_trend.values())
             
             return {
                 'adx_strong': adx_strong,
@@ -165,7 +534,9 @@ class AdvancedTradingBot:
                 'macd_increasing': macd_increasing,
                 'ema_bullish': ema_bullish,
                 'ema_separation': ema_separation,
+                'higher_timeframes': higher_trend,
                 'trend_score': trend_score,
+                'max_score': 5 + len(higher_trend),
                 'trend_strength': 'FUERTE' if trend_score >= 4 else 'MODERADA' if trend_score >= 2 else 'DÉBIL'
             }
         except Exception as e:
@@ -176,38 +547,48 @@ class AdvancedTradingBot:
         """Verifica señales LONG con análisis avanzado"""
         try:
             # Valores actuales
-            current_price = df["close"].iloc[-1]
-            current_volume = df["volume"].iloc[-1]
-            avg_volume = indicators['volume_sma'].iloc[-1]
+            current_price = float(df["close"][-1])
+            current_volume = float(df["volume"][-1])
+            
+            # Análisis de tendencia (solo si alguna condición lo necesita)
+            trend = {}
+            def trend_analysis():
+                if not trend:
+                    trend.update(self.analyze_trend_strength(indicators, self.timeframes.indicators(symbol)))
+                return trend
+            
+            # Condiciones del libro de órdenes (ya calculadas en memoria, sin coste)
+            book_conditions, order_book = self.order_book_conditions(symbol)
+            
+            # Condiciones de entrada: primero las baratas; se abandona si ya no hay señal posible
+            conditions, complete = evaluate_conditions(
+                indicators, current_price, current_volume, trend_analysis,
+                min_conditions=MIN_CONDITIONS_FOR_SIGNAL - sum(book_conditions.values()),
+                rsi_oversold=RSI_OVERSOLD,
+                volume_multiplier=VOLUME_MULTIPLIER
+            )
+            conditions.update(book_conditions)
+            
+            # Contar condiciones cumplidas
+            conditions_met = sum(conditions.values())
+            if not complete:
+                return {
+                    'signal': False,
+                    'strength': 'DÉBIL',
+                    'conditions_met': conditions_met,
+                    'total_conditions': len(batch_indicators.CONDITION_NAMES) + len(book_conditions),
+                    'conditions': conditions,
+                    'current_price': current_price
+                }
             
             # Indicadores principales
+            avg_volume = indicators['volume_sma'].iloc[-1]
             rsi = indicators['rsi'].iloc[-1]
             bb_upper = indicators['bb_upper'].iloc[-1]
             bb_lower = indicators['bb_lower'].iloc[-1]
-            bb_middle = indicators['bb_middle'].iloc[-1]
             stoch_k = indicators['stoch_k'].iloc[-1]
             stoch_d = indicators['stoch_d'].iloc[-1]
             
-            # Análisis de tendencia
-            trend_analysis = self.analyze_trend_strength(indicators)
-            
-            # Condiciones de entrada
-            conditions = {
-                'rsi_oversold': rsi < RSI_OVERSOLD,
-                'rsi_rising': rsi > indicators['rsi'].iloc[-2],  # RSI subiendo
-                'price_above_bb_lower': current_price > bb_lower,
-                'price_near_support': current_price <= bb_middle + (bb_upper - bb_middle) * 0.3,
-                'stoch_oversold': stoch_k < 20 and stoch_d < 20,
-                'stoch_bullish_cross': stoch_k > stoch_d and indicators['stoch_k'].iloc[-2] <= indicators['stoch_d'].iloc[-2],
-                'volume_confirmation': current_volume > (avg_volume * VOLUME_MULTIPLIER),
-                'trend_support': trend_analysis['trend_score'] >= 2,
-                'macd_bullish': indicators['macd'].iloc[-1] > indicators['macd'].iloc[-2],
-                'bb_squeeze': indicators['bb_width'].iloc[-1] < indicators['bb_width'].iloc[-5]  # Bollinger se contrae
-            }
-            
-            # Contar condiciones cumplidas
-            conditions_met = sum(conditions.values())
-            
             # Determinar fuerza de señal
             if conditions_met >= STRONG_SIGNAL_CONDITIONS:
                 signal_strength = 'FUERTE'
@@ -225,8 +606,9 @@ class AdvancedTradingBot:
                 'conditions_met': conditions_met,
                 'total_conditions': len(conditions),
                 'conditions': conditions,
-                'trend_analysis': trend_analysis,
+                'trend_analysis': trend_analysis(),
                 'current_price': current_price,
+                'order_book': order_book,
                 'indicators': {
                     'rsi': rsi,
                     'stoch_k': stoch_k,
@@ -296,6 +678,19 @@ class AdvancedTradingBot:
         }
         color = color_map.get(strength, '⚪')
         
+        # Libro de órdenes local, si está activo y sincronizado
+        order_book = signal_data.get('order_book') or {}
+        book_line = ''
+        if order_book.get('imbalance') is not None:
+            book_line = (f"• Libro: desequilibrio {order_book['imbalance']:+.2f} | "
+                         f"spread {order_book['spread'] * 100:.3f}%\n")
+        
+        # Confirmación en intervalos mayores (una línea por intervalo listo)
+        higher_timeframes = ''.join(
+            f"• {interval}: {'✅' if bullish else '❌'}\n"
+            for interval, bullish in trend.get('higher_timeframes', {}).items()
+        )
+        
         message = f"""
 {emoji} <b>SEÑAL LONG {strength}</b> {color}
 <b>{symbol}</b>
@@ -309,87 +704,404 @@ class AdvancedTradingBot:
 • Posición BB: {indicators['bb_position']:.1f}%
 • Volumen: {indicators['volume_ratio']:.1f}x promedio
 • Ancho BB: {indicators['bb_width']:.3f}
-
+{book_line}
 🎯 <b>Análisis de Tendencia:</b>
-• Fuerza: {trend['trend_strength']} ({trend['trend_score']}/5)
+• Fuerza: {trend['trend_strength']} ({trend['trend_score']}/{trend.get('max_score', 5)})
 • ADX: {'✅' if trend['adx_strong'] else '❌'}
 • MACD: {'✅' if trend['macd_positive'] else '❌'}
 • EMAs: {'✅' if trend['ema_bullish'] else '❌'}
-
+{higher_timeframes}
 🛡️ <b>Gestión de Riesgo:</b>
 • Stop Loss: ${risk_levels['stop_loss']:.4f}
 • TP1 (3%): ${risk_levels['take_profit_1']:.4f}
 • TP2 (6%): ${risk_levels['take_profit_2']:.4f}
 • R/R Ratio: {risk_levels['risk_reward_1']:.1f}:1 {'✅' if risk_levels['is_good_risk_reward'] else '⚠️'}
 
-⏰ {datetime.now().strftime('%H:%M:%S')}
-📅 {datetime.now().strftime('%d/%m/%Y')}
+⏰ {datetime.fromtimestamp(self.clock()).strftime('%H:%M:%S')}
+📅 {datetime.fromtimestamp(self.clock()).strftime('%d/%m/%Y')}
 """
         return message
     
-    def check_signals(self):
-        """Función principal de análisis de señales"""
-        for symbol in SYMBOLS:
-            try:
-                logger.info(f"Analizando {symbol}...")
+    def process_symbol(self, symbol, df, indicators=None):
+        """Analiza un símbolo a partir de sus velas y envía la señal si procede"""
+        try:
+            logger.log(self._detail_level, f"Analizando {symbol}...",
+                       extra={'symbol': symbol, 'phase': 'analysis'})
+            
+            if df is None or len(df) < 50:
+                logger.warning(f"Insuficientes datos para {symbol}")
+                return
+            
+            # Calcular indicadores (salvo que ya vengan del cribado vectorizado)
+            if indicators is None:
+                with self.metrics.timer('symbol_phase_seconds', symbol=symbol, phase='indicators'):
+                    if INCREMENTAL_INDICATORS:
+                        indicators = self.calculate_indicators_incremental(symbol, df)
+                    else:
+                        indicators = self.calculate_indicators(df, lazy=True)
+                if indicators is None:
+                    return
+            
+            # Verificar señal LONG
+            with self.metrics.timer('symbol_phase_seconds', symbol=symbol, phase='conditions'):
+                signal_data = self.check_long_signal(symbol, df, indicators)
+            
+            if signal_data['signal']:
+                # Verificar tiempo mínimo entre señales
+                now = datetime.fromtimestamp(self.clock())
+                if symbol in self.last_signals:
+                    time_diff = (now - self.last_signals[symbol]).total_seconds()
+                    if time_diff < MIN_TIME_BETWEEN_SIGNALS:
+                        logger.log(self._detail_level, f"Señal para {symbol} ignorada (muy reciente)",
+                                   extra={'symbol': symbol, 'phase': 'cooldown'})
+                        return
                 
-                # Obtener datos
-                df = self.get_klines(symbol, INTERVAL)
-                if df is None or len(df) < 50:
-                    logger.warning(f"Insuficientes datos para {symbol}")
-                    continue
+                # Cooldown global: otro worker puede haberla enviado ya
+                if self.cluster is not None and not self.cluster.claim_signal(
+                        symbol, now.timestamp(), MIN_TIME_BETWEEN_SIGNALS):
+                    logger.log(self._detail_level, f"Señal para {symbol} ignorada (ya enviada por otro worker)",
+                               extra={'symbol': symbol, 'phase': 'cooldown'})
+                    return
                 
-                # Calcular indicadores
-                indicators = self.calculate_indicators(df)
-                if indicators is None:
-                    continue
+                # Calcular niveles de riesgo
+                risk_levels = self.calculate_risk_levels(
+                    signal_data['current_price'],
+                    indicators['bb_upper'].iloc[-1],
+                    indicators['bb_lower'].iloc[-1]
+                )
                 
-                # Verificar señal LONG
-                signal_data = self.check_long_signal(symbol, df, indicators)
+                # Crear y encolar mensaje; la señal cuenta para el cooldown desde ya
+                message = self.create_signal_message(symbol, signal_data, risk_levels)
+                self.alerted_symbols.add(symbol)
+                self.last_signals[symbol] = now
+                if self.state is not None:
+                    self.state.set_alerted(symbol, True)
+                    self.state.record_cooldown(symbol, now.timestamp())
                 
-                if signal_data['signal']:
-                    # Verificar tiempo mínimo entre señales
-                    now = datetime.now()
-                    if symbol in self.last_signals:
-                        time_diff = (now - self.last_signals[symbol]).total_seconds()
-                        if time_diff < MIN_TIME_BETWEEN_SIGNALS:
-                            logger.info(f"Señal para {symbol} ignorada (muy reciente)")
-                            continue
-                    
-                    # Calcular niveles de riesgo
-                    risk_levels = self.calculate_risk_levels(
-                        signal_data['current_price'],
-                        indicators['bb_upper'].iloc[-1],
-                        indicators['bb_lower'].iloc[-1]
-                    )
-                    
-                    # Crear y enviar mensaje
-                    message = self.create_signal_message(symbol, signal_data, risk_levels)
+                self.metrics.inc('signals_total', strength=signal_data['strength'])
+                summary = (f"{'🚀' if signal_data['strength'] == 'FUERTE' else '📈'} <b>{symbol}</b> "
+                           f"{signal_data['strength']} ${signal_data['current_price']:.4f} "
+                           f"({signal_data['conditions_met']}/{signal_data['total_conditions']}) · "
+                           f"SL ${risk_levels['stop_loss']:.4f} · TP1 ${risk_levels['take_profit_1']:.4f}")
+                self.broadcaster.publish(symbol, message, summary).add_done_callback(
+                    lambda future: self._deliveries.put(
+                        (symbol, signal_data, risk_levels, now, future.result()))
+                )
+            else:
+                # Remover de alertas si ya no cumple condiciones
+                self._clear_alert(symbol)
                     
-                    if self.send_telegram_message(message):
-                        logger.info(f"✅ Señal {signal_data['strength']} enviada: {symbol}")
-                        self.alerted_symbols.add(symbol)
-                        self.last_signals[symbol] = now
-                        self.session_stats['signals_sent'] += 1
-                    else:
-                        logger.error(f"❌ Error enviando señal para {symbol}")
+        except Exception as e:
+            logger.error(f"Error procesando {symbol}: {e}")
+            self._count_error()
+    
+    def process_deliveries(self):
+        """Aplica los resultados de entrega recibidos desde la última llamada"""
+        while True:
+            try:
+                delivery = self._deliveries.get_nowait()
+            except queue.Empty:
+                return
+            self._on_signal_delivered(*delivery)
+    
+    def _on_signal_delivered(self, symbol, signal_data, risk_levels, sent_at, delivered):
+        """Resultado de la entrega de una señal (en el hilo principal, desde process_deliveries)"""
+        if delivered is None:
+            # Ningún suscriptor sigue el símbolo: no es un fallo y el cooldown se mantiene
+            logger.log(self._detail_level, f"Señal para {symbol} sin suscriptores",
+                       extra={'symbol': symbol, 'phase': 'signal'})
+            return
+        
+        if self.state is not None:
+            self.state.journal_signal(symbol, sent_at.timestamp(), signal_data, risk_levels, delivered)
+        
+        if delivered:
+            logger.info(f"✅ Señal {signal_data['strength']} enviada: {symbol}",
+                        extra={'symbol': symbol, 'phase': 'signal'})
+            self.session_stats['signals_sent'] += 1
+            if self.outcomes is not None:
+                # Los niveles se comprueban con las velas desde el envío
+                self._outcomes_checked.setdefault(symbol, int(sent_at.timestamp() * 1000))
+                self.outcomes.open(symbol, sent_at.timestamp(), signal_data['current_price'], risk_levels)
+            return
+        
+        logger.error(f"❌ Error enviando señal para {symbol}")
+        # Sin entrega no hay cooldown: la señal puede volver a enviarse
+        if self.last_signals.get(symbol) == sent_at:
+            self.last_signals.pop(symbol, None)
+            self._clear_alert(symbol)
+            if self.state is not None:
+                self.state.clear_cooldown(symbol, sent_at.timestamp())
+        if self.cluster is not None:
+            try:
+                self.cluster.release_signal(symbol, sent_at.timestamp())
+            except Exception as e:
+                logger.warning(f"No se pudo liberar la señal de {symbol} en el coordinador: {e}")
+    
+    def track_outcomes(self, frames):
+        """Comprueba los SL/TP de las señales abiertas con las velas recibidas
+        
+        Se usan el máximo y el mínimo de las velas que seguían abiertas en la
+        comprobación anterior o son posteriores (resolución de vela).
+        """
+        if self.outcomes is None:
+            return
+        now_ms = self._now_ms()
+        for symbol in self.outcomes.symbols():
+            df = frames.get(symbol)
+            if df is None or not len(df):
+                continue
+            checked = self._outcomes_checked.get(symbol, now_ms)
+            start = int(df["close_time"].searchsorted(checked))
+            self._outcomes_checked[symbol] = now_ms
+            if start >= len(df):
+                continue
+            low = float(df["low"][start:].min())
+            high = float(df["high"][start:].max())
+            for outcome in self.outcomes.update(symbol, low, high, now_ms / 1000):
+                self._on_outcome(outcome)
+        for outcome in self.outcomes.expire(self.clock()):
+            self._on_outcome(outcome)
+    
+    def _on_outcome(self, outcome):
+        """Registra y notifica un TP/SL alcanzado o una señal caducada"""
+        self.metrics.inc('signal_outcomes_total', event=outcome.event)
+        if self.state is not None:
+            self.state.record_outcome(outcome)
+        if outcome.event in CLOSING_EVENTS and not self.outcomes.open_count(outcome.symbol):
+            self._outcomes_checked.pop(outcome.symbol, None)
+        
+        sent = datetime.fromtimestamp(outcome.sent_at).strftime('%d/%m %H:%M')
+        if outcome.event == 'expired':
+            logger.info(f"⌛ Señal de {outcome.symbol} ({sent}) caducada sin TP2 ni stop")
+            return
+        emoji, label = {
+            'tp1': ('🎯', 'TP1'),
+            'tp2': ('🏆', 'TP2'),
+            'sl': ('🛑', 'Stop Loss'),
+        }[outcome.event]
+        logger.info(f"{emoji} {outcome.symbol}: {label} a ${outcome.level:.4f} ({outcome.change * 100:+.2f}%)")
+        if OUTCOME_NOTIFY:
+            summary = (f"{emoji} <b>{outcome.symbol}</b> {label} ${outcome.level:.4f} "
+                       f"({outcome.change * 100:+.2f}%) · entrada {sent}")
+            self.broadcaster.publish(outcome.symbol, f"""
+{emoji} <b>{label} alcanzado</b>
+<b>{outcome.symbol}</b>
+
+💰 <b>Entrada:</b> ${outcome.entry:.4f} ({sent})
+📍 <b>{label}:</b> ${outcome.level:.4f} ({outcome.change * 100:+.2f}%)
+""", summary)
+    
+    def _split_stale(self, symbols, frames, closed_open_time):
+        """Separa los símbolos cuya vela cerrada en closed_open_time aún no llegó de Binance
+
+        Devuelve (frescos, atrasados, velas de los frescos hasta la última
+        cerrada): la vela recién abierta que devuelve Binance no se analiza.
+        """
+        now_ms = self._now_ms()
+        fresh, stale, closed = [], [], {}
+        for symbol in symbols:
+            df = frames.get(symbol)
+            if df is not None and len(df):
+                # Última vela con close_time ya pasado
+                last = int(df["close_time"].searchsorted(now_ms)) - 1
+                if last < 0 or int(df["open_time"][last]) < closed_open_time:
+                    stale.append(symbol)
+                    continue
+                self.evaluated[symbol] = closed_open_time
+                df = df[:last + 1]
+            fresh.append(symbol)
+            closed[symbol] = df
+        return fresh, stale, closed
+    
+    def _on_symbols(self, symbols):
+        """Ajusta los libros de órdenes, las métricas por símbolo y el detalle de los logs a los símbolos del ciclo"""
+        if self.order_books is not None:
+            self.order_books.set_symbols(symbols)
+        self._symbol_count = len(symbols)
+        self._detail_level = logging.INFO if len(symbols) <= LOG_SYMBOL_DETAIL_LIMIT else logging.DEBUG
+        active = frozenset(symbols)
+        if active != self._metric_symbols:
+            # Las series por símbolo se limitan a los símbolos activos
+            self.metrics.retain('symbol', active)
+            self._metric_symbols = active
+    
+    def check_signals(self, symbols=None, closed_open_time=None):
+        """Función principal de análisis de señales
+        
+        Con closed_open_time (modo alineado al cierre de vela) solo se
+        analizan los símbolos que ya tienen esa vela cerrada; se devuelven
+        los que aún no la tienen para reintentarlos.
+        """
+        if symbols is None:
+            symbols = self.active_symbols()
+            self._on_symbols(symbols)
+        self.process_deliveries()
+        self.broadcaster.reload()
+        
+        # Obtener datos de todos los símbolos en paralelo
+        try:
+            with self.metrics.timer('phase_seconds', phase='fetch'):
+                frames = self.fetch_all_klines(symbols, INTERVAL)
+        except Exception as e:
+            logger.error(f"Error en la descarga concurrente de velas: {e}")
+            self._count_error()
+            return []
+        
+        self.track_outcomes(frames)
+        
+        stale = []
+        if closed_open_time is not None:
+            symbols, stale, frames = self._split_stale(symbols, frames, closed_open_time)
+            if stale:
+                self.metrics.inc('symbols_skipped_total', len(stale), reason='stale')
+        
+        if not BATCH_INDICATORS:
+            with self.metrics.timer('phase_seconds', phase='analysis'):
+                for symbol in symbols:
+                    self.process_symbol(symbol, frames.get(symbol))
+            return stale
+        
+        # Cribado vectorizado: solo los candidatos pasan al análisis completo
+        try:
+            with self.metrics.timer('phase_seconds', phase='screen'):
+                screened = self.screen_symbols(frames)
+        except Exception as e:
+            logger.error(f"Error en el cálculo vectorizado de indicadores: {e}")
+            self._count_error()
+            return stale
+        
+        with self.metrics.timer('phase_seconds', phase='analysis'):
+            for symbol in symbols:
+                if symbol not in screened:
+                    logger.warning(f"Insuficientes datos para {symbol}")
+                    continue
+                conditions_met, indicators = screened[symbol]
+                if self.order_books is not None:
+                    conditions_met += sum(self.order_book_conditions(symbol)[0].values())
+                if conditions_met >= MIN_CONDITIONS_FOR_SIGNAL:
+                    self.process_symbol(symbol, frames[symbol], indicators)
                 else:
                     # Remover de alertas si ya no cumple condiciones
-                    if symbol in self.alerted_symbols:
-                        self.alerted_symbols.discard(symbol)
-                        
-            except Exception as e:
-                logger.error(f"Error procesando {symbol}: {e}")
-                self.session_stats['errors'] += 1
+                    self._clear_alert(symbol)
+        return stale
+    
+    def _record_cycle(self, elapsed, budget):
+        # Un resumen por chat con las señales de todo el ciclo
+        self.broadcaster.flush()
+        self.process_deliveries()
+        self.metrics.observe('cycle_seconds', elapsed)
+        logger.info(f"🔁 Ciclo completado: {self._symbol_count} símbolos en {elapsed:.2f}s",
+                    extra={'phase': 'cycle', 'duration': round(elapsed, 3)})
+        if elapsed > budget:
+            self.metrics.inc('cycle_overruns_total')
+            logger.warning(f"⚠️  El ciclo tardó {elapsed:.1f}s (más que los {budget:.0f}s disponibles)")
+        if self.state is not None:
+            self.state.save_stats(self.session_stats, self.worker_id)
+        self._maybe_save_snapshot()
+    
+    def run_cycle(self):
+        """Ejecuta check_signals y registra su duración y si excede CHECK_INTERVAL"""
+        started = time.perf_counter()
+        self.check_signals()
+        elapsed = time.perf_counter() - started
+        self._record_cycle(elapsed, CHECK_INTERVAL)
+        return elapsed
+    
+    def run_aligned_cycle(self):
+        """Espera al próximo cierre de vela y analiza cada símbolo una vez por vela cerrada"""
+        scheduler = self.scheduler
+        boundary = scheduler.wait()
+        closed_open_time = scheduler.closed_open_time(boundary)
+        started = time.perf_counter()
+        
+        symbols = self.active_symbols()
+        self._on_symbols(symbols)
+        due = [symbol for symbol in symbols if self.evaluated.get(symbol) != closed_open_time]
+        if len(due) < len(symbols):
+            self.metrics.inc('symbols_skipped_total', len(symbols) - len(due), reason='unchanged')
+        
+        stale = []
+        for moment, batch in scheduler.slots(due, boundary):
+            scheduler.sleep_until(moment)
+            stale += self.check_signals(batch, closed_open_time)
+        if stale:
+            # Binance publica la vela cerrada con algo de retraso en algunos pares
+            scheduler.sleep_until(scheduler.now() + SCHEDULER_RETRY_DELAY)
+            stale = self.check_signals(stale, closed_open_time)
+            if stale:
+                logger.warning(f"⚠️  Sin la vela cerrada de {len(stale)} símbolos, se analizarán en el próximo cierre")
+        
+        elapsed = time.perf_counter() - started
+        self.metrics.set_gauge('candles_missed', scheduler.missed)
+        self._record_cycle(elapsed, scheduler.period)
+        return elapsed
+    
+    def on_closed_kline(self, symbol, kline):
+        """Evalúa el símbolo en cuanto el stream notifica el cierre de una vela"""
+        self.process_deliveries()
+        try:
+            df = self._store_klines(symbol, INTERVAL, [kline])
+        except Exception as e:
+            logger.error(f"Error actualizando velas de {symbol}: {e}")
+            self._count_error()
+            return
+        self.track_outcomes({symbol: df})
+        self.evaluated[symbol] = int(kline[0])
+        with self.metrics.timer('phase_seconds', phase='analysis'):
+            self.process_symbol(symbol, df)
+        self._maybe_save_snapshot()
+    
+    def backfill_klines(self, symbols):
+        """Rellena por REST las velas perdidas al (re)conectar el stream
+        
+        De las velas cerradas sin stream solo se analiza la última de cada
+        símbolo (si no se analizó ya): una señal de una vela anterior llegaría
+        tarde. Las demás sí actualizan la caché, los indicadores y los TP/SL.
+        """
+        try:
+            frames = self.fetch_all_klines(symbols, INTERVAL)
+        except Exception as e:
+            logger.error(f"Error rellenando velas por REST: {e}")
+            self._count_error()
+            return
+        self.process_deliveries()
+        self.track_outcomes(frames)
+        
+        now_ms = self._now_ms()
+        with self.metrics.timer('phase_seconds', phase='analysis'):
+            for symbol, df in frames.items():
+                if df is None or not len(df):
+                    continue
+                # Última vela con close_time ya pasado; la vela en curso no se analiza
+                last = int(df["close_time"].searchsorted(now_ms)) - 1
+                if last < 0 or int(df["open_time"][last]) == self.evaluated.get(symbol):
+                    continue
+                self.evaluated[symbol] = int(df["open_time"][last])
+                self.process_symbol(symbol, df[:last + 1])
+    
+    async def follow_universe(self, stream, period):
+        """Renueva la suscripción del stream cuando cambian los símbolos activos (escáner o coordinador)"""
+        while True:
+            await asyncio.sleep(period)
+            symbols = await asyncio.to_thread(self.active_symbols)
+            if set(symbols) != set(stream.symbols):
+                logger.info(f"🔁 Símbolos activos actualizados ({len(symbols)}), renovando el stream")
+                self._on_symbols(symbols)
+                stream.set_symbols(symbols)
     
     def send_startup_notification(self):
         """Envía notificación de inicio del bot"""
         if SEND_STARTUP_NOTIFICATION:
+            if SCANNER_MODE:
+                symbols_text = f"escáner top {SCANNER_TOP_N} pares {SCANNER_QUOTE_ASSET}"
+            else:
+                symbols_text = f"{len(SYMBOLS)} ({', '.join(SYMBOLS[:3])}{'...' if len(SYMBOLS) > 3 else ''})"
             message = f"""
 🤖 <b>Bot de Trading Iniciado</b>
 
 📊 <b>Configuración:</b>
-• Símbolos: {len(SYMBOLS)} ({', '.join(SYMBOLS[:3])}{'...' if len(SYMBOLS) > 3 else ''})
+• Símbolos: {symbols_text}
 • Timeframe: {INTERVAL}
 • Verificación: cada {CHECK_INTERVAL}s
 
@@ -401,7 +1113,32 @@ class AdvancedTradingBot:
 
 ⏰ {datetime.now().strftime('%H:%M:%S - %d/%m/%Y')}
 """
-            self.send_telegram_message(message)
+            self.queue_telegram_message(message)
+    
+    def metrics_summary(self):
+        """Resumen de tiempos por fase y contadores para las notificaciones"""
+        lines = []
+        for label, name, phase in (
+            ('Ciclo', 'cycle_seconds', None),
+            ('Descarga', 'phase_seconds', 'fetch'),
+            ('Cribado', 'phase_seconds', 'screen'),
+            ('Análisis', 'phase_seconds', 'analysis'),
+            ('REST', 'rest_latency_seconds', None),
+            ('Telegram', 'telegram_send_seconds', None),
+        ):
+            count, total, worst = self.metrics.histogram_totals(name, phase=phase)
+            if count:
+                lines.append(f"• {label}: media {total / count * 1000:.0f}ms | máx {worst * 1000:.0f}ms ({count})")
+        lines.append(f"• Peso API usado: {self.metrics.value('rest_used_weight')}")
+        lines.append(f"• Cola Telegram: {self.telegram.pending()} | suscriptores: {len(self.broadcaster.subscribers)}")
+        lines.append(f"• Ciclos excedidos: {self.metrics.value('cycle_overruns_total')}")
+        lines.append(f"• Cierres de vela sin analizar: {self.scheduler.missed}")
+        if self.outcomes is not None:
+            counts = {event: self.metrics.value('signal_outcomes_total', event=event)
+                      for event in ('tp1', 'tp2', 'sl', 'expired')}
+            lines.append(f"• Resultados: TP1 {counts['tp1']} | TP2 {counts['tp2']} | SL {counts['sl']} | "
+                         f"caducadas {counts['expired']} | abiertas {self.outcomes.open_count()}")
+        return "\n".join(lines)
     
     def send_error_notification(self, error_msg):
         """Envía notificación de error"""
@@ -416,31 +1153,96 @@ class AdvancedTradingBot:
 • Señales enviadas: {self.session_stats['signals_sent']}
 • Errores: {self.session_stats['errors']}
 • Tiempo activo: {datetime.now() - self.session_stats['start_time']}
+
+⏱️ <b>Rendimiento:</b>
+{self.metrics_summary()}
 """
-            self.send_telegram_message(message)
+            self.queue_telegram_message(message)
+    
+    def run_streaming(self):
+        """Evalúa señales al cierre de cada vela vía WebSocket"""
+        from streaming import KlineStream
+        symbols = self.active_symbols()
+        self._on_symbols(symbols)
+        stream = KlineStream(
+            symbols, INTERVAL,
+            on_closed_kline=self.on_closed_kline,
+            on_connect=self.backfill_klines,
+            base_url=BINANCE_WS_URL,
+            reconnect_delay=WS_RECONNECT_DELAY,
+            max_reconnect_delay=WS_MAX_RECONNECT_DELAY
+        )
+        
+        async def stream_and_follow():
+            follower = asyncio.create_task(self.follow_universe(stream, CHECK_INTERVAL))
+            try:
+                await stream.run()
+            finally:
+                follower.cancel()
+        
+        asyncio.run(stream_and_follow())
     
     def run(self):
         """Función principal del bot"""
         logger.info("🤖 Bot de Trading Avanzado iniciado...")
-        logger.info(f"📊 Monitoreando: {', '.join(SYMBOLS)}")
-        logger.info(f"⏱️  Intervalo: {INTERVAL} | Verificación cada {CHECK_INTERVAL}s")
+        if SCANNER_MODE:
+            logger.info(f"📊 Monitoreando: top {SCANNER_TOP_N} pares {SCANNER_QUOTE_ASSET} (escáner 24h)")
+        else:
+            logger.info(f"📊 Monitoreando: {', '.join(SYMBOLS)}")
+        if STREAMING_MODE:
+            logger.info(f"⏱️  Intervalo: {INTERVAL} | Modo streaming (evaluación al cierre de vela)")
+        elif SCHEDULER_ALIGNED:
+            logger.info(f"⏱️  Intervalo: {INTERVAL} | Análisis {SCHEDULER_OFFSET:.0f}s tras cada cierre "
+                        f"(cada {self.scheduler.period:.0f}s)")
+        else:
+            logger.info(f"⏱️  Intervalo: {INTERVAL} | Verificación cada {CHECK_INTERVAL}s")
         logger.info("=" * 50)
         
         # Enviar notificación de inicio
         self.send_startup_notification()
         
+        if METRICS_PORT:
+            try:
+                start_metrics_server(self.metrics, METRICS_PORT, METRICS_HOST)
+            except OSError as e:
+                logger.warning(f"No se pudo iniciar el endpoint de métricas: {e}")
+        
+        self.start_order_books()
+        
+        # kill (SIGTERM) se trata como Ctrl+C para guardar la instantánea y vaciar la cola
+        signal.signal(signal.SIGTERM, _raise_keyboard_interrupt)
+        
         try:
-            while True:
-                self.check_signals()
-                logger.info(f"⏳ Esperando {CHECK_INTERVAL}s para próxima verificación...")
-                time.sleep(CHECK_INTERVAL)
+            if STREAMING_MODE:
+                self.run_streaming()
+            elif SCHEDULER_ALIGNED:
+                while True:
+                    self.run_aligned_cycle()
+            else:
+                while True:
+                    self.run_cycle()
+                    logger.info(f"⏳ Esperando {CHECK_INTERVAL}s para próxima verificación...")
+                    time.sleep(CHECK_INTERVAL)
         except KeyboardInterrupt:
             logger.info("\n🛑 Bot detenido por el usuario")
         except Exception as e:
             logger.error(f"❌ Error crítico: {e}")
             self.send_error_notification(str(e))
         finally:
+            self.shutdown()
             logger.info("👋 Bot finalizado")
+    
+    def shutdown(self):
+        """Guarda la instantánea, entrega los mensajes pendientes y vacía el estado a disco"""
+        self.save_snapshot()
+        if self.order_books is not None:
+            self.order_books.stop()
+        self.broadcaster.flush()
+        self.telegram.stop()
+        self.process_deliveries()
+        if self.state is not None:
+            self.state.save_stats(self.session_stats, self.worker_id)
+            self.state.close()
 
 if __name__ == "__main__":
     bot = AdvancedTradingBot()
@@ -0,0 +1,280 @@
+#!/usr/bin/env python3
+"""
+Backtest vectorizado de la estrategia LONG del bot
+
+Evalúa las mismas 10 condiciones de check_long_signal sobre todo el histórico
+como series booleanas, aplica el mismo MIN_TIME_BETWEEN_SIGNALS entre señales
+y simula stop loss / TP1 / TP2 con los niveles de calculate_risk_levels.
+
+Uso:
+    python backtest.py BTCUSDT-5m-2024-*.csv [--max-hold 288]
+    python backtest.py --symbol BTCUSDT --interval 5m   # desde el archivo local
+"""
+
+import argparse
+import bisect
+import time
+
+import numpy as np
+import pandas as pd
+
+import batch_indicators
+
+# Parámetros de la estrategia (mismos nombres que en config_secure.py)
+STRATEGY_PARAMS = (
+    'RSI_PERIOD', 'RSI_OVERSOLD', 'EMA_FAST', 'EMA_SLOW', 'EMA_SIGNAL',
+    'BB_PERIOD', 'BB_STD', 'ADX_PERIOD', 'ADX_TREND_THRESHOLD', 'STOCH_K', 'STOCH_D',
+    'VOLUME_MULTIPLIER', 'MIN_CONDITIONS_FOR_SIGNAL', 'MIN_TIME_BETWEEN_SIGNALS',
+    'STOP_LOSS_PERCENTAGE', 'TAKE_PROFIT_1_PERCENTAGE', 'TAKE_PROFIT_2_PERCENTAGE',
+)
+
+# Velas máximas que se mantiene abierta una operación (288 = 1 día en 5m)
+DEFAULT_MAX_HOLD_BARS = 288
+
+# Operaciones simuladas a la vez (limita la memoria de las matrices de ventanas)
+_TRADE_CHUNK = 4096
+
+
+def default_params():
+    """Parámetros actuales de config_secure.py"""
+    import config_secure
+    return {name: getattr(config_secure, name) for name in STRATEGY_PARAMS}
+
+
+def load_klines_csv(paths):
+    """Carga velas de uno o varios CSV de Binance (formato data.binance.vision)
+
+    Devuelve un dict de arrays: open_time (ms), open, high, low, close, volume,
+    ordenado por open_time y sin duplicados.
+    """
+    if isinstance(paths, str):
+        paths = [paths]
+
+    frames = []
+    for path in paths:
+        df = pd.read_csv(path, header=None, usecols=range(6))
+        if not str(df.iloc[0, 0]).isdigit():
+            df = df.iloc[1:]
+        frames.append(df.astype(float))
+
+    data = pd.concat(frames, ignore_index=True).to_numpy()
+    open_time = data[:, 0].astype(np.int64)
+    # Los ficheros recientes de Binance usan microsegundos
+    open_time = np.where(open_time > 10**14, open_time // 1000, open_time)
+
+    order = np.argsort(open_time, kind="stable")
+    open_time = open_time[order]
+    unique = np.concatenate(([True], np.diff(open_time) > 0))
+    rows = order[unique]
+    return {
+        'open_time': open_time[unique],
+        'open': data[rows, 1],
+        'high': data[rows, 2],
+        'low': data[rows, 3],
+        'close': data[rows, 4],
+        'volume': data[rows, 5],
+    }
+
+
+def compute_signal_indicators(candles, params):
+    """Series completas de indicadores para un símbolo"""
+    def row(name):
+        return np.asarray(candles[name], dtype=float)[None, :]
+
+    indicators = batch_indicators.compute_indicators(
+        row('high'), row('low'), row('close'), row('volume'),
+        rsi_period=params['RSI_PERIOD'], ema_fast=params['EMA_FAST'],
+        ema_slow=params['EMA_SLOW'], ema_signal=params['EMA_SIGNAL'],
+        bb_period=params['BB_PERIOD'], bb_std=params['BB_STD'],
+        adx_period=params['ADX_PERIOD'], stoch_k=params['STOCH_K'],
+        stoch_d=params['STOCH_D'], tail=None
+    )
+    return {name: values[0] for name, values in indicators.items()}
+
+
+def conditions_met_series(candles, indicators, params):
+    """Número de condiciones LONG cumplidas en cada vela"""
+    conditions = batch_indicators.long_conditions(
+        {name: values[None, :] for name, values in indicators.items()},
+        np.asarray(candles['close'], dtype=float)[None, :],
+        np.asarray(candles['volume'], dtype=float)[None, :],
+        rsi_oversold=params['RSI_OVERSOLD'],
+        adx_threshold=params['ADX_TREND_THRESHOLD'],
+        volume_multiplier=params['VOLUME_MULTIPLIER']
+    )
+    return conditions[0].sum(axis=1)
+
+
+def apply_cooldown(candidates, open_time, cooldown_ms):
+    """Filtra las velas candidatas respetando el tiempo mínimo entre señales
+
+    Salta directamente a la primera candidata fuera del cooldown, así que el
+    coste depende del número de señales aceptadas y no del de candidatas.
+    """
+    candidate_times = np.asarray(open_time)[candidates].tolist()
+    accepted = []
+    position = 0
+    while position < len(candidate_times):
+        accepted.append(position)
+        position = bisect.bisect_left(candidate_times, candidate_times[position] + cooldown_ms,
+                                      position + 1)
+    return np.asarray(candidates, dtype=np.int64)[accepted]
+
+
+def _first_hit(hits):
+    """Posición del primer True por fila, o el ancho de la ventana si no hay"""
+    return np.where(hits.any(axis=1), hits.argmax(axis=1), hits.shape[1])
+
+
+def simulate_trades(candles, entries, stop_loss, take_profit_1, take_profit_2, max_hold_bars):
+    """Simula cada operación vela a vela de forma vectorizada
+
+    Se cierra media posición en TP1 y media en TP2; cada mitad sale por stop
+    loss si se toca antes, o al cierre de la última vela del horizonte. Si en
+    una misma vela se tocan stop y objetivo se asume el stop (conservador).
+    Devuelve (retornos, resultados) con resultado en {'tp2', 'tp1', 'sl', 'timeout'}.
+    """
+    high = np.asarray(candles['high'], dtype=float)
+    low = np.asarray(candles['low'], dtype=float)
+    close = np.asarray(candles['close'], dtype=float)
+    last_index = len(close) - 1
+
+    returns = np.empty(len(entries))
+    outcomes = np.empty(len(entries), dtype='<U7')
+    offsets = np.arange(1, max_hold_bars + 1)
+
+    for start in range(0, len(entries), _TRADE_CHUNK):
+        chunk = slice(start, start + _TRADE_CHUNK)
+        entry_index = entries[chunk]
+        window = entry_index[:, None] + offsets
+        valid = window <= last_index
+        window = np.minimum(window, last_index)
+
+        entry_price = close[entry_index]
+        stop = stop_loss[chunk][:, None]
+        sl_first = _first_hit((low[window] <= stop) & valid)
+        tp1_first = _first_hit((high[window] >= take_profit_1[chunk][:, None]) & valid)
+        tp2_first = _first_hit((high[window] >= take_profit_2[chunk][:, None]) & valid)
+
+        exit_index = np.minimum(entry_index + max_hold_bars, last_index)
+        timeout_return = close[exit_index] / entry_price - 1
+        stop_return = stop_loss[chunk] / entry_price - 1
+        sl_hit = sl_first < max_hold_bars
+
+        def leg(tp_first, target):
+            return np.where(tp_first < sl_first, target / entry_price - 1,
+                            np.where(sl_hit, stop_return, timeout_return))
+
+        returns[chunk] = 0.5 * leg(tp1_first, take_profit_1[chunk]) + \
+            0.5 * leg(tp2_first, take_profit_2[chunk])
+        outcomes[chunk] = np.where(tp2_first < sl_first, 'tp2',
+                                   np.where(tp1_first < sl_first, 'tp1',
+                                            np.where(sl_hit, 'sl', 'timeout')))
+    return returns, outcomes
+
+
+def max_drawdown(returns):
+    """Máximo drawdown de la curva de resultados acumulados (misma inversión por operación)"""
+    if len(returns) == 0:
+        return 0.0
+    equity = np.concatenate(([0.0], np.cumsum(returns)))
+    return float(np.max(np.maximum.accumulate(equity) - equity))
+
+
+def run_backtest(candles, params=None, max_hold_bars=DEFAULT_MAX_HOLD_BARS, indicators=None,
+                 conditions_met=None):
+    """Ejecuta el backtest completo y devuelve un dict con las métricas
+
+    indicators y conditions_met permiten reutilizar series ya calculadas con
+    los mismos parámetros de indicadores y de condiciones.
+    """
+    params = params or default_params()
+    started = time.perf_counter()
+
+    if indicators is None:
+        indicators = compute_signal_indicators(candles, params)
+    if conditions_met is None:
+        conditions_met = conditions_met_series(candles, indicators, params)
+    candidates = np.flatnonzero(conditions_met >= params['MIN_CONDITIONS_FOR_SIGNAL'])
+    entries = apply_cooldown(candidates, candles['open_time'],
+                             params['MIN_TIME_BETWEEN_SIGNALS'] * 1000)
+
+    # Mismos niveles que calculate_risk_levels
+    close = np.asarray(candles['close'], dtype=float)
+    entry_price = close[entries]
+    stop_loss = np.minimum(entry_price * (1 - params['STOP_LOSS_PERCENTAGE']),
+                           indicators['bb_lower'][entries] * 0.99)
+    take_profit_1 = entry_price * (1 + params['TAKE_PROFIT_1_PERCENTAGE'])
+    take_profit_2 = entry_price * (1 + params['TAKE_PROFIT_2_PERCENTAGE'])
+
+    returns, outcomes = simulate_trades(candles, entries, stop_loss, take_profit_1,
+                                        take_profit_2, max_hold_bars)
+
+    trades = len(entries)
+    wins = returns[returns > 0]
+    losses = returns[returns <= 0]
+
+    def rate(mask):
+        return float(np.mean(mask)) if trades else 0.0
+
+    return {
+        'candles': len(close),
+        'candidates': len(candidates),
+        'trades': trades,
+        'tp1_rate': rate((outcomes == 'tp1') | (outcomes == 'tp2')),
+        'tp2_rate': rate(outcomes == 'tp2'),
+        'sl_rate': rate(outcomes == 'sl'),
+        'timeout_rate': rate(outcomes == 'timeout'),
+        'win_rate': rate(returns > 0),
+        'expectancy': float(returns.mean()) if trades else 0.0,
+        'avg_win': float(wins.mean()) if len(wins) else 0.0,
+        'avg_loss': float(losses.mean()) if len(losses) else 0.0,
+        'profit_factor': float(wins.sum() / -losses.sum()) if losses.sum() < 0 else float('inf'),
+        'total_return': float(returns.sum()),
+        'max_drawdown': max_drawdown(returns),
+        'elapsed': time.perf_counter() - started,
+    }
+
+
+def format_report(report):
+    """Informe legible del resultado de run_backtest"""
+    return f"""
+📊 Backtest estrategia LONG
+• Velas: {report['candles']:,} | Candidatas: {report['candidates']:,} | Operaciones: {report['trades']:,}
+• TP1 alcanzado: {report['tp1_rate']:.1%}
+• TP2 alcanzado: {report['tp2_rate']:.1%}
+• Stop loss: {report['sl_rate']:.1%}
+• Sin resolver (timeout): {report['timeout_rate']:.1%}
+• Operaciones ganadoras: {report['win_rate']:.1%}
+• Expectativa por operación: {report['expectancy']:.3%} (media ganancia {report['avg_win']:.3%} / pérdida {report['avg_loss']:.3%})
+• Profit factor: {report['profit_factor']:.2f}
+• Retorno acumulado: {report['total_return']:.2%} (misma inversión por operación)
+• Máximo drawdown: {report['max_drawdown']:.2%}
+⏱️  {report['elapsed']:.2f}s
+"""
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Backtest de la estrategia LONG")
+    parser.add_argument("files", nargs="*", help="CSV de velas de Binance")
+    parser.add_argument("--symbol", help="leer las velas del archivo local en lugar de CSV")
+    parser.add_argument("--interval", default="5m")
+    parser.add_argument("--max-hold", type=int, default=DEFAULT_MAX_HOLD_BARS,
+                        help="velas máximas por operación")
+    args = parser.parse_args()
+
+    if args.symbol:
+        from candle_archive import CandleArchive
+        from config_secure import ARCHIVE_DIR
+        candles = CandleArchive(ARCHIVE_DIR).read(args.symbol, args.interval)
+        if not candles:
+            parser.error(f"no hay velas de {args.symbol} {args.interval} en {ARCHIVE_DIR}")
+    elif args.files:
+        candles = load_klines_csv(args.files)
+    else:
+        parser.error("indica ficheros CSV o --symbol")
+    print(format_report(run_backtest(candles, max_hold_bars=args.max_hold)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,240 @@
+"""
+Cálculo vectorizado de indicadores y condiciones LONG para muchos símbolos
+a la vez sobre matrices símbolos×tiempo de NumPy.
+
+Las fórmulas replican las de la librería `ta` que usa calculate_indicators,
+por lo que los valores coinciden dentro de la tolerancia de coma flotante.
+En modo cribado solo se devuelven las últimas `tail` columnas de cada
+indicador, que es lo que necesita check_long_signal; el backtest pide las
+series completas.
+"""
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+# Orden de las columnas de la matriz de condiciones (mismo que check_long_signal)
+CONDITION_NAMES = (
+    'rsi_oversold',
+    'rsi_rising',
+    'price_above_bb_lower',
+    'price_near_support',
+    'stoch_oversold',
+    'stoch_bullish_cross',
+    'volume_confirmation',
+    'trend_support',
+    'macd_bullish',
+    'bb_squeeze',
+)
+
+
+# Por encima de esta longitud la recursión temporal se delega en pandas (C)
+_PANDAS_EWM_MIN_LENGTH = 1000
+
+
+def _ewm(values, alpha, min_periods):
+    """ewm(alpha, adjust=False, min_periods).mean() fila a fila"""
+    if values.shape[1] > _PANDAS_EWM_MIN_LENGTH:
+        import pandas as pd
+        frame = pd.DataFrame(values.T)
+        return frame.ewm(alpha=alpha, adjust=False, min_periods=min_periods).mean().to_numpy().T
+
+    out = np.empty_like(values)
+    state = values[:, 0].copy()
+    out[:, 0] = state
+    for t in range(1, values.shape[1]):
+        state = (1 - alpha) * state + alpha * values[:, t]
+        out[:, t] = state
+    out[:, :min_periods - 1] = np.nan
+    return out
+
+
+def _smooth(seed, inputs, decay):
+    """out[0] = seed; out[i] = decay * out[i-1] + inputs[i] (recursión de Wilder)"""
+    alpha = 1 - decay
+    scaled = inputs / alpha
+    scaled[:, 0] = seed
+    return _ewm(scaled, alpha, 1)
+
+
+def _rolling_tail(values, window, tail, reducer):
+    """Aplica reducer a las últimas `tail` ventanas de tamaño `window`
+
+    Con tail=None devuelve la serie completa, con NaN en las primeras
+    window - 1 velas (como rolling(window) de pandas).
+    """
+    if tail is None:
+        out = np.full(values.shape, np.nan)
+        out[:, window - 1:] = reducer(sliding_window_view(values, window, axis=1), axis=-1)
+        return out
+    segment = values[:, -(window + tail - 1):]
+    return reducer(sliding_window_view(segment, window, axis=1), axis=-1)
+
+
+def _wilder_sum(values, window):
+    """Suma inicial de `window` valores y suavizado de Wilder (como ta.ADXIndicator)
+
+    values[:, 0] se ignora (NaN en ta por el desplazamiento). La columna i del
+    resultado corresponde a la vela window + i.
+    """
+    seed = values[:, 1:window + 1].sum(axis=1)
+    return _smooth(seed, values[:, window:].copy(), 1 - 1 / window)
+
+
+def _adx(high, low, close, window):
+    """ADX de ta.trend.ADXIndicator para cada fila"""
+    prev_close = np.roll(close, 1, axis=1)
+    true_range = np.maximum(high, prev_close) - np.minimum(low, prev_close)
+
+    diff_up = high - np.roll(high, 1, axis=1)
+    diff_down = np.roll(low, 1, axis=1) - low
+    pos = np.where((diff_up > diff_down) & (diff_up > 0), diff_up, 0.0)
+    neg = np.where((diff_down > diff_up) & (diff_down > 0), diff_down, 0.0)
+
+    trs = _wilder_sum(true_range, window)
+    dip = _wilder_sum(pos, window)
+    din = _wilder_sum(neg, window)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        di_pos = np.where(trs != 0, 100 * dip / trs, 0.0)
+        di_neg = np.where(trs != 0, 100 * din / trs, 0.0)
+        di_sum = di_pos + di_neg
+        dx = np.where(di_sum != 0, 100 * np.abs((di_pos - di_neg) / di_sum), 0.0)
+
+    # ADX de la vela t = media de los primeros `window` DX y después Wilder con dx[t - window]
+    adx = np.zeros_like(close)
+    first = 2 * window - 1
+    if close.shape[1] <= first:
+        return adx
+    seed = dx[:, :window].mean(axis=1)
+    adx[:, first:] = _smooth(seed, dx[:, window - 1:] / window, 1 - 1 / window)
+    return adx
+
+
+def compute_indicators(high, low, close, volume, rsi_period, ema_fast, ema_slow,
+                       ema_signal, bb_period, bb_std, adx_period, stoch_k, stoch_d,
+                       volume_period=20, tail=5):
+    """Calcula los indicadores de todos los símbolos en una pasada
+
+    Recibe matrices (símbolos, velas) de la misma longitud y devuelve un dict
+    con las mismas claves que calculate_indicators, cada una con una matriz
+    (símbolos, tail) con los últimos valores. Con tail=None se devuelven las
+    series completas (símbolos, velas).
+    """
+    keep = slice(None) if tail is None else slice(-tail, None)
+
+    # RSI (Wilder)
+    diff = np.diff(close, axis=1, prepend=np.nan)
+    up = np.where(diff > 0, diff, 0.0)
+    down = np.where(diff < 0, -diff, 0.0)
+    ema_up = _ewm(up, 1 / rsi_period, rsi_period)
+    ema_down = _ewm(down, 1 / rsi_period, rsi_period)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rsi = np.where(ema_down == 0, 100.0, 100 - 100 / (1 + ema_up / ema_down))
+
+    # EMAs y MACD
+    fast = _ewm(close, 2 / (ema_fast + 1), ema_fast)
+    slow = _ewm(close, 2 / (ema_slow + 1), ema_slow)
+    macd = fast - slow
+    macd_signal = np.full_like(macd, np.nan)
+    macd_signal[:, ema_slow - 1:] = _ewm(macd[:, ema_slow - 1:], 2 / (ema_signal + 1), ema_signal)
+
+    # Bollinger Bands
+    bb_middle = _rolling_tail(close, bb_period, tail, np.mean)
+    bb_dev = _rolling_tail(close, bb_period, tail, np.std)
+    bb_upper = bb_middle + bb_std * bb_dev
+    bb_lower = bb_middle - bb_std * bb_dev
+
+    # Estocástico (se necesitan stoch_d - 1 valores extra de %K para la media)
+    k_tail = None if tail is None else tail + stoch_d - 1
+    lowest = _rolling_tail(low, stoch_k, k_tail, np.min)
+    highest = _rolling_tail(high, stoch_k, k_tail, np.max)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        k_values = 100 * (close[:, -lowest.shape[1]:] - lowest) / (highest - lowest)
+    stoch_signal = _rolling_tail(k_values, stoch_d, tail, np.mean)
+
+    return {
+        'rsi': rsi[:, keep],
+        'ema_fast': fast[:, keep],
+        'ema_slow': slow[:, keep],
+        'macd': macd[:, keep],
+        'macd_signal': macd_signal[:, keep],
+        'macd_histogram': (macd - macd_signal)[:, keep],
+        'bb_upper': bb_upper,
+        'bb_middle': bb_middle,
+        'bb_lower': bb_lower,
+        'bb_width': (bb_upper - bb_lower) / bb_middle,
+        'adx': _adx(high, low, close, adx_period)[:, keep],
+        'stoch_k': k_values[:, keep],
+        'stoch_d': stoch_signal,
+        'volume_sma': _rolling_tail(volume, volume_period, tail, np.mean),
+    }
+
+
+def _shift(values, periods):
+    """Desplaza las columnas hacia la derecha rellenando con NaN"""
+    out = np.full(values.shape, np.nan)
+    out[:, periods:] = values[:, :-periods]
+    return out
+
+
+def long_conditions(indicators, close, volume, rsi_oversold, adx_threshold,
+                    volume_multiplier, trend_bonus=None):
+    """Evalúa las 10 condiciones de check_long_signal en cada vela
+
+    indicators, close y volume deben estar alineados en el eje temporal.
+    trend_bonus (símbolos,) suma a la puntuación de tendencia los intervalos
+    mayores alcistas, como analyze_trend_strength.
+    Devuelve un array booleano (símbolos, velas, 10) con las condiciones en
+    el orden de CONDITION_NAMES; las que dependen de velas anteriores a la
+    primera columna son False.
+    """
+    rsi = indicators['rsi']
+    stoch_k = indicators['stoch_k']
+    stoch_d = indicators['stoch_d']
+    macd = indicators['macd']
+    bb_upper = indicators['bb_upper']
+    bb_middle = indicators['bb_middle']
+    ema_fast = indicators['ema_fast']
+    ema_slow = indicators['ema_slow']
+    prev_macd = _shift(macd, 1)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        ema_separation = (ema_fast - ema_slow) / ema_slow
+    trend_score = (
+        (indicators['adx'] > adx_threshold).astype(int)
+        + (macd > indicators['macd_signal'])
+        + (macd > prev_macd)
+        + (ema_fast > ema_slow)
+        + (ema_separation > 0.01)
+    )
+    if trend_bonus is not None:
+        trend_score = trend_score + np.asarray(trend_bonus)[:, None]
+
+    with np.errstate(invalid='ignore'):
+        return np.stack([
+            rsi < rsi_oversold,
+            rsi > _shift(rsi, 1),
+            close > indicators['bb_lower'],
+            close <= bb_middle + (bb_upper - bb_middle) * 0.3,
+            (stoch_k < 20) & (stoch_d < 20),
+            (stoch_k > stoch_d) & (_shift(stoch_k, 1) <= _shift(stoch_d, 1)),
+            volume > indicators['volume_sma'] * volume_multiplier,
+            trend_score >= 2,
+            macd > prev_macd,
+            indicators['bb_width'] < _shift(indicators['bb_width'], 4),
+        ], axis=-1)
+
+
+def evaluate_long_conditions(indicators, close, volume, rsi_oversold, adx_threshold,
+                             volume_multiplier, trend_bonus=None):
+    """Evalúa las 10 condiciones de check_long_signal en la última vela
+
+    Devuelve una matriz (símbolos, 10) con columnas en el orden de
+    CONDITION_NAMES.
+    """
+    width = indicators['rsi'].shape[1]
+    conditions = long_conditions(
+        indicators, close[:, -width:], volume[:, -width:],
+        rsi_oversold, adx_threshold, volume_multiplier, trend_bonus
+    )
+    return conditions[:, -1, :]
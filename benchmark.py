@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+"""
+Benchmarks reproducibles del camino caliente del bot
+
+Usa velas OHLCV sintéticas deterministas y sustitutos de Binance y Telegram,
+así que no necesita claves ni red. Mide get_klines (parseo + caché),
+calculate_indicators, check_long_signal, create_signal_message y un ciclo
+completo de check_signals con 10, 100 y 1000 símbolos, y guarda los
+resultados en JSON. Con --baseline falla (código de salida 1) si algún
+benchmark es más lento que la referencia en más de --threshold.
+
+Uso:
+    python benchmark.py                                   # benchmark_results.json
+    python benchmark.py --baseline benchmark_baseline.json --threshold 0.25
+"""
+
+import argparse
+import json
+import logging
+import platform
+import statistics
+import sys
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas
+
+from offline_bot import offline_bot
+from synthetic_data import synthetic_klines
+
+DEFAULT_SIZES = (10, 100, 1000)
+DEFAULT_INTERVAL = '5m'
+
+class StubMarket:
+    """Sustituto de Binance: sirve velas sintéticas y mueve la vela abierta en cada petición"""
+
+    def __init__(self, interval=DEFAULT_INTERVAL, seed=0):
+        self.interval = interval
+        self.seed = seed
+        self.rng = np.random.default_rng(seed)
+        self._series = {}
+
+    def series(self, symbol):
+        if symbol not in self._series:
+            self._series[symbol] = synthetic_klines(symbol, interval=self.interval, seed=self.seed)
+        return self._series[symbol]
+
+    def klines(self, symbol, limit=500, start_time=None):
+        rows = self.series(symbol)
+        # La vela abierta cambia de precio entre peticiones
+        last = list(rows[-1])
+        close = float(last[4]) * (1 + self.rng.normal(0, 0.001))
+        last[2] = f"{max(float(last[2]), close):.8f}"
+        last[3] = f"{min(float(last[3]), close):.8f}"
+        last[4] = f"{close:.8f}"
+        rows[-1] = last
+        if start_time is not None:
+            rows = [row for row in rows if row[0] >= start_time]
+        return rows[-limit:]
+
+    def fetch_klines_concurrently(self, symbols, interval, limit=500, start_times=None, **kwargs):
+        start_times = start_times or {}
+        return {symbol: self.klines(symbol, limit, start_times.get(symbol)) for symbol in symbols}
+
+
+def measure(function, repeat, warmup=1):
+    """Tiempos (segundos) de `repeat` llamadas tras `warmup` llamadas de calentamiento"""
+    for _ in range(warmup):
+        function()
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - started)
+    return {
+        'median': statistics.median(timings),
+        'min': min(timings),
+        'max': max(timings),
+        'runs': repeat,
+    }
+
+
+def run_benchmarks(sizes=DEFAULT_SIZES, repeat=20, interval=DEFAULT_INTERVAL, seed=0):
+    """Ejecuta todos los benchmarks y devuelve {nombre: estadísticas}"""
+    market = StubMarket(interval, seed)
+    results = {}
+
+    symbol = 'BTCUSDT'
+    with offline_bot(market, [symbol]) as bot:
+        def get_klines_cold():
+            bot.kline_cache.invalidate(symbol, interval)
+            bot.get_klines(symbol, interval)
+
+        results['get_klines'] = measure(get_klines_cold, repeat * 5)
+        results['get_klines_incremental'] = measure(lambda: bot.get_klines(symbol, interval), repeat * 5)
+
+        df = bot.get_klines(symbol, interval)
+        results['calculate_indicators'] = measure(lambda: bot.calculate_indicators(df), repeat)
+        indicators = bot.calculate_indicators(df)
+        results['check_long_signal'] = measure(
+            lambda: bot.check_long_signal(symbol, df, indicators), repeat * 5)
+
+        signal_data = bot.check_long_signal(symbol, df, indicators)
+        risk_levels = bot.calculate_risk_levels(
+            signal_data['current_price'],
+            indicators['bb_upper'].iloc[-1],
+            indicators['bb_lower'].iloc[-1]
+        )
+        results['create_signal_message'] = measure(
+            lambda: bot.create_signal_message(symbol, signal_data, risk_levels), repeat * 5)
+
+    for size in sizes:
+        symbols = [f"SYM{i:04d}USDT" for i in range(size)]
+        for cycle_symbol in symbols:
+            market.series(cycle_symbol)
+        with offline_bot(market, symbols) as cycle_bot:
+            # El primer ciclo descarga todo el histórico; los siguientes son incrementales
+            results[f'check_signals_cold_{size}'] = measure(
+                lambda: _cold_cycle(cycle_bot, symbols, interval), max(repeat // 4, 1), warmup=0)
+            results[f'check_signals_{size}'] = measure(cycle_bot.check_signals, max(repeat // 2, 1))
+    return results
+
+
+def _cold_cycle(bot, symbols, interval):
+    for symbol in symbols:
+        bot.kline_cache.invalidate(symbol, interval)
+        bot.indicator_engine.reset(symbol)
+        bot.timeframes.reset(symbol)
+    bot.check_signals()
+
+
+def compare(results, baseline, threshold):
+    """Lista de (nombre, actual, referencia) que superan la referencia en más de threshold"""
+    regressions = []
+    for name, stats in results.items():
+        reference = baseline.get(name)
+        if reference and stats['median'] > reference['median'] * (1 + threshold):
+            regressions.append((name, stats['median'], reference['median']))
+    return regressions
+
+
+def _format_seconds(seconds):
+    if seconds < 1e-3:
+        return f"{seconds * 1e6:.0f}µs"
+    if seconds < 1:
+        return f"{seconds * 1e3:.1f}ms"
+    return f"{seconds:.2f}s"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks del bot con datos sintéticos")
+    parser.add_argument("--sizes", default=",".join(map(str, DEFAULT_SIZES)),
+                        help="números de símbolos para el ciclo completo")
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default="benchmark_results.json")
+    parser.add_argument("--baseline", help="JSON de una ejecución anterior con la que comparar")
+    parser.add_argument("--threshold", type=float, default=0.25,
+                        help="empeoramiento relativo máximo de la mediana (0.25 = 25%%)")
+    args = parser.parse_args()
+
+    # Los logs por símbolo no forman parte de lo que se mide
+    logging.disable(logging.CRITICAL)
+    sizes = [int(size) for size in args.sizes.split(",") if size]
+    results = run_benchmarks(sizes, args.repeat, seed=args.seed)
+    logging.disable(logging.NOTSET)
+
+    report = {
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'pandas': pandas.__version__,
+        'machine': platform.machine(),
+        'results': results,
+    }
+    with open(args.output, "w") as handle:
+        json.dump(report, handle, indent=2)
+
+    for name, stats in results.items():
+        print(f"• {name:<28} mediana {_format_seconds(stats['median']):>9} | "
+              f"mín {_format_seconds(stats['min']):>9}")
+    print(f"💾 Resultados guardados en {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as handle:
+            baseline = json.load(handle)['results']
+        regressions = compare(results, baseline, args.threshold)
+        for name, current, reference in regressions:
+            print(f"❌ {name}: {_format_seconds(current)} frente a {_format_seconds(reference)} "
+                  f"(+{current / reference - 1:.0%})")
+        if regressions:
+            sys.exit(1)
+        print(f"✅ Sin regresiones por encima del {args.threshold:.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+"""
+Archivo local de velas en columnas de ancho fijo mapeadas en memoria
+
+Cada símbolo/intervalo se guarda en ARCHIVE_DIR/<SÍMBOLO>/<intervalo>/ con un
+fichero binario por columna (solo se añaden filas, ordenadas por open_time).
+La lectura usa np.memmap, así que un rango de tiempo se obtiene como vistas
+sin copiar datos.
+
+Uso:
+    python candle_archive.py backfill BTCUSDT ETHUSDT --interval 5m --since 2024-01-01
+    python candle_archive.py info BTCUSDT --interval 5m
+"""
+
+import argparse
+import logging
+import os
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+import requests
+
+from http_client import WeightGovernor, kline_weight, pooled_session
+
+logger = logging.getLogger(__name__)
+
+# Columnas guardadas y su tipo (mismo orden que la respuesta REST de klines)
+COLUMNS = (
+    ('open_time', np.int64),
+    ('open', np.float64),
+    ('high', np.float64),
+    ('low', np.float64),
+    ('close', np.float64),
+    ('volume', np.float64),
+    ('close_time', np.int64),
+    ('quote_asset_volume', np.float64),
+    ('number_of_trades', np.int64),
+)
+
+# Máximo de velas por petición que admite la API de Binance
+BACKFILL_BATCH = 1000
+
+
+def _rest_rows(columns):
+    """Filas como las de la API REST a partir de las columnas en el orden de COLUMNS"""
+    return [
+        [int(ot), str(o), str(h), str(l), str(c), str(v), int(ct), str(q), int(n), "0", "0", "0"]
+        for ot, o, h, l, c, v, ct, q, n in zip(*columns)
+    ]
+
+
+class CandleArchive:
+    """Almacén columnar append-only de velas cerradas"""
+
+    def __init__(self, root):
+        self.root = root
+
+    def _dir(self, symbol, interval):
+        return os.path.join(self.root, symbol, interval)
+
+    def _path(self, symbol, interval, column):
+        return os.path.join(self._dir(symbol, interval), f"{column}.bin")
+
+    def count(self, symbol, interval):
+        """Número de velas completas guardadas
+
+        Si una escritura se interrumpió a medias, las columnas más largas se
+        recortan a la fila completa más reciente.
+        """
+        counts = []
+        for column, dtype in COLUMNS:
+            path = self._path(symbol, interval, column)
+            size = os.path.getsize(path) if os.path.exists(path) else 0
+            counts.append(size // np.dtype(dtype).itemsize)
+        rows = min(counts)
+        if rows != max(counts):
+            self._truncate(symbol, interval, rows)
+        return rows
+
+    def _truncate(self, symbol, interval, rows):
+        for column, dtype in COLUMNS:
+            path = self._path(symbol, interval, column)
+            if os.path.exists(path):
+                with open(path, "r+b") as handle:
+                    handle.truncate(rows * np.dtype(dtype).itemsize)
+
+    def last_open_time(self, symbol, interval):
+        """open_time (ms) de la última vela guardada, o None"""
+        rows = self.count(symbol, interval)
+        if rows == 0:
+            return None
+        column = self._column(symbol, interval, 'open_time', rows)
+        return int(column[-1])
+
+    def _column(self, symbol, interval, column, rows):
+        dtype = dict(COLUMNS)[column]
+        return np.memmap(self._path(symbol, interval, column), dtype=dtype, mode='r', shape=(rows,))
+
+    def append(self, symbol, interval, klines, now_ms=None):
+        """Añade velas en formato REST; ignora las ya guardadas y las aún abiertas
+
+        Devuelve el número de velas añadidas.
+        """
+        now_ms = now_ms if now_ms is not None else int(time.time() * 1000)
+        last_open = self.last_open_time(symbol, interval)
+        rows = [
+            kline for kline in klines
+            if int(kline[6]) < now_ms and (last_open is None or int(kline[0]) > last_open)
+        ]
+        if not rows:
+            return 0
+
+        os.makedirs(self._dir(symbol, interval), exist_ok=True)
+        for position, (column, dtype) in enumerate(COLUMNS):
+            values = np.array([float(row[position]) for row in rows]).astype(dtype)
+            with open(self._path(symbol, interval, column), "ab") as handle:
+                handle.write(values.tobytes())
+        return len(rows)
+
+    def read(self, symbol, interval, start_ms=None, end_ms=None):
+        """Columnas en [start_ms, end_ms) como vistas de solo lectura (sin copia)
+
+        Devuelve un dict {columna: array}, vacío si no hay datos.
+        """
+        rows = self.count(symbol, interval)
+        if rows == 0:
+            return {}
+
+        open_time = self._column(symbol, interval, 'open_time', rows)
+        first = 0 if start_ms is None else int(np.searchsorted(open_time, start_ms, side='left'))
+        last = rows if end_ms is None else int(np.searchsorted(open_time, end_ms, side='left'))
+        return {
+            column: self._column(symbol, interval, column, rows)[first:last]
+            for column, _ in COLUMNS
+        }
+
+    def tail_klines(self, symbol, interval, limit):
+        """Últimas `limit` velas en el mismo formato de filas que la API REST"""
+        rows = self.count(symbol, interval)
+        if rows == 0:
+            return []
+        start = max(rows - limit, 0)
+        return _rest_rows([self._column(symbol, interval, column, rows)[start:] for column, _ in COLUMNS])
+
+    def read_klines(self, symbol, interval, start_ms=None, end_ms=None):
+        """Velas en [start_ms, end_ms) en el formato de filas de la API REST"""
+        data = self.read(symbol, interval, start_ms, end_ms)
+        if not data:
+            return []
+        return _rest_rows([data[column] for column, _ in COLUMNS])
+
+    def backfill(self, symbol, interval, since_ms, base_url="https://api.binance.com",
+                 session=None, pause=0.1, governor=None):
+        """Descarga por REST todo el histórico desde since_ms (o desde la última vela)
+
+        Se puede interrumpir y relanzar: siempre continúa tras la última vela
+        guardada. Con un WeightGovernor el ritmo lo marca el peso de API
+        disponible (y los 429/418 se reintentan tras la pausa) en lugar de
+        `pause`. Devuelve el número de velas añadidas.
+        """
+        session = session or requests.Session()
+        added = 0
+        while True:
+            last_open = self.last_open_time(symbol, interval)
+            start = since_ms if last_open is None else max(since_ms, last_open + 1)
+            if governor is not None:
+                governor.acquire(kline_weight(BACKFILL_BATCH))
+            response = session.get(f"{base_url}/api/v3/klines", params={
+                "symbol": symbol, "interval": interval,
+                "startTime": start, "limit": BACKFILL_BATCH
+            }, timeout=10)
+            if governor is not None:
+                governor.observe(response.status_code, response.headers)
+                if response.status_code in (418, 429):
+                    continue
+            response.raise_for_status()
+            klines = response.json()
+
+            appended = self.append(symbol, interval, klines)
+            added += appended
+            if appended:
+                logger.info(f"📥 {symbol} {interval}: {added} velas añadidas")
+            if len(klines) < BACKFILL_BATCH or appended == 0:
+                return added
+            if governor is None:
+                time.sleep(pause)
+
+
+def _parse_date(value):
+    return int(datetime.strptime(value, "%Y-%m-%d").replace(tzinfo=timezone.utc).timestamp() * 1000)
+
+
+def main():
+    from config_secure import (ARCHIVE_DIR, BINANCE_API_URL, BINANCE_WEIGHT_HEADROOM,
+                               BINANCE_WEIGHT_LIMIT, INTERVAL)
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description="Archivo local de velas")
+    parser.add_argument("command", choices=["backfill", "info"])
+    parser.add_argument("symbols", nargs="+")
+    parser.add_argument("--interval", default=INTERVAL)
+    parser.add_argument("--since", default="2017-01-01", help="fecha inicial (YYYY-MM-DD)")
+    args = parser.parse_args()
+
+    archive = CandleArchive(ARCHIVE_DIR)
+    session = pooled_session()
+    governor = WeightGovernor(BINANCE_WEIGHT_LIMIT, headroom=BINANCE_WEIGHT_HEADROOM)
+    for symbol in args.symbols:
+        if args.command == "backfill":
+            added = archive.backfill(symbol, args.interval, _parse_date(args.since),
+                                     base_url=BINANCE_API_URL, session=session, governor=governor)
+            print(f"✅ {symbol} {args.interval}: {added} velas nuevas")
+
+        data = archive.read(symbol, args.interval)
+        if data:
+            first = datetime.fromtimestamp(data['open_time'][0] / 1000, timezone.utc)
+            last = datetime.fromtimestamp(data['open_time'][-1] / 1000, timezone.utc)
+            print(f"📦 {symbol} {args.interval}: {len(data['open_time']):,} velas "
+                  f"({first:%Y-%m-%d %H:%M} → {last:%Y-%m-%d %H:%M} UTC)")
+        else:
+            print(f"📦 {symbol} {args.interval}: sin datos")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,288 @@
+#!/usr/bin/env python3
+"""
+Ejecución repartida en varios procesos o máquinas con deduplicación global
+
+Un coordinador reparte los símbolos entre los workers vivos (rendezvous
+hashing: si un worker muere solo se mueven sus símbolos) y es el único que
+decide si una señal puede enviarse, aplicando MIN_TIME_BETWEEN_SIGNALS para
+todo el clúster. Workers y coordinador se comunican por socket con
+multiprocessing.managers, así que los workers pueden estar en otras máquinas.
+
+Uso:
+    python cluster.py local --workers 4                       # todo en esta máquina
+    python cluster.py coordinator --address 0.0.0.0:7070
+    python cluster.py worker --address coordinador:7070 --id nodo1-0
+"""
+
+import argparse
+import hashlib
+import logging
+import multiprocessing
+import os
+import signal
+import socket
+import threading
+import time
+from multiprocessing.managers import BaseManager
+
+logger = logging.getLogger(__name__)
+
+
+def _weight(worker_id, symbol):
+    digest = hashlib.blake2b(f"{worker_id}:{symbol}".encode(), digest_size=8).digest()
+    return int.from_bytes(digest, "big")
+
+
+def partition(symbols, workers):
+    """Asigna cada símbolo al worker con mayor peso (rendezvous hashing)
+
+    Devuelve {worker: [símbolos]}. Al quitar o añadir un worker solo
+    cambian de dueño los símbolos de ese worker.
+    """
+    assignment = {worker: [] for worker in workers}
+    if not assignment:
+        return assignment
+    for symbol in symbols:
+        owner = max(assignment, key=lambda worker: _weight(worker, symbol))
+        assignment[owner].append(symbol)
+    return assignment
+
+
+class Coordinator:
+    """Reparto de símbolos y cooldown global de señales (vive en un único proceso)"""
+
+    def __init__(self, symbols_provider, heartbeat_timeout=30, state=None):
+        self.symbols_provider = symbols_provider
+        self.heartbeat_timeout = heartbeat_timeout
+        # Con un StateStore los cooldowns globales sobreviven a reinicios del coordinador
+        self.state = state
+        self._lock = threading.Lock()
+        self._workers = {}
+        self._last_signals = state.load_cooldowns() if state is not None else {}
+        self._assignment = {}
+        self._assignment_key = None
+
+    def heartbeat(self, worker_id):
+        """Registra o mantiene vivo un worker"""
+        with self._lock:
+            if worker_id not in self._workers:
+                logger.info(f"➕ Worker {worker_id} conectado")
+            self._workers[worker_id] = time.monotonic()
+
+    def assignment(self, worker_id):
+        """Símbolos que le tocan ahora al worker"""
+        self.heartbeat(worker_id)
+        symbols = list(self.symbols_provider())
+        with self._lock:
+            self._expire_workers()
+            key = (tuple(sorted(self._workers)), tuple(symbols))
+            if key != self._assignment_key:
+                self._assignment = partition(symbols, key[0])
+                self._assignment_key = key
+                logger.info(f"🔀 Reparto: {len(symbols)} símbolos entre {len(key[0])} workers")
+            return list(self._assignment.get(worker_id, []))
+
+    def _expire_workers(self):
+        now = time.monotonic()
+        for worker_id, seen in list(self._workers.items()):
+            if now - seen > self.heartbeat_timeout:
+                logger.warning(f"💀 Worker {worker_id} sin latido, se reparten sus símbolos")
+                del self._workers[worker_id]
+
+    def claim_signal(self, symbol, sent_at, cooldown):
+        """Reserva el envío de una señal; False si otra se envió hace menos de cooldown segundos"""
+        with self._lock:
+            previous = self._last_signals.get(symbol)
+            if previous is not None and sent_at - previous < cooldown:
+                return False
+            self._last_signals[symbol] = sent_at
+        if self.state is not None:
+            self.state.record_cooldown(symbol, sent_at)
+        return True
+
+    def release_signal(self, symbol, sent_at):
+        """Anula una reserva cuya señal no llegó a entregarse"""
+        with self._lock:
+            if self._last_signals.get(symbol) != sent_at:
+                return
+            del self._last_signals[symbol]
+        if self.state is not None:
+            self.state.clear_cooldown(symbol, sent_at)
+
+    def status(self):
+        """Workers vivos y número de símbolos de cada uno"""
+        with self._lock:
+            self._expire_workers()
+            return {worker: len(self._assignment.get(worker, [])) for worker in self._workers}
+
+
+class _CoordinatorServer(BaseManager):
+    pass
+
+
+class _CoordinatorClient(BaseManager):
+    pass
+
+
+_CoordinatorClient.register("coordinator")
+
+
+def _parse_address(address):
+    host, _, port = address.rpartition(":")
+    return host or "127.0.0.1", int(port)
+
+
+def serve_coordinator(coordinator, address, authkey):
+    """Publica el coordinador en address (host:puerto) desde un hilo en segundo plano"""
+    _CoordinatorServer.register("coordinator", callable=lambda: coordinator)
+    manager = _CoordinatorServer(address=_parse_address(address), authkey=authkey)
+    server = manager.get_server()
+    threading.Thread(target=server.serve_forever, name="cluster-coordinator", daemon=True).start()
+    logger.info(f"🧭 Coordinador escuchando en {address}")
+    return server
+
+
+def connect(address, authkey, retries=30, delay=1.0):
+    """Proxy al coordinador remoto (reintenta mientras arranca)"""
+    for attempt in range(retries):
+        manager = _CoordinatorClient(address=_parse_address(address), authkey=authkey)
+        try:
+            manager.connect()
+            return manager.coordinator()
+        except (ConnectionRefusedError, OSError):
+            if attempt == retries - 1:
+                raise
+            time.sleep(delay)
+
+
+def _heartbeat_loop(coordinator, worker_id, interval, stopped):
+    while not stopped.wait(interval):
+        try:
+            coordinator.heartbeat(worker_id)
+        except Exception as e:
+            logger.warning(f"No se pudo enviar el latido al coordinador: {e}")
+
+
+def run_worker(address, authkey, worker_id):
+    """Bucle de un worker: pide sus símbolos al coordinador en cada ciclo y los analiza"""
+    from advanced_trading_bot import AdvancedTradingBot, _raise_keyboard_interrupt, configure_logging
+    from config_secure import CHECK_INTERVAL, CLUSTER_HEARTBEAT_INTERVAL, SCHEDULER_ALIGNED
+
+    # Cada worker rota su propio archivo de log
+    configure_logging(worker_id)
+    coordinator = connect(address, authkey)
+    bot = AdvancedTradingBot(cluster=coordinator, worker_id=worker_id)
+    stopped = threading.Event()
+    threading.Thread(
+        target=_heartbeat_loop, args=(coordinator, worker_id, CLUSTER_HEARTBEAT_INTERVAL, stopped),
+        name="cluster-heartbeat", daemon=True
+    ).start()
+
+    logger.info(f"🤖 Worker {worker_id} conectado a {address}")
+    bot.start_order_books()
+    # El coordinador para los workers con terminate() (SIGTERM): se cierra como con Ctrl+C
+    signal.signal(signal.SIGTERM, _raise_keyboard_interrupt)
+    try:
+        while True:
+            if SCHEDULER_ALIGNED:
+                bot.run_aligned_cycle()
+            else:
+                bot.run_cycle()
+                time.sleep(CHECK_INTERVAL)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        # Ctrl+C llega también a los workers y el coordinador envía después SIGTERM:
+        # una segunda interrupción no debe cortar el cierre
+        signal.signal(signal.SIGINT, signal.SIG_IGN)
+        signal.signal(signal.SIGTERM, signal.SIG_IGN)
+        stopped.set()
+        bot.shutdown()
+
+
+def _symbols_provider():
+    """Lista de símbolos a repartir: SYMBOLS o los candidatos del escáner"""
+    import config_secure as config
+    if not config.SCANNER_MODE:
+        return lambda: config.SYMBOLS
+
+    from universe import UniverseScanner
+    scanner = UniverseScanner(
+        base_url=config.BINANCE_API_URL,
+        timeout=config.REQUEST_TIMEOUT,
+        refresh_interval=config.SCANNER_REFRESH_INTERVAL,
+        fallback=config.SYMBOLS,
+        quote_asset=config.SCANNER_QUOTE_ASSET,
+        top_n=config.SCANNER_TOP_N,
+        min_quote_volume=config.SCANNER_MIN_QUOTE_VOLUME,
+        max_spread=config.SCANNER_MAX_SPREAD,
+        min_price_change=config.SCANNER_MIN_PRICE_CHANGE,
+        max_price_change=config.SCANNER_MAX_PRICE_CHANGE
+    )
+    return scanner.symbols
+
+
+def _start_local_worker(context, address, authkey, worker_id):
+    process = context.Process(target=run_worker, args=(address, authkey, worker_id),
+                              name=f"worker-{worker_id}", daemon=True)
+    process.start()
+    return process
+
+
+def main():
+    import config_secure as config
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(processName)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description="Bot repartido entre varios procesos o máquinas")
+    parser.add_argument("role", choices=["local", "coordinator", "worker"])
+    parser.add_argument("--address", default=config.CLUSTER_ADDRESS, help="host:puerto del coordinador")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="workers locales (modo local)")
+    parser.add_argument("--id", default=f"{socket.gethostname()}-{os.getpid()}", help="identificador del worker")
+    args = parser.parse_args()
+
+    # La conexión usa pickle: fuera del modo local la clave debe ser secreta y compartida
+    authkey = config.CLUSTER_AUTHKEY.encode()
+    if not authkey:
+        if args.role != "local":
+            parser.error("configura CLUSTER_AUTHKEY en las variables de entorno")
+        authkey = os.urandom(16)
+
+    if args.role == "worker":
+        run_worker(args.address, authkey, args.id)
+        return
+
+    from state_store import StateStore
+    state = StateStore(config.STATE_DB) if config.STATE_DB else None
+    coordinator = Coordinator(_symbols_provider(), heartbeat_timeout=config.CLUSTER_HEARTBEAT_TIMEOUT,
+                              state=state)
+    serve_coordinator(coordinator, args.address, authkey)
+
+    # En modo local el coordinador también supervisa y relanza sus workers
+    context = multiprocessing.get_context("spawn")
+    workers = {}
+    if args.role == "local":
+        for index in range(args.workers):
+            worker_id = f"{socket.gethostname()}-{index}"
+            workers[worker_id] = _start_local_worker(context, args.address, authkey, worker_id)
+
+    try:
+        while True:
+            time.sleep(config.CLUSTER_HEARTBEAT_INTERVAL)
+            for worker_id, process in list(workers.items()):
+                if not process.is_alive():
+                    logger.warning(f"🔁 Worker {worker_id} terminó (código {process.exitcode}), relanzando")
+                    workers[worker_id] = _start_local_worker(context, args.address, authkey, worker_id)
+            logger.debug(f"Estado del clúster: {coordinator.status()}")
+    except KeyboardInterrupt:
+        logger.info("🛑 Coordinador detenido")
+        for process in workers.values():
+            process.terminate()
+        # Los workers son daemon: hay que esperarlos para que terminen de guardar su estado
+        for process in workers.values():
+            process.join(30)
+        if state is not None:
+            state.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -29,7 +29,7 @@ if not BINANCE_API_SECRET:
 # ================================
 # CONFIGURACIÓN DE TRADING
 # ================================
-# Símbolos a monitorear (máximo 10 recomendado)
+# Símbolos a monitorear
 SYMBOLS = os.getenv('SYMBOLS', 'BTCUSDT,ETHUSDT,BNBUSDT,ADAUSDT,SOLUSDT').split(',')
 
 # Timeframe para análisis (1m, 5m, 15m, 1h, 4h, 1d)
@@ -38,6 +38,93 @@ INTERVAL = os.getenv('INTERVAL', '5m')
 # Intervalo entre verificaciones (en segundos)
 CHECK_INTERVAL = int(os.getenv('CHECK_INTERVAL', '300'))
 
+# Planificador alineado al cierre de vela: en lugar de dormir CHECK_INTERVAL
+# tras cada ciclo, analizar SCHEDULER_OFFSET segundos después de cada cierre
+# de INTERVAL (CHECK_INTERVAL se redondea a un número entero de velas)
+SCHEDULER_ALIGNED = os.getenv('SCHEDULER_ALIGNED', 'false').lower() == 'true'
+SCHEDULER_OFFSET = float(os.getenv('SCHEDULER_OFFSET', '2'))    # Margen tras el cierre (segundos)
+SCHEDULER_STAGGER = float(os.getenv('SCHEDULER_STAGGER', '10')) # Ventana para escalonar las tandas
+SCHEDULER_BATCHES = int(os.getenv('SCHEDULER_BATCHES', '4'))    # Tandas de símbolos por cierre
+SCHEDULER_RETRY_DELAY = 3                                       # Reintento si la vela aún no está cerrada
+
+# Modo escáner: en lugar de SYMBOLS, analizar los mejores pares de todo el
+# exchange tras un filtro con el ticker 24h (una sola petición para todos)
+SCANNER_MODE = os.getenv('SCANNER_MODE', 'false').lower() == 'true'
+SCANNER_QUOTE_ASSET = os.getenv('SCANNER_QUOTE_ASSET', 'USDT')
+SCANNER_TOP_N = int(os.getenv('SCANNER_TOP_N', '40'))        # Candidatos con análisis completo
+SCANNER_MIN_QUOTE_VOLUME = 5_000_000                          # Volumen 24h mínimo (en quote)
+SCANNER_MAX_SPREAD = 0.002                                    # Spread máximo (0.2%)
+SCANNER_MIN_PRICE_CHANGE = -15.0                              # Variación 24h mínima (%)
+SCANNER_MAX_PRICE_CHANGE = 10.0                               # Variación 24h máxima (%)
+SCANNER_REFRESH_INTERVAL = 900                                # Renovar candidatos cada X segundos
+
+# Modo clúster (python cluster.py): dirección del coordinador, clave compartida
+# entre coordinador y workers, y latidos para detectar workers caídos (segundos)
+CLUSTER_ADDRESS = os.getenv('CLUSTER_ADDRESS', '127.0.0.1:7070')
+CLUSTER_AUTHKEY = os.getenv('CLUSTER_AUTHKEY', '')
+CLUSTER_HEARTBEAT_INTERVAL = 10
+CLUSTER_HEARTBEAT_TIMEOUT = 30
+
+# ================================
+# CONFIGURACIÓN DE DATOS DE MERCADO
+# ================================
+# URL base de la API REST de Binance
+BINANCE_API_URL = os.getenv('BINANCE_API_URL', 'https://api.binance.com')
+
+# Límite de peso de API por minuto de Binance y fracción que usa el bot; las
+# peticiones se espacian según la cabecera X-MBX-USED-WEIGHT-1M
+BINANCE_WEIGHT_LIMIT = int(os.getenv('BINANCE_WEIGHT_LIMIT', '6000'))
+BINANCE_WEIGHT_HEADROOM = 0.8
+
+# Máximo de peticiones de velas simultáneas por ciclo
+MAX_CONCURRENT_REQUESTS = int(os.getenv('MAX_CONCURRENT_REQUESTS', '10'))
+
+# Timeout de cada petición REST (en segundos)
+REQUEST_TIMEOUT = 10
+
+# Velas guardadas en memoria por símbolo (tras el warm-up solo se piden las nuevas)
+KLINE_CACHE_SIZE = 200
+
+# Guardar precios y volúmenes de las velas en float32 (la mitad de memoria)
+KLINE_FLOAT32 = os.getenv('KLINE_FLOAT32', 'false').lower() == 'true'
+
+# Archivo local de velas: arranque en caliente desde disco y registro de
+# todas las velas cerradas (relleno masivo con: python candle_archive.py backfill)
+ARCHIVE_ENABLED = os.getenv('ARCHIVE_ENABLED', 'false').lower() == 'true'
+ARCHIVE_DIR = os.getenv('ARCHIVE_DIR', 'data/klines')
+
+# Base de datos SQLite con cooldowns, alertas, estadísticas y registro de
+# señales enviadas; sobrevive a reinicios (vacío = desactivado)
+STATE_DB = os.getenv('STATE_DB', 'data/bot_state.db')
+
+# Instantánea de velas e indicadores en memoria para arrancar en caliente: se
+# guarda al apagar y cada SNAPSHOT_INTERVAL segundos (vacío = desactivado)
+SNAPSHOT_FILE = os.getenv('SNAPSHOT_FILE', 'data/warm_snapshot.pkl')
+SNAPSHOT_INTERVAL = 900
+
+# Modo streaming: evaluar señales al cierre de cada vela vía WebSocket
+# en lugar de consultar cada CHECK_INTERVAL segundos
+STREAMING_MODE = os.getenv('STREAMING_MODE', 'false').lower() == 'true'
+
+# URL base de los streams WebSocket de Binance
+BINANCE_WS_URL = os.getenv('BINANCE_WS_URL', 'wss://stream.binance.com:9443')
+
+# Espera inicial y máxima entre reconexiones del WebSocket (en segundos)
+WS_RECONNECT_DELAY = 1
+WS_MAX_RECONNECT_DELAY = 60
+
+# Libro de órdenes local por símbolo (snapshot REST + stream de profundidad):
+# añade las condiciones de desequilibrio comprador y spread estrecho
+ORDERBOOK_ENABLED = os.getenv('ORDERBOOK_ENABLED', 'false').lower() == 'true'
+ORDERBOOK_LEVELS = 100              # Niveles guardados por lado (snapshot de peso 5)
+ORDERBOOK_IMBALANCE_LEVELS = 10     # Mejores niveles usados para el desequilibrio
+ORDERBOOK_MIN_IMBALANCE = 0.1       # (compras - ventas) / total mínimo
+ORDERBOOK_MAX_SPREAD = 0.001        # Spread máximo (0.1%)
+
+# Puerto del endpoint local de métricas en formato Prometheus (0 = desactivado)
+METRICS_PORT = int(os.getenv('METRICS_PORT', '9108'))
+METRICS_HOST = os.getenv('METRICS_HOST', '127.0.0.1')
+
 # ================================
 # CONFIGURACIÓN DE INDICADORES
 # ================================
@@ -66,6 +153,21 @@ STOCH_D = 3
 # Volumen
 VOLUME_MULTIPLIER = 1.5  # Volumen debe ser X veces el promedio
 
+# Motor incremental: mantiene el estado de cada indicador por símbolo y
+# solo procesa las velas nuevas (mismos valores que la librería ta)
+INCREMENTAL_INDICATORS = True
+
+# Modo batch: en cada ciclo calcula los indicadores y condiciones de todos
+# los símbolos en una sola pasada vectorizada (recomendado con muchos símbolos)
+BATCH_INDICATORS = True
+
+# Intervalos mayores que confirman la tendencia, agregados en memoria desde
+# INTERVAL sin peticiones extra, p. ej. '15m,1h' (vacío = desactivado). Necesitan
+# ~35 velas cerradas para estar listos; con ARCHIVE_ENABLED se precargan desde disco
+HIGHER_TIMEFRAMES = [
+    interval for interval in os.getenv('HIGHER_TIMEFRAMES', '').split(',') if interval
+]
+
 # ================================
 # CONFIGURACIÓN DE SEÑALES
 # ================================
@@ -91,6 +193,12 @@ TAKE_PROFIT_2_PERCENTAGE = 0.06  # 6%
 # Ratio riesgo/recompensa mínimo
 MIN_RISK_REWARD_RATIO = 1.5
 
+# Seguimiento de resultados: cada señal enviada queda abierta hasta tocar su
+# TP2 o su stop loss, o hasta caducar tras OUTCOME_MAX_AGE segundos
+OUTCOME_TRACKING = os.getenv('OUTCOME_TRACKING', 'true').lower() == 'true'
+OUTCOME_MAX_AGE = 172800  # 48 horas
+OUTCOME_NOTIFY = True     # Avisar por Telegram de cada TP/SL alcanzado
+
 # ================================
 # CONFIGURACIÓN DE LOGGING
 # ================================
@@ -99,7 +207,21 @@ LOG_LEVEL = "INFO"
 
 # Guardar logs en archivo
 SAVE_LOGS_TO_FILE = True
-LOG_FILE = "trading_bot.log"
+LOG_FILE = os.getenv('LOG_FILE', "trading_bot.log")
+
+# Rotación del archivo de log: por tamaño, o por tiempo si LOG_ROTATE_WHEN
+# ('midnight', 'H', ...) no está vacío; los archivos rotados se comprimen
+LOG_MAX_BYTES = 10_000_000
+LOG_BACKUP_COUNT = 5
+LOG_ROTATE_WHEN = os.getenv('LOG_ROTATE_WHEN', '')
+LOG_COMPRESS = True
+
+# Archivo de log en JSON lines (campos symbol, phase y duration)
+LOG_JSON = os.getenv('LOG_JSON', 'false').lower() == 'true'
+
+# Con más símbolos activos que este límite los mensajes por símbolo
+# ("Analizando ...") bajan a DEBUG y solo queda el resumen de cada ciclo
+LOG_SYMBOL_DETAIL_LIMIT = 20
 
 # ================================
 # CONFIGURACIÓN DE NOTIFICACIONES
@@ -110,3 +232,22 @@ SEND_ERROR_NOTIFICATIONS = True
 
 # Formato de mensajes
 MESSAGE_FORMAT = "HTML"  # HTML o Markdown
+
+# URL base de la Bot API de Telegram
+TELEGRAM_API_URL = os.getenv('TELEGRAM_API_URL', 'https://api.telegram.org')
+
+# Reintentos por mensaje ante errores de red, 5xx o rate limit (429)
+TELEGRAM_MAX_RETRIES = 5
+
+# Límites de envío de Telegram: mensajes por segundo en total y segundos
+# entre mensajes a un mismo chat (privado / grupo o canal), e hilos de envío
+TELEGRAM_GLOBAL_RATE = 30
+TELEGRAM_CHAT_INTERVAL = 1.0
+TELEGRAM_GROUP_INTERVAL = 3.0
+TELEGRAM_WORKERS = 4
+
+# Chats suscritos con su filtro de símbolos (python subscribers.py add ...);
+# sin fichero las alertas van solo a CHAT_ID. Los chats con resumen reciben
+# las señales de cada ciclo en un mensaje, como mucho DIGEST_WINDOW s después
+SUBSCRIBERS_FILE = os.getenv('SUBSCRIBERS_FILE', 'data/subscribers.json')
+DIGEST_WINDOW = 5
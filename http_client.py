@@ -0,0 +1,187 @@
+"""
+Capa HTTP común: conexiones keep-alive compartidas y control del peso de API de Binance
+
+Todas las llamadas salientes (python-binance, escáner, Telegram y la descarga
+concurrente de velas) reutilizan los mismos pools de conexiones, así que no
+se repite el handshake TLS en cada ciclo. WeightGovernor es un token bucket
+que se corrige con la cabecera X-MBX-USED-WEIGHT-1M de cada respuesta:
+espacia las peticiones antes de acercarse al límite del minuto y, ante un
+429 o un 418 (IP baneada), detiene todas las peticiones durante Retry-After.
+"""
+
+import asyncio
+import atexit
+import logging
+import threading
+import time
+
+import aiohttp
+import requests
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+# Cabecera con el peso de API consumido en el último minuto
+USED_WEIGHT_HEADER = "X-MBX-USED-WEIGHT-1M"
+
+# Espera por defecto si un 429/418 no trae Retry-After (segundos)
+DEFAULT_BACKOFF = {429: 60, 418: 120}
+
+
+def kline_weight(limit):
+    """Peso de una petición de velas según su limit (tabla de pesos de Binance)"""
+    if limit < 100:
+        return 1
+    if limit < 500:
+        return 2
+    if limit <= 1000:
+        return 5
+    return 10
+
+
+class WeightGovernor:
+    """Token bucket del peso de API por minuto, sincronizado con las cabeceras de Binance
+
+    reserve() no bloquea: descuenta el peso y devuelve cuántos segundos hay
+    que esperar antes de enviar, para usarlo tanto con time.sleep como con
+    asyncio.sleep. Es seguro entre hilos.
+    """
+
+    def __init__(self, limit=6000, window=60.0, headroom=0.8, metrics=None, clock=time.monotonic):
+        # Se deja un margen bajo el límite real para otras herramientas con la misma IP
+        self.capacity = limit * headroom
+        self.rate = self.capacity / window
+        self.metrics = metrics
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._tokens = self.capacity
+        self._updated = clock()
+        self.blocked_until = 0.0
+
+    def _refill(self, now):
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def reserve(self, weight=1):
+        """Reserva `weight` y devuelve los segundos de espera antes de la petición"""
+        with self._lock:
+            now = self.clock()
+            self._refill(now)
+            self._tokens -= weight
+            delay = max(0.0, -self._tokens / self.rate, self.blocked_until - now)
+        if self.metrics is not None and delay > 0:
+            self.metrics.inc("rest_throttled_total")
+            self.metrics.observe("rest_throttle_seconds", delay)
+        return delay
+
+    def acquire(self, weight=1):
+        """Versión bloqueante de reserve"""
+        delay = self.reserve(weight)
+        if delay > 0:
+            time.sleep(delay)
+
+    async def acquire_async(self, weight=1):
+        delay = self.reserve(weight)
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    def observe(self, status, headers):
+        """Ajusta el bucket con el peso usado que informa Binance y aplica backoff en 429/418"""
+        used = headers.get(USED_WEIGHT_HEADER)
+        now = self.clock()
+        with self._lock:
+            if used and used.isdigit():
+                self._refill(now)
+                self._tokens = min(self._tokens, self.capacity - int(used))
+            if status in DEFAULT_BACKOFF:
+                retry_after = headers.get("Retry-After")
+                wait = float(retry_after) if retry_after and retry_after.isdigit() else DEFAULT_BACKOFF[status]
+                self.blocked_until = max(self.blocked_until, now + wait)
+        if self.metrics is not None:
+            if used and used.isdigit():
+                self.metrics.set_gauge("rest_used_weight", int(used))
+            if status in DEFAULT_BACKOFF:
+                self.metrics.inc("rest_backoff_total", status=status)
+        if status in DEFAULT_BACKOFF:
+            reason = "IP baneada" if status == 418 else "rate limit"
+            logger.warning(f"🚦 Binance respondió {status} ({reason}): pausa de {wait:.0f}s en todas las peticiones")
+
+    def available(self):
+        """Peso disponible ahora mismo en el bucket"""
+        with self._lock:
+            self._refill(self.clock())
+            return self._tokens
+
+
+# ---- Pools de conexiones compartidos ----
+
+_adapter = None
+_adapter_lock = threading.Lock()
+
+
+def shared_adapter(pool_maxsize=20):
+    """HTTPAdapter común: los pools de conexiones por host se comparten entre sesiones"""
+    global _adapter
+    with _adapter_lock:
+        if _adapter is None:
+            _adapter = HTTPAdapter(pool_connections=8, pool_maxsize=pool_maxsize)
+        return _adapter
+
+
+def use_shared_pool(session):
+    """Monta el adaptador compartido en una sesión existente (conserva sus cabeceras)"""
+    adapter = shared_adapter()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def pooled_session():
+    """Sesión requests nueva sobre los pools compartidos"""
+    return use_shared_pool(requests.Session())
+
+
+class AsyncPool:
+    """Bucle de eventos en un hilo propio con una sesión aiohttp persistente
+
+    Mantiene las conexiones keep-alive con Binance entre ciclos, cosa que no
+    es posible con un asyncio.run (y una sesión nueva) por ciclo.
+    """
+
+    def __init__(self, max_connections=10):
+        self.max_connections = max_connections
+        self._loop = asyncio.new_event_loop()
+        self._session = None
+        self._thread = threading.Thread(target=self._loop.run_forever, name="http-async", daemon=True)
+        self._thread.start()
+
+    async def _get_session(self):
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(limit=self.max_connections, keepalive_timeout=60)
+            self._session = aiohttp.ClientSession(connector=connector)
+        return self._session
+
+    def run(self, make_coroutine):
+        """Ejecuta make_coroutine(session) en el bucle y espera su resultado"""
+        async def runner():
+            return await make_coroutine(await self._get_session())
+        return asyncio.run_coroutine_threadsafe(runner(), self._loop).result()
+
+    def close(self):
+        if self._session is not None:
+            asyncio.run_coroutine_threadsafe(self._session.close(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+
+
+_async_pool = None
+
+
+def async_pool(max_connections=10):
+    """AsyncPool compartido del proceso (se crea la primera vez)"""
+    global _async_pool
+    with _adapter_lock:
+        if _async_pool is None:
+            _async_pool = AsyncPool(max_connections)
+            atexit.register(_async_pool.close)
+        return _async_pool
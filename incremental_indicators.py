@@ -0,0 +1,356 @@
+"""
+Motor de indicadores incremental: actualiza RSI, EMAs, MACD, Bollinger,
+ADX, Estocástico y SMA de volumen en tiempo constante por vela nueva.
+
+Reproduce las fórmulas de la librería `ta` (incluidos sus periodos de
+calentamiento), de modo que, alimentado con la misma secuencia de velas,
+devuelve los mismos valores dentro de la tolerancia de coma flotante.
+"""
+
+import math
+from collections import deque
+
+import numpy as np
+
+NAN = float("nan")
+
+# Valores recientes que se conservan por indicador (check_long_signal lee hasta iloc[-5])
+HISTORY_SIZE = 5
+
+OUTPUTS = (
+    'rsi', 'ema_fast', 'ema_slow', 'macd', 'macd_signal', 'macd_histogram',
+    'bb_upper', 'bb_middle', 'bb_lower', 'bb_width', 'adx',
+    'stoch_k', 'stoch_d', 'volume_sma',
+)
+
+
+class RecentValues:
+    """Últimos valores de un indicador con acceso estilo pandas (.iloc[-k])"""
+
+    __slots__ = ("_values",)
+
+    def __init__(self, values):
+        self._values = values
+
+    @property
+    def iloc(self):
+        return self._values
+
+    def __len__(self):
+        return len(self._values)
+
+
+class _EMA:
+    """Media exponencial equivalente a ewm(alpha, adjust=False, min_periods)"""
+
+    __slots__ = ("alpha", "min_periods", "value", "count")
+
+    def __init__(self, alpha, min_periods):
+        self.alpha = alpha
+        self.min_periods = min_periods
+        self.value = NAN
+        self.count = 0
+
+    def update(self, x, commit=True):
+        # Los NaN iniciales (p. ej. MACD antes de tener EMA lenta) no cuentan
+        if x != x:
+            return NAN
+        value = x if self.count == 0 else (1 - self.alpha) * self.value + self.alpha * x
+        count = self.count + 1
+        if commit:
+            self.value = value
+            self.count = count
+        return value if count >= self.min_periods else NAN
+
+
+class _RollingStats:
+    """Media y desviación típica (ddof=0) sobre una ventana móvil
+
+    Las sumas se llevan desplazadas respecto a un pivote para evitar pérdida
+    de precisión y se recalculan por completo cada `window` velas.
+    """
+
+    __slots__ = ("window", "values", "nan_count", "pivot", "sum", "sumsq", "since_resync")
+
+    def __init__(self, window):
+        self.window = window
+        self.values = deque()
+        self.nan_count = 0
+        self.pivot = None
+        self.sum = 0.0
+        self.sumsq = 0.0
+        self.since_resync = 0
+
+    def _resync(self):
+        valid = [v for v in self.values if v == v]
+        self.pivot = sum(valid) / len(valid) if valid else None
+        self.sum = math.fsum(v - self.pivot for v in valid) if valid else 0.0
+        self.sumsq = math.fsum((v - self.pivot) ** 2 for v in valid) if valid else 0.0
+        self.since_resync = 0
+
+    def update(self, x, commit=True):
+        """Devuelve (media, desviación) con x incluido en la ventana"""
+        pivot = self.pivot if self.pivot is not None else (x if x == x else 0.0)
+        total, totalsq, nan_count = self.sum, self.sumsq, self.nan_count
+
+        if len(self.values) == self.window:
+            old = self.values[0]
+            if old == old:
+                total -= old - pivot
+                totalsq -= (old - pivot) ** 2
+            else:
+                nan_count -= 1
+        if x == x:
+            total += x - pivot
+            totalsq += (x - pivot) ** 2
+        else:
+            nan_count += 1
+
+        size = min(len(self.values) + 1, self.window)
+        if size < self.window or nan_count:
+            mean, std = NAN, NAN
+        else:
+            offset = total / size
+            mean = pivot + offset
+            std = math.sqrt(max(totalsq / size - offset * offset, 0.0))
+
+        if commit:
+            if len(self.values) == self.window:
+                self.values.popleft()
+            self.values.append(x)
+            self.pivot, self.sum, self.sumsq, self.nan_count = pivot, total, totalsq, nan_count
+            self.since_resync += 1
+            if self.since_resync >= self.window:
+                self._resync()
+        return mean, std
+
+
+class _RollingExtreme:
+    """Mínimo o máximo de una ventana móvil con deque monótona (O(1) amortizado)"""
+
+    __slots__ = ("window", "is_min", "items", "index")
+
+    def __init__(self, window, is_min):
+        self.window = window
+        self.is_min = is_min
+        self.items = deque()
+        self.index = 0
+
+    def _better(self, a, b):
+        return a <= b if self.is_min else a >= b
+
+    def update(self, x, commit=True):
+        oldest_valid = self.index - self.window + 1
+        items = self.items
+        # Como mucho el primer elemento puede haber salido de la ventana
+        pos = 0 if not items or items[0][0] >= oldest_valid else 1
+        if pos < len(items):
+            best = items[pos][1]
+            value = x if self._better(x, best) else best
+        else:
+            value = x
+
+        if commit:
+            while items and self._better(x, items[-1][1]):
+                items.pop()
+            items.append((self.index, x))
+            while items[0][0] < oldest_valid:
+                items.popleft()
+            self.index += 1
+        return value if self.index + (0 if commit else 1) >= self.window else NAN
+
+
+class _ADX:
+    """ADX con el suavizado de Wilder tal y como lo implementa ta.trend.ADXIndicator"""
+
+    __slots__ = ("window", "count", "prev_high", "prev_low", "prev_close",
+                 "trs", "dip", "din", "dx_count", "dx_sum", "adx")
+
+    def __init__(self, window):
+        self.window = window
+        self.count = 0
+        self.prev_high = self.prev_low = self.prev_close = None
+        self.trs = self.dip = self.din = 0.0
+        self.dx_count = 0
+        self.dx_sum = 0.0
+        self.adx = 0.0
+
+    def update(self, high, low, close, commit=True):
+        window = self.window
+        if self.prev_close is None:
+            if commit:
+                self.prev_high, self.prev_low, self.prev_close = high, low, close
+                self.count = 1
+            return 0.0
+
+        true_range = max(high, self.prev_close) - min(low, self.prev_close)
+        diff_up = high - self.prev_high
+        diff_down = self.prev_low - low
+        pos = diff_up if diff_up > diff_down and diff_up > 0 else 0.0
+        neg = diff_down if diff_down > diff_up and diff_down > 0 else 0.0
+
+        # Las primeras `window` velas se suman; después se suaviza
+        if self.count <= window:
+            trs, dip, din = self.trs + true_range, self.dip + pos, self.din + neg
+        else:
+            trs = self.trs - self.trs / window + true_range
+            dip = self.dip - self.dip / window + pos
+            din = self.din - self.din / window + neg
+
+        dx_count, dx_sum, adx = self.dx_count, self.dx_sum, self.adx
+        if self.count >= window:
+            di_pos = 100 * (dip / trs) if trs != 0 else 0.0
+            di_neg = 100 * (din / trs) if trs != 0 else 0.0
+            di_sum = di_pos + di_neg
+            dx = 100 * abs((di_pos - di_neg) / di_sum) if di_sum != 0 else 0.0
+            dx_count += 1
+            if dx_count < window:
+                dx_sum += dx
+            elif dx_count == window:
+                adx = (dx_sum + dx) / window
+            else:
+                adx = (adx * (window - 1) + dx) / window
+
+        if commit:
+            self.prev_high, self.prev_low, self.prev_close = high, low, close
+            self.trs, self.dip, self.din = trs, dip, din
+            self.dx_count, self.dx_sum, self.adx = dx_count, dx_sum, adx
+            self.count += 1
+        return adx if dx_count >= window else 0.0
+
+
+class SymbolIndicators:
+    """Estado recursivo de todos los indicadores de un símbolo"""
+
+    def __init__(self, rsi_period, ema_fast, ema_slow, ema_signal, bb_period, bb_std,
+                 adx_period, stoch_k, stoch_d, volume_period=20):
+        self.bb_std = bb_std
+        self.prev_close = None
+        self.rsi_up = _EMA(1 / rsi_period, rsi_period)
+        self.rsi_down = _EMA(1 / rsi_period, rsi_period)
+        self.ema_fast = _EMA(2 / (ema_fast + 1), ema_fast)
+        self.ema_slow = _EMA(2 / (ema_slow + 1), ema_slow)
+        self.macd_signal = _EMA(2 / (ema_signal + 1), ema_signal)
+        self.bb = _RollingStats(bb_period)
+        self.adx = _ADX(adx_period)
+        self.stoch_low = _RollingExtreme(stoch_k, is_min=True)
+        self.stoch_high = _RollingExtreme(stoch_k, is_min=False)
+        self.stoch_d = _RollingStats(stoch_d)
+        self.volume_sma = _RollingStats(volume_period)
+        self.history = {name: deque(maxlen=HISTORY_SIZE) for name in OUTPUTS}
+        self.last_open_time = None
+
+    def update(self, high, low, close, volume, commit=True):
+        """Procesa una vela; con commit=False solo calcula (vela aún abierta)"""
+        # RSI (Wilder)
+        diff = close - self.prev_close if self.prev_close is not None else 0.0
+        up = self.rsi_up.update(diff if diff > 0 else 0.0, commit)
+        down = self.rsi_down.update(-diff if diff < 0 else 0.0, commit)
+        if down != down:
+            rsi = NAN
+        elif down == 0:
+            rsi = 100.0
+        else:
+            rsi = 100 - 100 / (1 + up / down)
+
+        # EMAs y MACD
+        ema_fast = self.ema_fast.update(close, commit)
+        ema_slow = self.ema_slow.update(close, commit)
+        macd = ema_fast - ema_slow
+        macd_signal = self.macd_signal.update(macd, commit)
+
+        # Bollinger Bands
+        bb_middle, bb_dev = self.bb.update(close, commit)
+        bb_upper = bb_middle + self.bb_std * bb_dev
+        bb_lower = bb_middle - self.bb_std * bb_dev
+
+        # Estocástico
+        lowest = self.stoch_low.update(low, commit)
+        highest = self.stoch_high.update(high, commit)
+        span = highest - lowest
+        stoch_k = 100 * (close - lowest) / span if span != 0 else NAN
+        stoch_d, _ = self.stoch_d.update(stoch_k, commit)
+
+        volume_sma, _ = self.volume_sma.update(volume, commit)
+
+        if commit:
+            self.prev_close = close
+
+        return {
+            'rsi': rsi,
+            'ema_fast': ema_fast,
+            'ema_slow': ema_slow,
+            'macd': macd,
+            'macd_signal': macd_signal,
+            'macd_histogram': macd - macd_signal,
+            'bb_upper': bb_upper,
+            'bb_middle': bb_middle,
+            'bb_lower': bb_lower,
+            'bb_width': (bb_upper - bb_lower) / bb_middle,
+            'adx': self.adx.update(high, low, close, commit),
+            'stoch_k': stoch_k,
+            'stoch_d': stoch_d,
+            'volume_sma': volume_sma,
+        }
+
+    def commit(self, high, low, close, volume):
+        """Incorpora una vela cerrada al estado y al histórico"""
+        values = self.update(high, low, close, volume, commit=True)
+        for name, value in values.items():
+            self.history[name].append(value)
+
+    def snapshot(self, high, low, close, volume):
+        """Indicadores con la última vela (provisional) sin alterar el estado"""
+        values = self.update(high, low, close, volume, commit=False)
+        return {
+            name: RecentValues(list(self.history[name]) + [value])
+            for name, value in values.items()
+        }
+
+
+
+class IndicatorEngine:
+    """Mantiene un SymbolIndicators por símbolo y lo alimenta desde las velas en caché
+
+    Todas las filas salvo la última se consideran cerradas y se incorporan al
+    estado una sola vez; la última se evalúa de forma provisional en cada
+    llamada y se incorpora cuando aparece una vela posterior. Si las velas
+    ya no contienen la última vela incorporada (hueco), el estado se reconstruye.
+    """
+
+    def __init__(self, **params):
+        self.params = params
+        self._states = {}
+
+    def reset(self, symbol):
+        self._states.pop(symbol, None)
+
+    def update(self, symbol, df):
+        """Devuelve el dict de indicadores (con .iloc[-k]) para la última vela de df"""
+        open_times = np.asarray(df["open_time"])
+        highs = np.asarray(df["high"])
+        lows = np.asarray(df["low"])
+        closes = np.asarray(df["close"])
+        volumes = np.asarray(df["volume"])
+        last = len(df) - 1
+
+        state = self._states.get(symbol)
+        start = 0
+        if state is not None and state.last_open_time is not None:
+            # Primera fila aún no incorporada
+            start = int(open_times.searchsorted(state.last_open_time, side="right"))
+            if start == 0 or open_times[start - 1] != state.last_open_time:
+                state = None
+                start = 0
+        else:
+            state = None
+        if state is None:
+            state = SymbolIndicators(**self.params)
+            self._states[symbol] = state
+
+        for i in range(start, last):
+            state.commit(float(highs[i]), float(lows[i]), float(closes[i]), float(volumes[i]))
+            state.last_open_time = open_times[i]
+
+        return state.snapshot(float(highs[last]), float(lows[last]),
+                              float(closes[last]), float(volumes[last]))
@@ -0,0 +1,125 @@
+"""
+Buffer incremental de velas en memoria por símbolo e intervalo
+"""
+
+import time
+
+import numpy as np
+
+# Campos que se conservan de cada vela (timestamps en ms como int64)
+KLINE_FIELDS = ('open_time', 'open', 'high', 'low', 'close', 'volume', 'close_time')
+KLINE_DTYPE = np.dtype([
+    ('open_time', np.int64),
+    ('open', np.float64),
+    ('high', np.float64),
+    ('low', np.float64),
+    ('close', np.float64),
+    ('volume', np.float64),
+    ('close_time', np.int64),
+])
+KLINE_DTYPE_FLOAT32 = np.dtype([
+    (name, np.float32 if dtype == np.float64 else dtype)
+    for name, (dtype, _) in KLINE_DTYPE.fields.items()
+])
+
+# Posición de cada campo en las filas de la API REST
+_FIELD_POSITIONS = (0, 1, 2, 3, 4, 5, 6)
+
+# Duración de cada intervalo de Binance en milisegundos
+INTERVAL_MS = {
+    "1m": 60_000,
+    "3m": 180_000,
+    "5m": 300_000,
+    "15m": 900_000,
+    "30m": 1_800_000,
+    "1h": 3_600_000,
+    "2h": 7_200_000,
+    "4h": 14_400_000,
+    "6h": 21_600_000,
+    "8h": 28_800_000,
+    "12h": 43_200_000,
+    "1d": 86_400_000,
+    "3d": 259_200_000,
+    "1w": 604_800_000,
+}
+
+
+def parse_klines(klines, float32=False):
+    """Convierte la respuesta cruda de velas en un array estructurado de NumPy
+
+    Solo se guardan los campos que usan los indicadores; los precios se
+    convierten directamente desde las cadenas de la API al array reservado.
+    """
+    out = np.empty(len(klines), dtype=KLINE_DTYPE_FLOAT32 if float32 else KLINE_DTYPE)
+    for name, position in zip(KLINE_FIELDS, _FIELD_POSITIONS):
+        out[name] = [row[position] for row in klines]
+    return out
+
+
+class KlineCache:
+    """Mantiene las últimas `capacity` velas de cada (símbolo, intervalo)
+
+    Tras el warm-up solo se piden a la API las velas desde el open_time de la
+    última vela guardada: esa vela (posiblemente aún abierta) se reemplaza,
+    se añaden las nuevas y se descartan las más antiguas.
+    """
+
+    def __init__(self, capacity=200, float32=False):
+        self.capacity = capacity
+        self.float32 = float32
+        self._frames = {}
+        self._last_open_time = {}
+
+    def __len__(self):
+        """Número de series (símbolo, intervalo) en caché"""
+        return len(self._frames)
+
+    def start_time(self, symbol, interval, now_ms=None):
+        """open_time (ms) desde el que pedir velas, o None si hace falta warm-up"""
+        last_open = self._last_open_time.get((symbol, interval))
+        if last_open is None:
+            return None
+
+        # Si el hueco no cabe en el buffer es más barato recargarlo entero
+        interval_ms = INTERVAL_MS.get(interval)
+        now_ms = now_ms if now_ms is not None else int(time.time() * 1000)
+        if interval_ms is None or (now_ms - last_open) // interval_ms >= self.capacity:
+            return None
+        return last_open
+
+    def fetch_limit(self, symbol, interval, limit, now_ms=None):
+        """limit ajustado a las velas que faltan: las peticiones pequeñas pesan menos en la API"""
+        start = self.start_time(symbol, interval, now_ms)
+        if start is None:
+            return limit
+        now_ms = now_ms if now_ms is not None else int(time.time() * 1000)
+        # Velas con open_time entre la última guardada y ahora, más una de margen
+        missing = (now_ms - start) // INTERVAL_MS[interval] + 2
+        return int(min(limit, missing))
+
+    def update(self, symbol, interval, klines):
+        """Fusiona velas crudas de la API en el buffer y devuelve las velas actuales"""
+        key = (symbol, interval)
+        previous = self._frames.get(key)
+        if not klines:
+            return previous
+
+        new = parse_klines(klines, self.float32)
+        if previous is None or len(new) >= self.capacity:
+            merged = new[-self.capacity:]
+        else:
+            kept = np.searchsorted(previous["open_time"], new["open_time"][0])
+            merged = np.concatenate([previous[:kept], new])[-self.capacity:]
+
+        self._frames[key] = merged
+        self._last_open_time[key] = int(new["open_time"][-1])
+        return merged
+
+    def get(self, symbol, interval):
+        """Velas en caché para (símbolo, intervalo), o None"""
+        return self._frames.get((symbol, interval))
+
+    def invalidate(self, symbol, interval):
+        """Descarta el buffer para forzar un warm-up completo"""
+        self._frames.pop((symbol, interval), None)
+        self._last_open_time.pop((symbol, interval), None)
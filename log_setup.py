@@ -0,0 +1,145 @@
+"""
+Logging asíncrono con rotación y formato JSON opcional
+
+Los hilos del bot solo encolan cada registro (QueueHandler, sin bloquear);
+un QueueListener en segundo plano escribe en consola y en el fichero, así
+que un disco lento no frena el ciclo de análisis. El fichero rota por
+tamaño (o por tiempo con `when`, p. ej. 'midnight') y los ficheros rotados
+se comprimen con gzip. Con json_lines cada línea del fichero es un objeto
+JSON con los campos extra symbol, phase y duration cuando el registro los
+trae (logger.info(..., extra={'symbol': s, 'phase': 'analysis'})).
+"""
+
+import atexit
+import gzip
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import shutil
+from datetime import datetime, timezone
+
+TEXT_FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
+
+# Campos extra que se copian a las líneas JSON
+STRUCTURED_FIELDS = ('symbol', 'phase', 'duration')
+
+_listener = None
+
+
+class JsonFormatter(logging.Formatter):
+    """Un objeto JSON por línea con hora UTC, nivel, logger, mensaje y campos extra"""
+
+    def format(self, record):
+        entry = {
+            'ts': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'msg': record.getMessage(),
+        }
+        for field in STRUCTURED_FIELDS:
+            value = getattr(record, field, None)
+            if value is not None:
+                entry[field] = value
+        if record.exc_info:
+            entry['exc'] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler que descarta (y cuenta) registros si la cola está llena en vez de bloquear"""
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record):
+        # La cola no sale del proceso: basta con fijar el mensaje (los args
+        # podrían cambiar antes de que escriba el listener) sin copiar ni
+        # formatear el registro en el hilo que loguea
+        if record.args:
+            record.msg = record.getMessage()
+            record.args = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class _Listener(logging.handlers.QueueListener):
+    def enqueue_sentinel(self):
+        # Con la cola llena al parar se espera a que el hilo libere un hueco
+        self.queue.put(self._sentinel)
+
+
+def _gzip_rotator(source, destination):
+    with open(source, 'rb') as plain, gzip.open(destination, 'wb') as compressed:
+        shutil.copyfileobj(plain, compressed)
+    os.remove(source)
+
+
+def _file_handler(path, max_bytes, backup_count, when, compress):
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    if when:
+        handler = logging.handlers.TimedRotatingFileHandler(
+            path, when=when, backupCount=backup_count, encoding='utf-8', delay=True)
+    else:
+        handler = logging.handlers.RotatingFileHandler(
+            path, maxBytes=max_bytes, backupCount=backup_count, encoding='utf-8', delay=True)
+    if compress:
+        handler.namer = lambda name: f"{name}.gz"
+        handler.rotator = _gzip_rotator
+    return handler
+
+
+def setup_logging(level="INFO", log_file=None, json_lines=False, max_bytes=10_000_000,
+                  backup_count=5, when=None, compress=True, console=True, max_queue=10000):
+    """Configura el logging raíz a través de una cola; se puede volver a llamar para cambiarlo
+
+    Devuelve el QueueHandler instalado (su atributo dropped cuenta los
+    registros descartados con la cola llena).
+    """
+    global _listener
+    stop_logging()
+
+    handlers = []
+    if console:
+        stream = logging.StreamHandler()
+        stream.setFormatter(logging.Formatter(TEXT_FORMAT))
+        handlers.append(stream)
+    if log_file:
+        file_handler = _file_handler(log_file, max_bytes, backup_count, when, compress)
+        file_handler.setFormatter(JsonFormatter() if json_lines else logging.Formatter(TEXT_FORMAT))
+        handlers.append(file_handler)
+
+    log_queue = queue.Queue(maxsize=max_queue)
+    queue_handler = DroppingQueueHandler(log_queue)
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+        handler.close()
+    root.addHandler(queue_handler)
+    root.setLevel(getattr(logging, level) if isinstance(level, str) else level)
+
+    _listener = _Listener(log_queue, *handlers, respect_handler_level=True)
+    _listener.start()
+    return queue_handler
+
+
+def stop_logging():
+    """Escribe lo pendiente y detiene el hilo del logging"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        _listener = None
+
+
+atexit.register(stop_logging)
@@ -0,0 +1,101 @@
+"""
+Descarga concurrente de velas de Binance con asyncio/aiohttp
+"""
+
+import asyncio
+import logging
+import time
+
+import aiohttp
+
+from http_client import USED_WEIGHT_HEADER, async_pool, kline_weight
+
+logger = logging.getLogger(__name__)
+
+KLINES_ENDPOINT = "/api/v3/klines"
+
+# Reintentos de un símbolo tras un 429/418, una vez pasada la pausa del governor
+RATE_LIMIT_RETRIES = 1
+
+
+async def _fetch_symbol_klines(session, semaphore, base_url, symbol, interval, limit,
+                               start_time=None, metrics=None, used_weights=None,
+                               governor=None, timeout=None):
+    """Descarga las velas de un símbolo respetando el límite de concurrencia y de peso"""
+    params = {"symbol": symbol, "interval": interval, "limit": limit}
+    if start_time is not None:
+        params["startTime"] = start_time
+    for attempt in range(RATE_LIMIT_RETRIES + 1):
+        async with semaphore:
+            if governor is not None:
+                await governor.acquire_async(kline_weight(limit))
+            started = time.perf_counter()
+            async with session.get(f"{base_url}{KLINES_ENDPOINT}", params=params,
+                                   timeout=timeout) as response:
+                if metrics is not None:
+                    metrics.observe("rest_latency_seconds", time.perf_counter() - started, symbol=symbol)
+                    metrics.inc("rest_requests_total", status=response.status)
+                    used_weight = response.headers.get(USED_WEIGHT_HEADER)
+                    if used_weight and used_weight.isdigit():
+                        used_weights.append(int(used_weight))
+                if governor is not None:
+                    governor.observe(response.status, response.headers)
+                if response.status == 200:
+                    return await response.json()
+                body = await response.text()
+                if governor is None or response.status not in (418, 429) or attempt == RATE_LIMIT_RETRIES:
+                    raise RuntimeError(f"HTTP {response.status}: {body[:200]}")
+        # Fuera del semáforo: el governor retiene la repetición hasta que acabe la pausa
+
+
+async def fetch_klines_batch(symbols, interval, limit=200, max_concurrency=10,
+                             base_url="https://api.binance.com", timeout=10,
+                             start_times=None, metrics=None, limits=None,
+                             governor=None, session=None):
+    """Descarga las velas de todos los símbolos en paralelo
+
+    start_times permite pedir, por símbolo, solo las velas desde un open_time
+    (ms) dado, y limits un limit distinto por símbolo. Devuelve un dict
+    {símbolo: lista de velas | Exception}. Un fallo en un símbolo no cancela
+    la descarga del resto. Con un MetricsRegistry en metrics se registran la
+    latencia de cada petición y el peso de API usado; con un WeightGovernor
+    las peticiones se espacian según el peso disponible. Si no se pasa
+    session se abre una sesión aiohttp solo para esta descarga.
+    """
+    start_times = start_times or {}
+    limits = limits or {}
+    used_weights = []
+    semaphore = asyncio.Semaphore(max_concurrency)
+    client_timeout = aiohttp.ClientTimeout(total=timeout)
+
+    async def gather(session):
+        tasks = [
+            _fetch_symbol_klines(session, semaphore, base_url, symbol, interval,
+                                 limits.get(symbol, limit), start_times.get(symbol),
+                                 metrics, used_weights, governor, client_timeout)
+            for symbol in symbols
+        ]
+        return await asyncio.gather(*tasks, return_exceptions=True)
+
+    if session is not None:
+        results = await gather(session)
+    else:
+        connector = aiohttp.TCPConnector(limit=max_concurrency)
+        async with aiohttp.ClientSession(connector=connector) as own_session:
+            results = await gather(own_session)
+
+    if metrics is not None and used_weights and governor is None:
+        # Las respuestas llegan desordenadas: el máximo es el peso más reciente
+        metrics.set_gauge("rest_used_weight", max(used_weights))
+
+    return dict(zip(symbols, results))
+
+
+def fetch_klines_concurrently(symbols, interval, **kwargs):
+    """Punto de entrada síncrono para fetch_klines_batch
+
+    Se ejecuta en el bucle compartido de http_client para reutilizar las
+    conexiones keep-alive entre ciclos.
+    """
+    pool = async_pool(kwargs.get("max_concurrency", 10))
+    return pool.run(lambda session: fetch_klines_batch(symbols, interval, session=session, **kwargs))
@@ -0,0 +1,198 @@
+"""
+Métricas internas del bot (contadores, gauges e histogramas) y endpoint
+HTTP local en formato de texto de Prometheus.
+
+Registrar una observación es una búsqueda en un dict y un bisect bajo un
+lock, así que se puede llamar desde el ciclo de señales sin coste apreciable.
+"""
+
+import bisect
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+logger = logging.getLogger(__name__)
+
+# Límites (en segundos) de los buckets de los histogramas de tiempo
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+PREFIX = "trading_bot_"
+
+
+class _Histogram:
+    """Histograma acumulativo con suma, recuento y máximo"""
+
+    __slots__ = ("buckets", "counts", "sum", "count", "max")
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+        self.max = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+        if value > self.max:
+            self.max = value
+
+
+def _labels_key(labels):
+    return tuple(sorted(labels.items()))
+
+
+def _format_labels(key, extra=None):
+    pairs = list(key) + ([extra] if extra else [])
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{value}"' for name, value in pairs) + "}"
+
+
+class MetricsRegistry:
+    """Almacén de métricas con etiquetas, seguro entre hilos"""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._gauges = {}
+        self._gauge_callbacks = {}
+        self._histograms = {}
+        self._help = {}
+
+    def describe(self, name, text):
+        """Texto de ayuda (# HELP) de una métrica"""
+        self._help[name] = text
+
+    def inc(self, name, value=1, **labels):
+        key = _labels_key(labels)
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0) + value
+
+    def set_gauge(self, name, value, **labels):
+        with self._lock:
+            self._gauges.setdefault(name, {})[_labels_key(labels)] = value
+
+    def retain(self, label, values):
+        """Elimina las series cuya etiqueta `label` no está en `values`
+
+        Con el escáner los símbolos cambian: sin esto cada símbolo que pasa
+        por la lista deja sus series para siempre.
+        """
+        values = set(values)
+        with self._lock:
+            for store in (self._counters, self._gauges, self._histograms):
+                for series in store.values():
+                    stale = [key for key in series
+                             if any(name == label and value not in values for name, value in key)]
+                    for key in stale:
+                        del series[key]
+
+    def gauge_callback(self, name, callback):
+        """Gauge cuyo valor se lee con callback() al exportar"""
+        self._gauge_callbacks[name] = callback
+
+    def observe(self, name, value, **labels):
+        key = _labels_key(labels)
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            histogram = series.get(key)
+            if histogram is None:
+                histogram = series[key] = _Histogram(self.buckets)
+            histogram.observe(value)
+
+    @contextmanager
+    def timer(self, name, **labels):
+        """Mide la duración del bloque en el histograma `name`"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - started, **labels)
+
+    def value(self, name, **labels):
+        """Valor actual de un contador o gauge (0 si no existe)"""
+        key = _labels_key(labels)
+        with self._lock:
+            if name in self._counters:
+                return self._counters[name].get(key, 0)
+            return self._gauges.get(name, {}).get(key, 0)
+
+    def histogram_totals(self, name, **labels):
+        """(recuento, suma, máximo) de un histograma sumando las series que
+        coinciden con las etiquetas dadas (las de valor None se ignoran)"""
+        wanted = {(label, value) for label, value in labels.items() if value is not None}
+        with self._lock:
+            series = [
+                histogram for key, histogram in self._histograms.get(name, {}).items()
+                if wanted.issubset(key)
+            ]
+            return (
+                sum(h.count for h in series),
+                sum(h.sum for h in series),
+                max((h.max for h in series), default=0.0),
+            )
+
+    def render(self):
+        """Todas las métricas en formato de texto de Prometheus"""
+        gauges_from_callbacks = {}
+        for name, callback in self._gauge_callbacks.items():
+            try:
+                gauges_from_callbacks[name] = {(): callback()}
+            except Exception as e:
+                logger.debug(f"Gauge {name} no disponible: {e}")
+
+        lines = []
+        with self._lock:
+            for kind, metrics in (("counter", self._counters), ("gauge", self._gauges),
+                                  ("gauge", gauges_from_callbacks)):
+                for name, series in sorted(metrics.items()):
+                    self._header(lines, name, kind)
+                    for key, value in series.items():
+                        lines.append(f"{PREFIX}{name}{_format_labels(key)} {value}")
+
+            for name, series in sorted(self._histograms.items()):
+                self._header(lines, name, "histogram")
+                for key, histogram in series.items():
+                    cumulative = 0
+                    for bound, count in zip(self.buckets + ("+Inf",), histogram.counts):
+                        cumulative += count
+                        lines.append(f"{PREFIX}{name}_bucket{_format_labels(key, ('le', bound))} {cumulative}")
+                    lines.append(f"{PREFIX}{name}_sum{_format_labels(key)} {histogram.sum}")
+                    lines.append(f"{PREFIX}{name}_count{_format_labels(key)} {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+    def _header(self, lines, name, kind):
+        if name in self._help:
+            lines.append(f"# HELP {PREFIX}{name} {self._help[name]}")
+        lines.append(f"# TYPE {PREFIX}{name} {kind}")
+
+
+def start_metrics_server(registry, port, host="127.0.0.1"):
+    """Sirve registry.render() en http://host:port/metrics desde un hilo en segundo plano"""
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] not in ("/", "/metrics"):
+                self.send_error(404)
+                return
+            body = registry.render().encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="metrics-server", daemon=True).start()
+    logger.info(f"📈 Métricas disponibles en http://{host}:{server.server_port}/metrics")
+    return server
@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+"""
+Exchange simulado para verificar el control de peso de API sin tocar Binance
+
+Sirve /api/v3/klines, /api/v3/ticker/24hr y /api/v3/ping con velas
+sintéticas, lleva la cuenta del peso usado por minuto y lo devuelve en
+X-MBX-USED-WEIGHT-1M. Al superar el límite responde 429 con Retry-After, y
+si se sigue insistiendo durante la pausa, 418, igual que Binance.
+
+Uso:
+    python mock_exchange.py serve --port 8099 --weight-limit 1200
+    BINANCE_API_URL=http://127.0.0.1:8099 python advanced_trading_bot.py
+    python mock_exchange.py check --symbols 100 --rounds 3 --weight-limit 600
+"""
+
+import argparse
+import json
+import logging
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from http_client import USED_WEIGHT_HEADER, WeightGovernor, kline_weight
+from synthetic_data import synthetic_klines
+from universe import TICKER_WEIGHT
+
+logger = logging.getLogger(__name__)
+
+
+class MockExchange:
+    """Estado del exchange simulado: velas por símbolo y peso usado en el minuto actual"""
+
+    def __init__(self, weight_limit=6000, window=60.0, retry_after=5, clock=time.time):
+        self.weight_limit = weight_limit
+        self.window = window
+        self.retry_after = retry_after
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._window_start = None
+        self.used = 0
+        self.blocked_until = 0.0
+        self.status_counts = {}
+        self._series = {}
+
+    def charge(self, weight):
+        """Cobra el peso de una petición; devuelve (status, peso usado en el minuto)"""
+        with self._lock:
+            now = self.clock()
+            window_start = now - now % self.window
+            if window_start != self._window_start:
+                self._window_start = window_start
+                self.used = 0
+            if now < self.blocked_until:
+                status = 418
+            else:
+                self.used += weight
+                status = 429 if self.used > self.weight_limit else 200
+                if status == 429:
+                    self.blocked_until = now + self.retry_after
+            self.status_counts[status] = self.status_counts.get(status, 0) + 1
+            return status, self.used
+
+    def klines(self, symbol, interval, limit, start_time=None):
+        key = (symbol, interval)
+        with self._lock:
+            if key not in self._series:
+                self._series[key] = synthetic_klines(symbol, interval=interval)
+            rows = self._series[key]
+        if start_time is not None:
+            rows = [row for row in rows if row[0] >= start_time]
+            return rows[:limit]
+        return rows[-limit:]
+
+    def tickers(self):
+        with self._lock:
+            symbols = sorted({symbol for symbol, _ in self._series}) or ["BTCUSDT", "ETHUSDT"]
+        return [
+            {"symbol": symbol, "quoteVolume": "1000000", "priceChangePercent": "1.0",
+             "bidPrice": "99.9", "askPrice": "100.0", "count": 1000}
+            for symbol in symbols
+        ]
+
+
+def _make_handler(exchange):
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            url = urlparse(self.path)
+            query = {key: values[0] for key, values in parse_qs(url.query).items()}
+            if url.path == "/api/v3/klines":
+                limit = int(query.get("limit", 500))
+                weight = kline_weight(limit)
+                body = lambda: exchange.klines(query["symbol"], query.get("interval", "5m"), limit,
+                                               int(query["startTime"]) if "startTime" in query else None)
+            elif url.path == "/api/v3/ticker/24hr":
+                weight, body = TICKER_WEIGHT, exchange.tickers
+            elif url.path == "/api/v3/ping":
+                weight, body = 1, dict
+            else:
+                self.send_error(404)
+                return
+
+            status, used = exchange.charge(weight)
+            if status == 200:
+                payload = json.dumps(body()).encode()
+            else:
+                payload = json.dumps({"code": -1003, "msg": "Too many requests"}).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.send_header(USED_WEIGHT_HEADER, str(used))
+            if status != 200:
+                self.send_header("Retry-After", str(exchange.retry_after))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+def start_mock_exchange(exchange, port=0, host="127.0.0.1"):
+    """Arranca el servidor en segundo plano; devuelve (servidor, url base)"""
+    server = ThreadingHTTPServer((host, port), _make_handler(exchange))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="mock-exchange", daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}"
+
+
+def run_check(symbols=200, rounds=5, weight_limit=600, window=10.0, limit=200):
+    """Descarga velas de `symbols` símbolos `rounds` veces contra el mock con el governor
+
+    La ventana de peso se acorta (window segundos en lugar de 60) para que
+    la prueba dure poco. Devuelve (respuestas por status, segundos totales).
+    Sin governor un límite bajo provoca 429/418; con él todas deberían ser 200.
+    """
+    from market_data import fetch_klines_concurrently
+
+    exchange = MockExchange(weight_limit=weight_limit, window=window)
+    server, base_url = start_mock_exchange(exchange)
+    governor = WeightGovernor(weight_limit, window=window, headroom=0.8)
+    names = [f"SYM{i:04d}USDT" for i in range(symbols)]
+    started = time.perf_counter()
+    try:
+        for _ in range(rounds):
+            fetch_klines_concurrently(names, "5m", limit=limit, base_url=base_url, governor=governor)
+    finally:
+        server.shutdown()
+    return dict(exchange.status_counts), time.perf_counter() - started
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description="Exchange simulado con cabeceras de peso")
+    parser.add_argument("command", choices=["serve", "check"])
+    parser.add_argument("--port", type=int, default=8099)
+    parser.add_argument("--weight-limit", type=int, default=6000)
+    parser.add_argument("--symbols", type=int, default=100)
+    parser.add_argument("--rounds", type=int, default=3)
+    parser.add_argument("--window", type=float, default=10.0, help="ventana de peso del check (segundos)")
+    args = parser.parse_args()
+
+    if args.command == "serve":
+        server, base_url = start_mock_exchange(MockExchange(args.weight_limit), args.port)
+        print(f"🧪 Exchange simulado en {base_url} (límite {args.weight_limit}/min)")
+        try:
+            threading.Event().wait()
+        except KeyboardInterrupt:
+            server.shutdown()
+        return
+
+    counts, elapsed = run_check(args.symbols, args.rounds, args.weight_limit, args.window)
+    print(f"📊 Respuestas: {counts} en {elapsed:.1f}s")
+    if set(counts) - {200}:
+        print("❌ El governor no evitó los 429/418")
+        raise SystemExit(1)
+    print("✅ Sin 429/418")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""
+Servidor WebSocket local que imita los streams combinados de velas de Binance
+
+Acepta /stream?streams=btcusdt@kline_5m/... y envía a cada conexión los
+eventos kline de sus símbolos con el mismo formato que Binance (vela en
+curso con x=false y vela cerrada con x=true). drop_connections() corta
+todas las conexiones para probar la reconexión y el relleno de huecos.
+
+Uso:
+    python mock_stream.py serve --port 8765 --symbols BTCUSDT ETHUSDT --interval 1m --speed 60
+    STREAMING_MODE=true BINANCE_WS_URL=ws://127.0.0.1:8765 python advanced_trading_bot.py
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import random
+import time
+
+from aiohttp import WSMsgType, web
+
+from kline_cache import INTERVAL_MS
+
+
+def kline_row_to_event(symbol, interval, row, closed=True):
+    """Evento kline del stream combinado a partir de una fila en formato REST"""
+    return {
+        "stream": f"{symbol.lower()}@kline_{interval}",
+        "data": {
+            "e": "kline",
+            "E": int(time.time() * 1000),
+            "s": symbol,
+            "k": {
+                "t": int(row[0]), "T": int(row[6]), "s": symbol, "i": interval,
+                "o": str(row[1]), "h": str(row[2]), "l": str(row[3]), "c": str(row[4]),
+                "v": str(row[5]), "n": int(row[8]), "x": closed, "q": str(row[7]),
+                "V": "0", "Q": "0", "B": "0",
+            },
+        },
+    }
+
+
+class MockKlineStream:
+    """Servidor de streams de velas; se usa desde un bucle asyncio"""
+
+    def __init__(self, interval="5m"):
+        self.interval = interval
+        self.url = None
+        self.connections = 0
+        self._sockets = {}          # ws -> símbolos suscritos
+        self._runner = None
+
+    async def start(self, host="127.0.0.1", port=0):
+        """Arranca el servidor y devuelve su URL base (ws://host:puerto)"""
+        app = web.Application()
+        app.router.add_get("/stream", self._handle)
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, host, port)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        self.url = f"ws://{host}:{port}"
+        return self.url
+
+    async def stop(self):
+        await self.drop_connections()
+        if self._runner is not None:
+            await self._runner.cleanup()
+
+    async def _handle(self, request):
+        streams = request.query.get("streams", "")
+        symbols = {stream.split("@")[0].upper() for stream in streams.split("/") if stream}
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        self._sockets[ws] = symbols
+        self.connections += 1
+        try:
+            async for msg in ws:
+                if msg.type == WSMsgType.ERROR:
+                    break
+        finally:
+            self._sockets.pop(ws, None)
+        return ws
+
+    async def publish(self, symbol, row, closed=True):
+        """Envía la vela `row` (formato REST) a las conexiones suscritas a `symbol`"""
+        payload = json.dumps(kline_row_to_event(symbol, self.interval, row, closed))
+        for ws, symbols in list(self._sockets.items()):
+            if symbol in symbols and not ws.closed:
+                await ws.send_str(payload)
+
+    async def drop_connections(self):
+        """Cierra todas las conexiones abiertas, como un corte de Binance"""
+        for ws in list(self._sockets):
+            await ws.close()
+
+    def connected(self):
+        return len(self._sockets)
+
+    async def wait_connected(self, count=1, total=None, timeout=5.0):
+        """Espera a tener `count` conexiones abiertas (y `total` conexiones desde el arranque)"""
+        deadline = time.monotonic() + timeout
+        while self.connected() < count or (total is not None and self.connections < total):
+            if time.monotonic() > deadline:
+                raise TimeoutError("el cliente no se conectó al stream simulado")
+            await asyncio.sleep(0.01)
+
+
+async def serve(symbols, interval, port, speed, tick):
+    """Emite velas de un paseo aleatorio: la vela en curso cada `tick` s y cerrada al acabar
+
+    El mercado avanza `speed` segundos por segundo real.
+    """
+    stream = MockKlineStream(interval)
+    url = await stream.start(port=port)
+    print(f"🧪 Stream de velas simulado en {url} ({', '.join(symbols)} {interval}, x{speed:g})")
+
+    step = INTERVAL_MS[interval]
+    started, origin = time.monotonic(), int(time.time() * 1000)
+    prices = {symbol: 100.0 for symbol in symbols}
+    candles = {}
+    while True:
+        now_ms = origin + int((time.monotonic() - started) * speed * 1000)
+        open_time = now_ms // step * step
+        for symbol in symbols:
+            row = candles.get(symbol)
+            if row is not None and row[0] != open_time:
+                await stream.publish(symbol, row, closed=True)
+                row = None
+            price = prices[symbol] = prices[symbol] * (1 + random.gauss(0, 0.001))
+            if row is None:
+                row = candles[symbol] = [open_time, price, price, price, price, 0.0,
+                                         open_time + step - 1, 0.0, 0]
+            row[2], row[3], row[4] = max(row[2], price), min(row[3], price), price
+            row[5] += random.uniform(0, 5)
+            row[7] = row[5] * price
+            row[8] += 1
+            await stream.publish(symbol, row, closed=False)
+        await asyncio.sleep(tick)
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description="Streams de velas de Binance simulados")
+    parser.add_argument("command", choices=["serve"])
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--symbols", nargs="+", default=["BTCUSDT", "ETHUSDT"])
+    parser.add_argument("--interval", default="1m")
+    parser.add_argument("--speed", type=float, default=1.0, help="segundos de mercado por segundo real")
+    parser.add_argument("--tick", type=float, default=1.0, help="segundos entre actualizaciones")
+    args = parser.parse_args()
+
+    try:
+        asyncio.run(serve([symbol.upper() for symbol in args.symbols], args.interval,
+                          args.port, args.speed, args.tick))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Bot API de Telegram simulada para probar la cola de envío sin Telegram
+
+Sirve POST /bot<token>/sendMessage y guarda cada mensaje recibido con su
+instante. Se pueden programar respuestas por chat (429 con retry_after,
+5xx...) que se consumen en orden antes de volver a 200, y limitar cada
+chat a un mensaje por intervalo respondiendo 429 como Telegram.
+
+Uso:
+    python mock_telegram.py serve --port 8098 --chat-interval 1
+    TELEGRAM_API_URL=http://127.0.0.1:8098 python advanced_trading_bot.py
+"""
+
+import argparse
+import json
+import logging
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+logger = logging.getLogger(__name__)
+
+
+class MockTelegram:
+    """Estado del servidor: mensajes recibidos y respuestas programadas por chat"""
+
+    def __init__(self, chat_interval=0.0):
+        self.chat_interval = chat_interval
+        self.received = []          # (instante monotonic, chat_id, texto) de los mensajes aceptados
+        self.attempts = []          # (instante monotonic, chat_id, status) de todas las peticiones
+        self._scripts = {}
+        self._last_sent = {}
+        self._lock = threading.Lock()
+
+    def script(self, chat_id, *responses):
+        """Programa respuestas para `chat_id`: status (500) o (429, retry_after)"""
+        with self._lock:
+            self._scripts.setdefault(str(chat_id), deque()).extend(responses)
+
+    def respond(self, chat_id, text):
+        """Devuelve (status, cuerpo JSON) para un sendMessage"""
+        now = time.monotonic()
+        with self._lock:
+            scripted = self._scripts.get(chat_id)
+            response = scripted.popleft() if scripted else None
+            if response is None and self.chat_interval:
+                wait = self._last_sent.get(chat_id, float("-inf")) + self.chat_interval - now
+                if wait > 0:
+                    response = (429, max(1, int(wait + 0.999)))
+            status, retry_after = response if isinstance(response, tuple) else (response or 200, None)
+            self.attempts.append((now, chat_id, status))
+            if status == 200:
+                self._last_sent[chat_id] = now
+                self.received.append((now, chat_id, text))
+                return status, {"ok": True, "result": {"message_id": len(self.received), "text": text}}
+        if status == 429:
+            return status, {"ok": False, "error_code": 429, "description": "Too Many Requests",
+                            "parameters": {"retry_after": retry_after}}
+        return status, {"ok": False, "error_code": status, "description": "Internal Server Error"}
+
+    def messages(self, chat_id=None):
+        """Textos aceptados, en orden de llegada"""
+        with self._lock:
+            return [text for _, chat, text in self.received if chat_id is None or chat == str(chat_id)]
+
+
+def _make_handler(telegram):
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            if not self.path.endswith("/sendMessage"):
+                self.send_error(404)
+                return
+            length = int(self.headers.get("Content-Length", 0))
+            payload = json.loads(self.rfile.read(length) or b"{}")
+            status, body = telegram.respond(str(payload.get("chat_id")), payload.get("text", ""))
+            data = json.dumps(body).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+def start_mock_telegram(telegram, port=0, host="127.0.0.1"):
+    """Arranca el servidor en segundo plano; devuelve (servidor, url base)"""
+    server = ThreadingHTTPServer((host, port), _make_handler(telegram))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="mock-telegram", daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}"
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description="Bot API de Telegram simulada")
+    parser.add_argument("command", choices=["serve"])
+    parser.add_argument("--port", type=int, default=8098)
+    parser.add_argument("--chat-interval", type=float, default=1.0,
+                        help="segundos mínimos entre mensajes de un chat (más rápido = 429)")
+    args = parser.parse_args()
+
+    telegram = MockTelegram(args.chat_interval)
+    server, base_url = start_mock_telegram(telegram, args.port)
+    print(f"🧪 Bot API simulada en {base_url}")
+    try:
+        while True:
+            time.sleep(10)
+            print(f"📨 {len(telegram.received)} mensajes aceptados, {len(telegram.attempts)} peticiones")
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""
+Bot real sin Binance, Telegram ni ficheros (benchmarks, replay y tests)
+
+offline_bot() sustituye mientras dura el bloque with el cliente de Binance,
+la descarga concurrente, el TelegramDispatcher y la configuración que
+toca disco (estado, instantánea, suscriptores, archivo) en el módulo del
+bot, y lo deja todo como estaba al salir. El peso de API no se limita:
+con un reloj virtual el bucket del WeightGovernor no se rellenaría nunca.
+"""
+
+import os
+import time
+from concurrent.futures import Future
+from contextlib import contextmanager
+
+# El bot exige credenciales al importar la configuración; aquí no se usan
+for _name in ('TELEGRAM_TOKEN', 'CHAT_ID', 'BINANCE_API_KEY', 'BINANCE_API_SECRET'):
+    os.environ.setdefault(_name, 'offline')
+
+import advanced_trading_bot as bot_module
+from http_client import WeightGovernor
+
+
+class MarketClient:
+    """Sustituto de binance.client.Client con solo get_klines, servido por `market`"""
+
+    def __init__(self, market):
+        self.market = market
+        self.session = bot_module.pooled_session()
+
+    def get_klines(self, symbol, interval, limit=500, startTime=None):
+        return self.market.klines(symbol, limit, startTime)
+
+
+class LocalGovernor(WeightGovernor):
+    """WeightGovernor que nunca hace esperar: el mercado es local y el reloj puede ser virtual"""
+
+    def reserve(self, weight=1):
+        return 0.0
+
+
+class AcceptingTelegram:
+    """Sustituto de TelegramDispatcher que acepta los mensajes al instante"""
+
+    def __init__(self):
+        self.sent = 0
+
+    def send(self, text, chat_id=None):
+        self.sent += 1
+        future = Future()
+        future.set_result(True)
+        return future
+
+    def pending(self):
+        return 0
+
+    def stop(self, timeout=None):
+        pass
+
+
+@contextmanager
+def offline_bot(market, symbols, telegram=None, clock=time.time, **config):
+    """AdvancedTradingBot sobre `market` (klines y fetch_klines_concurrently)
+
+    `telegram` recibe los mensajes (por defecto AcceptingTelegram) y
+    `config` sobrescribe otras globales del bot, p. ej. OUTCOME_NOTIFY=False.
+    """
+    telegram = telegram if telegram is not None else AcceptingTelegram()
+    overrides = {
+        '_create_client': lambda: MarketClient(market),
+        'TelegramDispatcher': lambda *args, **kwargs: telegram,
+        'fetch_klines_concurrently': market.fetch_klines_concurrently,
+        'WeightGovernor': LocalGovernor,
+        'SYMBOLS': list(symbols),
+        'SCANNER_MODE': False,
+        'ARCHIVE_ENABLED': False,
+        'STATE_DB': '',
+        'SNAPSHOT_FILE': '',
+        'SUBSCRIBERS_FILE': '',
+        **config,
+    }
+    saved = {name: getattr(bot_module, name) for name in overrides}
+    vars(bot_module).update(overrides)
+    try:
+        yield bot_module.AdvancedTradingBot(clock=clock)
+    finally:
+        vars(bot_module).update(saved)
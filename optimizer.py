@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+"""
+Optimizador de parámetros de la estrategia por barrido en paralelo
+
+Genera combinaciones (rejilla completa o muestra aleatoria) de los parámetros
+de config_secure.py, las reparte entre procesos y puntúa cada una con el
+backtest sobre velas históricas. Las combinaciones que comparten parámetros
+de indicadores se evalúan juntas para calcular los indicadores una sola vez,
+y las que además comparten umbrales reutilizan la serie de condiciones.
+
+Uso:
+    python optimizer.py --symbol BTCUSDT --param RSI_OVERSOLD=25,30,35 \\
+        --param MIN_CONDITIONS_FOR_SIGNAL=3,4,5 --param STOP_LOSS_PERCENTAGE=0.015,0.02
+    python optimizer.py datos/*.csv --param BB_STD=1.5,2,2.5 --random 200 --workers 8
+"""
+
+import argparse
+import itertools
+import math
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import pandas as pd
+
+import backtest
+
+# Parámetros que cambian las series de indicadores
+INDICATOR_PARAMS = (
+    'RSI_PERIOD', 'EMA_FAST', 'EMA_SLOW', 'EMA_SIGNAL', 'BB_PERIOD', 'BB_STD',
+    'ADX_PERIOD', 'STOCH_K', 'STOCH_D',
+)
+
+# Parámetros que cambian las condiciones pero no los indicadores
+CONDITION_PARAMS = ('RSI_OVERSOLD', 'ADX_TREND_THRESHOLD', 'VOLUME_MULTIPLIER')
+
+# Estado de cada proceso: velas e indicadores ya calculados
+_worker_candles = None
+_worker_indicators = {}
+
+
+def load_candles(source):
+    """Carga las velas a partir de {'files': [...]} o {'archive_dir', 'symbol', 'interval'}"""
+    if source.get('files'):
+        return backtest.load_klines_csv(source['files'])
+
+    from candle_archive import CandleArchive
+    return CandleArchive(source['archive_dir']).read(source['symbol'], source['interval'],
+                                                     source.get('start_ms'), source.get('end_ms'))
+
+
+def _init_worker(source):
+    global _worker_candles
+    _worker_candles = load_candles(source)
+
+
+def combination_at(index, options):
+    """Valores de la combinación `index` de itertools.product(*options), en base mixta"""
+    values = []
+    for choices in reversed(options):
+        index, digit = divmod(index, len(choices))
+        values.append(choices[digit])
+    return values[::-1]
+
+
+def build_combinations(space, base_params, samples=None, seed=None):
+    """Combinaciones de parámetros: rejilla completa o `samples` al azar
+
+    La muestra aleatoria elige índices de la rejilla sin construirla, así
+    que la memoria depende de `samples` y no del tamaño de la rejilla.
+    """
+    names = list(space)
+    options = [list(space[name]) for name in names]
+    total = math.prod(len(choices) for choices in options)
+    if samples is None or samples >= total:
+        grid = itertools.product(*options)
+    else:
+        grid = (combination_at(index, options) for index in random.Random(seed).sample(range(total), samples))
+    return [{**base_params, **dict(zip(names, values))} for values in grid]
+
+
+def _key(params, names):
+    return tuple(params[name] for name in names)
+
+
+def group_combinations(combinations, workers):
+    """Agrupa por parámetros de indicadores y parte los grupos grandes
+
+    Los trozos se limitan para que haya trabajo para todos los procesos
+    aunque solo se barran umbrales.
+    """
+    groups = {}
+    for params in combinations:
+        groups.setdefault(_key(params, INDICATOR_PARAMS), []).append(params)
+
+    chunk_size = max(1, math.ceil(len(combinations) / (workers * 4)))
+    tasks = []
+    for group in groups.values():
+        group.sort(key=lambda params: _key(params, CONDITION_PARAMS))
+        tasks.extend(group[i:i + chunk_size] for i in range(0, len(group), chunk_size))
+    return tasks
+
+
+def evaluate_group(combinations, max_hold_bars, candles=None):
+    """Backtest de combinaciones que comparten los parámetros de indicadores"""
+    candles = candles if candles is not None else _worker_candles
+    indicator_key = _key(combinations[0], INDICATOR_PARAMS)
+    indicators = _worker_indicators.get(indicator_key)
+    if indicators is None:
+        indicators = backtest.compute_signal_indicators(candles, combinations[0])
+        # Solo se conserva el último juego para acotar la memoria del proceso
+        _worker_indicators.clear()
+        _worker_indicators[indicator_key] = indicators
+
+    results = []
+    conditions_cache = {}
+    for params in combinations:
+        condition_key = _key(params, CONDITION_PARAMS)
+        if condition_key not in conditions_cache:
+            conditions_cache[condition_key] = backtest.conditions_met_series(candles, indicators, params)
+        report = backtest.run_backtest(candles, params, max_hold_bars, indicators=indicators,
+                                       conditions_met=conditions_cache[condition_key])
+        results.append((params, report))
+    return results
+
+
+def run_sweep(source, combinations, workers=None, max_hold_bars=backtest.DEFAULT_MAX_HOLD_BARS,
+              progress=None):
+    """Evalúa todas las combinaciones en un pool de procesos"""
+    workers = workers or os.cpu_count() or 1
+    tasks = group_combinations(combinations, workers)
+    results = []
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(source,)) as pool:
+        futures = [pool.submit(evaluate_group, task, max_hold_bars) for task in tasks]
+        for future in as_completed(futures):
+            results.extend(future.result())
+            if progress:
+                progress(len(results), len(combinations))
+    return results
+
+
+def rank_results(results, swept, metric='expectancy', min_trades=30):
+    """Tabla ordenada por la métrica, descartando combinaciones con pocas operaciones"""
+    rows = [{**{name: params[name] for name in swept}, **report} for params, report in results]
+    table = pd.DataFrame(rows)
+    if table.empty:
+        return table
+    table = table[table['trades'] >= min_trades]
+    return table.sort_values(metric, ascending=(metric == 'max_drawdown')).reset_index(drop=True)
+
+
+def _parse_value(value):
+    number = float(value)
+    return int(number) if number.is_integer() and '.' not in value else number
+
+
+def _parse_space(items):
+    space = {}
+    for item in items:
+        name, _, values = item.partition('=')
+        name = name.strip().upper()
+        if name not in backtest.STRATEGY_PARAMS:
+            raise argparse.ArgumentTypeError(f"parámetro desconocido: {name}")
+        space[name] = [_parse_value(value.strip()) for value in values.split(',') if value.strip()]
+    return space
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Barrido de parámetros de la estrategia")
+    parser.add_argument("files", nargs="*", help="CSV de velas de Binance")
+    parser.add_argument("--symbol", help="leer las velas del archivo local")
+    parser.add_argument("--interval", default="5m")
+    parser.add_argument("--param", action="append", default=[], metavar="NOMBRE=v1,v2,...",
+                        help="valores a probar para un parámetro (repetible)")
+    parser.add_argument("--random", type=int, help="número de combinaciones aleatorias")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--max-hold", type=int, default=backtest.DEFAULT_MAX_HOLD_BARS)
+    parser.add_argument("--metric", default="expectancy",
+                        choices=["expectancy", "profit_factor", "total_return", "win_rate", "max_drawdown"])
+    parser.add_argument("--min-trades", type=int, default=30)
+    parser.add_argument("--top", type=int, default=20)
+    parser.add_argument("--output", default="sweep_results.csv")
+    args = parser.parse_args()
+
+    if not args.param:
+        parser.error("indica al menos un --param")
+    try:
+        space = _parse_space(args.param)
+    except (argparse.ArgumentTypeError, ValueError) as e:
+        parser.error(str(e))
+
+    if args.symbol:
+        from config_secure import ARCHIVE_DIR
+        source = {'archive_dir': ARCHIVE_DIR, 'symbol': args.symbol, 'interval': args.interval}
+    elif args.files:
+        source = {'files': args.files}
+    else:
+        parser.error("indica ficheros CSV o --symbol")
+
+    combinations = build_combinations(space, backtest.default_params(), args.random, args.seed)
+    print(f"🔍 {len(combinations)} combinaciones en {args.workers} procesos...")
+
+    started = time.perf_counter()
+    results = run_sweep(
+        source, combinations, args.workers, args.max_hold,
+        progress=lambda done, total: print(f"  {done}/{total}", end="\r")
+    )
+    elapsed = time.perf_counter() - started
+
+    table = rank_results(results, list(space), args.metric, args.min_trades)
+    table.to_csv(args.output, index=False)
+    print(f"\n✅ Barrido completado en {elapsed:.1f}s → {args.output}")
+    if table.empty:
+        print(f"⚠️  Ninguna combinación con al menos {args.min_trades} operaciones")
+        return
+
+    columns = list(space) + ['trades', 'tp1_rate', 'sl_rate', 'expectancy', 'profit_factor', 'max_drawdown']
+    print(table[columns].head(args.top).to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,556 @@
+#!/usr/bin/env python3
+"""
+Libro de órdenes local por símbolo: snapshot REST + stream de diferencias
+
+Sigue el procedimiento de Binance para mantener un libro local: se abren
+los streams <símbolo>@depth@100ms, se acumulan los eventos, se pide el
+snapshot /api/v3/depth y se aplican los eventos posteriores a su
+lastUpdateId. Si un evento no continúa la secuencia (U > último u + 1) el
+libro se descarta y se resincroniza con un snapshot nuevo.
+
+Cada libro guarda como mucho max_levels niveles por lado (los más alejados
+del precio se descartan) y un buffer acotado de eventos durante la
+resincronización, así que la memoria no crece con el tiempo. De cada libro
+se obtienen el desequilibrio entre compras y ventas de los mejores niveles
+y el spread, que el bot usa como condiciones adicionales.
+
+Uso:
+    python order_book.py replay --synthetic 50 --events 200000 --gap-every 20000
+    python order_book.py record BTCUSDT --seconds 60 --output depth_btc.jsonl
+    python order_book.py replay depth_btc.jsonl
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import random
+import threading
+import time
+from bisect import bisect_left, insort
+from collections import deque
+
+import aiohttp
+
+from streaming import MAX_STREAMS_PER_CONNECTION
+
+logger = logging.getLogger(__name__)
+
+DEPTH_ENDPOINT = "/api/v3/depth"
+
+# Eventos guardados por símbolo mientras llega el snapshot
+BUFFER_SIZE = 1000
+
+
+def depth_weight(limit):
+    """Peso de /api/v3/depth según su limit (tabla de pesos de Binance)"""
+    if limit <= 100:
+        return 5
+    if limit <= 500:
+        return 25
+    if limit <= 1000:
+        return 50
+    return 250
+
+
+class LocalOrderBook:
+    """Libro de un símbolo con precios ordenados y tamaño acotado
+
+    on_event() devuelve 'applied', 'buffered', 'stale' o 'gap'; tras un gap
+    el libro queda sin sincronizar y acumula eventos hasta on_snapshot().
+    Es seguro entre hilos: se actualiza en el hilo del stream y se lee
+    desde el ciclo de análisis.
+    """
+
+    def __init__(self, symbol, max_levels=100):
+        self.symbol = symbol
+        self.max_levels = max_levels
+        self._lock = threading.Lock()
+        self._buffer = deque(maxlen=BUFFER_SIZE)
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.bids = {}
+            self.asks = {}
+            self._bid_prices = []   # ascendente: el mejor bid al final
+            self._ask_prices = []   # ascendente: el mejor ask al principio
+            self.last_update_id = None
+            self._buffer.clear()
+
+    @property
+    def synced(self):
+        return self.last_update_id is not None
+
+    # ---- Escrituras ----
+
+    def _set_level(self, levels, prices, price, quantity):
+        if quantity == 0.0:
+            if levels.pop(price, None) is not None:
+                del prices[bisect_left(prices, price)]
+        else:
+            if price not in levels:
+                insort(prices, price)
+            levels[price] = quantity
+
+    def _trim(self):
+        # Solo se conservan los max_levels niveles más cercanos al precio
+        excess = len(self._bid_prices) - self.max_levels
+        if excess > 0:
+            for price in self._bid_prices[:excess]:
+                del self.bids[price]
+            del self._bid_prices[:excess]
+        excess = len(self._ask_prices) - self.max_levels
+        if excess > 0:
+            for price in self._ask_prices[-excess:]:
+                del self.asks[price]
+            del self._ask_prices[-excess:]
+
+    def _apply(self, event):
+        if event['u'] <= self.last_update_id:
+            return 'stale'
+        if event['U'] > self.last_update_id + 1:
+            return 'gap'
+        for price, quantity in event['b']:
+            self._set_level(self.bids, self._bid_prices, float(price), float(quantity))
+        for price, quantity in event['a']:
+            self._set_level(self.asks, self._ask_prices, float(price), float(quantity))
+        self._trim()
+        self.last_update_id = event['u']
+        return 'applied'
+
+    def on_event(self, event):
+        """Aplica un evento depthUpdate (U, u, b, a) o lo acumula si no hay snapshot"""
+        with self._lock:
+            if self.last_update_id is None:
+                self._buffer.append(event)
+                return 'buffered'
+            status = self._apply(event)
+        if status == 'gap':
+            self.reset()
+            self._buffer.append(event)
+        return status
+
+    def on_snapshot(self, snapshot):
+        """Carga un snapshot REST y aplica los eventos acumulados; False si hace falta otro"""
+        with self._lock:
+            buffered = list(self._buffer)
+            self._buffer.clear()
+            self.bids, self.asks = {}, {}
+            self._bid_prices, self._ask_prices = [], []
+            for price, quantity in snapshot['bids']:
+                self._set_level(self.bids, self._bid_prices, float(price), float(quantity))
+            for price, quantity in snapshot['asks']:
+                self._set_level(self.asks, self._ask_prices, float(price), float(quantity))
+            self._trim()
+            self.last_update_id = snapshot['lastUpdateId']
+            for event in buffered:
+                if self._apply(event) == 'gap':
+                    # El snapshot es anterior al primer evento acumulado
+                    self.last_update_id = None
+                    self._buffer.extend(buffered)
+                    return False
+        return True
+
+    # ---- Lecturas ----
+
+    def best_bid(self):
+        with self._lock:
+            return self._bid_prices[-1] if self._bid_prices else None
+
+    def best_ask(self):
+        with self._lock:
+            return self._ask_prices[0] if self._ask_prices else None
+
+    def spread(self):
+        """Spread relativo al precio medio (0.001 = 0.1%)"""
+        with self._lock:
+            if not self._bid_prices or not self._ask_prices:
+                return None
+            bid, ask = self._bid_prices[-1], self._ask_prices[0]
+        return (ask - bid) / ((ask + bid) / 2)
+
+    def imbalance(self, levels=10):
+        """(compras - ventas) / total en los `levels` mejores niveles de cada lado, entre -1 y 1"""
+        with self._lock:
+            bid_volume = sum(self.bids[price] for price in self._bid_prices[-levels:])
+            ask_volume = sum(self.asks[price] for price in self._ask_prices[:levels])
+        total = bid_volume + ask_volume
+        return (bid_volume - ask_volume) / total if total else None
+
+    def top(self, levels=10):
+        """([(precio, cantidad)] de bids de mejor a peor, ídem asks)"""
+        with self._lock:
+            bids = [(price, self.bids[price]) for price in reversed(self._bid_prices[-levels:])]
+            asks = [(price, self.asks[price]) for price in self._ask_prices[:levels]]
+        return bids, asks
+
+
+class OrderBookService:
+    """Libros locales de varios símbolos alimentados por streams de profundidad
+
+    handle_event() y apply_snapshot() contienen toda la lógica de
+    sincronización y no dependen de la red, así que se pueden probar con un
+    feed grabado o sintético. start() lanza el stream real en un hilo propio.
+    """
+
+    def __init__(self, symbols, max_levels=100,
+                 ws_url="wss://stream.binance.com:9443", rest_url="https://api.binance.com",
+                 governor=None, metrics=None, timeout=10, reconnect_delay=1,
+                 max_reconnect_delay=60, max_concurrent_snapshots=5):
+        self.max_levels = max_levels
+        self.ws_url = ws_url
+        self.rest_url = rest_url
+        self.governor = governor
+        self.metrics = metrics
+        self.timeout = timeout
+        self.reconnect_delay = reconnect_delay
+        self.max_reconnect_delay = max_reconnect_delay
+        self.max_concurrent_snapshots = max_concurrent_snapshots
+        self.books = {}
+        self.symbols = []
+        self._loop = None
+        self._session = None
+        self._sockets = set()
+        self._pending = set()
+        self._stopped = False
+        self.set_symbols(symbols)
+
+    # ---- Sincronización (sin red) ----
+
+    def set_symbols(self, symbols):
+        """Cambia los símbolos seguidos; las conexiones se reabren con la lista nueva"""
+        symbols = list(dict.fromkeys(symbols))
+        if set(symbols) == set(self.symbols):
+            return
+        self.symbols = symbols
+        self.books = {
+            symbol: self.books.get(symbol) or LocalOrderBook(symbol, self.max_levels)
+            for symbol in symbols
+        }
+        if self._loop is not None:
+            asyncio.run_coroutine_threadsafe(self._close_sockets(), self._loop)
+
+    def handle_event(self, event):
+        """Procesa un evento depthUpdate; devuelve True si el símbolo necesita snapshot"""
+        book = self.books.get(event.get('s'))
+        if book is None:
+            return False
+        status = book.on_event(event)
+        if self.metrics is not None:
+            self.metrics.inc('orderbook_events_total', status=status)
+        if status == 'gap':
+            logger.warning(f"📚 Hueco de secuencia en el libro de {book.symbol}, resincronizando")
+        return status in ('gap', 'buffered') and book.symbol not in self._pending
+
+    def apply_snapshot(self, symbol, snapshot):
+        """Carga un snapshot; devuelve True si el libro quedó sincronizado"""
+        synced = self.books[symbol].on_snapshot(snapshot)
+        if self.metrics is not None:
+            self.metrics.inc('orderbook_snapshots_total', synced=synced)
+        return synced
+
+    def book(self, symbol):
+        """Libro sincronizado del símbolo, o None"""
+        book = self.books.get(symbol)
+        return book if book is not None and book.synced else None
+
+    def synced_count(self):
+        return sum(1 for symbol in self.books if self.book(symbol) is not None)
+
+    # ---- Red ----
+
+    def start(self):
+        """Arranca los streams en un hilo propio"""
+        ready = threading.Event()
+
+        def run():
+            self._loop = asyncio.new_event_loop()
+            self._loop.call_soon(ready.set)
+            self._loop.run_until_complete(self.run())
+
+        threading.Thread(target=run, name="order-book", daemon=True).start()
+        ready.wait()
+        return self
+
+    def stop(self):
+        self._stopped = True
+        if self._loop is not None:
+            asyncio.run_coroutine_threadsafe(self._close_sockets(), self._loop)
+
+    async def _close_sockets(self):
+        for ws in list(self._sockets):
+            await ws.close()
+
+    async def run(self):
+        """Mantiene los streams hasta stop(); se reconecta al cambiar los símbolos"""
+        self._snapshot_semaphore = asyncio.Semaphore(self.max_concurrent_snapshots)
+        async with aiohttp.ClientSession() as session:
+            self._session = session
+            delay = self.reconnect_delay
+            while not self._stopped:
+                symbols = self.symbols
+                chunks = [symbols[i:i + MAX_STREAMS_PER_CONNECTION]
+                          for i in range(0, len(symbols), MAX_STREAMS_PER_CONNECTION)]
+                started = time.monotonic()
+                results = await asyncio.gather(*(self._run_connection(chunk) for chunk in chunks),
+                                               return_exceptions=True)
+                for result in results:
+                    if isinstance(result, Exception):
+                        logger.error(f"Error en stream de profundidad: {result}")
+                if self._stopped:
+                    break
+                if symbols != self.symbols:
+                    delay = self.reconnect_delay
+                    continue
+                if time.monotonic() - started > self.max_reconnect_delay:
+                    delay = self.reconnect_delay
+                logger.warning(f"🔄 Reconectando stream de profundidad en {delay}s...")
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, self.max_reconnect_delay)
+
+    async def _run_connection(self, symbols):
+        streams = "/".join(f"{symbol.lower()}@depth@100ms" for symbol in symbols)
+        async with self._session.ws_connect(f"{self.ws_url}/stream?streams={streams}",
+                                            heartbeat=30) as ws:
+            self._sockets.add(ws)
+            logger.info(f"📚 Stream de profundidad conectado ({len(symbols)} símbolos)")
+            try:
+                async for msg in ws:
+                    if msg.type != aiohttp.WSMsgType.TEXT:
+                        break
+                    try:
+                        event = json.loads(msg.data).get("data")
+                    except ValueError:
+                        continue
+                    if event and self.handle_event(event):
+                        self._pending.add(event['s'])
+                        asyncio.ensure_future(self._resync(event['s']))
+            finally:
+                self._sockets.discard(ws)
+                # Sin stream el libro deja de estar al día hasta el próximo snapshot
+                for symbol in symbols:
+                    if symbol in self.books:
+                        self.books[symbol].reset()
+
+    async def _resync(self, symbol):
+        """Pide snapshots hasta que el libro quede sincronizado"""
+        try:
+            for _ in range(5):
+                # Dar tiempo a que lleguen eventos que cubran el snapshot
+                await asyncio.sleep(0.5)
+                async with self._snapshot_semaphore:
+                    snapshot = await self._fetch_snapshot(symbol)
+                if symbol not in self.books:
+                    return
+                if self.apply_snapshot(symbol, snapshot):
+                    return
+            logger.warning(f"No se pudo sincronizar el libro de {symbol}")
+        except Exception as e:
+            logger.error(f"Error pidiendo el snapshot de profundidad de {symbol}: {e}")
+        finally:
+            self._pending.discard(symbol)
+
+    async def _fetch_snapshot(self, symbol):
+        limit = min(self.max_levels, 5000)
+        if self.governor is not None:
+            await self.governor.acquire_async(depth_weight(limit))
+        async with self._session.get(f"{self.rest_url}{DEPTH_ENDPOINT}",
+                                     params={"symbol": symbol, "limit": limit},
+                                     timeout=aiohttp.ClientTimeout(total=self.timeout)) as response:
+            if self.governor is not None:
+                self.governor.observe(response.status, response.headers)
+            response.raise_for_status()
+            return await response.json()
+
+
+# ---- Feed de profundidad para pruebas ----
+
+class SyntheticDepthFeed:
+    """Libro «real» simulado que genera eventos depthUpdate y snapshots coherentes"""
+
+    def __init__(self, symbol, seed=0, tick=0.01, price=100.0, levels=60):
+        self.symbol = symbol
+        self.random = random.Random(seed)
+        self.tick = tick
+        self.mid = price
+        self.levels = levels
+        self.update_id = 1000
+        self.bids = {}
+        self.asks = {}
+        for i in range(1, levels + 1):
+            self.bids[round(price - i * tick, 8)] = self.random.uniform(1, 10)
+            self.asks[round(price + i * tick, 8)] = self.random.uniform(1, 10)
+
+    def snapshot(self, limit=100):
+        bids = sorted(self.bids.items(), reverse=True)[:limit]
+        asks = sorted(self.asks.items())[:limit]
+        return {
+            'lastUpdateId': self.update_id,
+            'bids': [[f"{price:.8f}", f"{quantity:.8f}"] for price, quantity in bids],
+            'asks': [[f"{price:.8f}", f"{quantity:.8f}"] for price, quantity in asks],
+        }
+
+    def next_event(self):
+        rng = self.random
+        self.mid += rng.choice((-1, 0, 1)) * self.tick
+        changes = {'b': [], 'a': []}
+        for _ in range(rng.randint(1, 6)):
+            side = rng.choice('ba')
+            offset = rng.randint(1, self.levels)
+            levels = self.bids if side == 'b' else self.asks
+            price = round(self.mid - offset * self.tick if side == 'b' else self.mid + offset * self.tick, 8)
+            quantity = 0.0 if rng.random() < 0.3 else rng.uniform(0.1, 10)
+            if quantity == 0.0:
+                levels.pop(price, None)
+            else:
+                levels[price] = quantity
+            changes[side].append([f"{price:.8f}", f"{quantity:.8f}"])
+        # Los niveles cruzados o lejanos desaparecen (cantidad 0 en el evento)
+        for side, levels in (('b', self.bids), ('a', self.asks)):
+            for price in list(levels):
+                crossed = price >= self.mid if side == 'b' else price <= self.mid
+                if crossed or abs(price - self.mid) > self.levels * self.tick:
+                    del levels[price]
+                    changes[side].append([f"{price:.8f}", "0.00000000"])
+        first = self.update_id + 1
+        self.update_id += rng.randint(1, 3)
+        return {'e': 'depthUpdate', 's': self.symbol, 'U': first, 'u': self.update_id,
+                'b': changes['b'], 'a': changes['a']}
+
+
+def replay_synthetic(symbols=50, events=100000, gap_every=0, max_levels=100, seed=0):
+    """Pasa un feed sintético por OrderBookService y compara cada libro con el real
+
+    Con gap_every se pierde un evento cada gap_every para forzar
+    resincronizaciones. Devuelve un dict con eventos/s, resincronizaciones y
+    los libros que no coinciden con el feed.
+    """
+    feeds = {f"SYM{i:04d}USDT": SyntheticDepthFeed(f"SYM{i:04d}USDT", seed + i) for i in range(symbols)}
+    service = OrderBookService(list(feeds), max_levels=max_levels)
+    names = list(feeds)
+    resyncs = 0
+    pending = set(names)
+    processed = 0
+    elapsed = 0.0
+    for n in range(events):
+        symbol = names[n % len(names)]
+        event = feeds[symbol].next_event()
+        if gap_every and n and n % gap_every == 0:
+            continue
+        processed += 1
+        # Solo se mide el libro, no la generación del feed
+        started = time.perf_counter()
+        if service.handle_event(event):
+            pending.add(symbol)
+        # El snapshot «llega» tras unos cuantos eventos acumulados
+        if symbol in pending and len(service.books[symbol]._buffer) >= 3:
+            if service.apply_snapshot(symbol, feeds[symbol].snapshot(max_levels)):
+                pending.discard(symbol)
+                resyncs += 1
+        elapsed += time.perf_counter() - started
+
+    mismatched = []
+    for symbol, feed in feeds.items():
+        book = service.books[symbol]
+        expected_bids = sorted(feed.bids.items(), reverse=True)[:10]
+        expected_asks = sorted(feed.asks.items())[:10]
+        bids, asks = book.top(10)
+        if book.synced and ([p for p, _ in bids] != [p for p, _ in expected_bids]
+                            or [p for p, _ in asks] != [p for p, _ in expected_asks]):
+            mismatched.append(symbol)
+    return {
+        'events': processed,
+        'elapsed': elapsed,
+        'resyncs': resyncs - symbols,
+        'synced': sum(1 for book in service.books.values() if book.synced),
+        'mismatched': mismatched,
+    }
+
+
+def replay_file(path, max_levels=100):
+    """Pasa por un LocalOrderBook un feed grabado con `record`"""
+    with open(path) as handle:
+        records = [json.loads(line) for line in handle if line.strip()]
+    snapshots = [record['snapshot'] for record in records if 'snapshot' in record]
+    events = [record['event'] for record in records if 'event' in record]
+    if not snapshots:
+        raise ValueError(f"{path} no contiene ningún snapshot")
+    book = LocalOrderBook(records[0]['symbol'], max_levels)
+    statuses = {}
+    started = time.perf_counter()
+    for event in events:
+        status = book.on_event(event)
+        statuses[status] = statuses.get(status, 0) + 1
+        if not book.synced and snapshots:
+            book.on_snapshot(snapshots.pop(0))
+    return book, statuses, time.perf_counter() - started
+
+
+async def _record(symbol, seconds, output, ws_url, rest_url, limit):
+    async with aiohttp.ClientSession() as session:
+        async with session.ws_connect(f"{ws_url}/ws/{symbol.lower()}@depth@100ms") as ws:
+            with open(output, "w") as handle:
+                snapshot_taken = False
+                deadline = time.monotonic() + seconds
+                while time.monotonic() < deadline:
+                    try:
+                        msg = await ws.receive(timeout=deadline - time.monotonic())
+                    except asyncio.TimeoutError:
+                        break
+                    if msg.type != aiohttp.WSMsgType.TEXT:
+                        break
+                    handle.write(json.dumps({'symbol': symbol, 'event': json.loads(msg.data)}) + "\n")
+                    if not snapshot_taken:
+                        async with session.get(f"{rest_url}{DEPTH_ENDPOINT}",
+                                               params={"symbol": symbol, "limit": limit}) as response:
+                            response.raise_for_status()
+                            handle.write(json.dumps({'symbol': symbol, 'snapshot': await response.json()}) + "\n")
+                        snapshot_taken = True
+
+
+def main():
+    from config_secure import BINANCE_API_URL, BINANCE_WS_URL, ORDERBOOK_LEVELS
+
+    parser = argparse.ArgumentParser(description="Libro de órdenes local: grabación y replay")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    record = subparsers.add_parser("record", help="grabar snapshot + eventos de un símbolo")
+    record.add_argument("symbol")
+    record.add_argument("--seconds", type=float, default=60)
+    record.add_argument("--output", required=True)
+
+    replay = subparsers.add_parser("replay", help="reproducir un feed grabado o sintético")
+    replay.add_argument("path", nargs="?")
+    replay.add_argument("--synthetic", type=int, help="N símbolos con feed sintético")
+    replay.add_argument("--events", type=int, default=100000)
+    replay.add_argument("--gap-every", type=int, default=0, help="perder un evento cada N")
+    args = parser.parse_args()
+
+    if args.command == "record":
+        asyncio.run(_record(args.symbol.upper(), args.seconds, args.output,
+                            BINANCE_WS_URL, BINANCE_API_URL, ORDERBOOK_LEVELS))
+        print(f"💾 Feed de {args.symbol.upper()} guardado en {args.output}")
+        return
+
+    if args.synthetic:
+        result = replay_synthetic(args.synthetic, args.events, args.gap_every, ORDERBOOK_LEVELS)
+        print(f"📚 {result['events']} eventos de {args.synthetic} libros en {result['elapsed']:.2f}s "
+              f"({result['events'] / result['elapsed']:,.0f} eventos/s)")
+        print(f"• Resincronizaciones: {result['resyncs']} | sincronizados: {result['synced']}/{args.synthetic}")
+        if result['mismatched']:
+            print(f"❌ Libros distintos del feed: {', '.join(result['mismatched'])}")
+            raise SystemExit(1)
+        print("✅ Todos los libros sincronizados coinciden con el feed")
+    elif args.path:
+        book, statuses, elapsed = replay_file(args.path, ORDERBOOK_LEVELS)
+        print(f"📚 {book.symbol}: {statuses} en {elapsed:.3f}s")
+        if book.synced:
+            print(f"• Mejor bid/ask: {book.best_bid()} / {book.best_ask()} | "
+                  f"spread {book.spread() * 100:.4f}% | desequilibrio {book.imbalance():+.3f}")
+    else:
+        parser.error("indica un fichero grabado o --synthetic N")
+
+
+if __name__ == "__main__":
+    main()
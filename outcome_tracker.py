@@ -0,0 +1,164 @@
+"""
+Seguimiento en tiempo real del resultado de las señales (SL/TP)
+
+Cada señal enviada deja abiertos su stop loss y sus dos take profits. Por
+símbolo se mantienen dos heaps ordenados por precio: los stops de mayor a
+menor y los objetivos de menor a mayor. Con cada precio (o máximo y mínimo
+de vela) solo se extraen de la cima los niveles alcanzados, en O(k log n)
+para k niveles disparados, sin recorrer las señales abiertas.
+
+TP1 no cierra la señal: queda abierta hasta TP2, el stop o la caducidad.
+Si en el mismo tramo se alcanzan stop y objetivo no se sabe cuál fue
+primero, y se cuenta el stop.
+"""
+
+import heapq
+import itertools
+import threading
+from collections import namedtuple
+
+# Eventos que cierran la señal
+CLOSING_EVENTS = ('sl', 'tp2', 'expired')
+
+Outcome = namedtuple('Outcome', 'symbol sent_at event level entry change at')
+
+
+class OpenSignal:
+    __slots__ = ('id', 'symbol', 'sent_at', 'entry', 'stop_loss', 'take_profit_1',
+                 'take_profit_2', 'tp1_hit')
+
+    def __init__(self, id, symbol, sent_at, entry, stop_loss, take_profit_1, take_profit_2,
+                 tp1_hit=False):
+        self.id = id
+        self.symbol = symbol
+        self.sent_at = sent_at
+        self.entry = entry
+        self.stop_loss = stop_loss
+        self.take_profit_1 = take_profit_1
+        self.take_profit_2 = take_profit_2
+        self.tp1_hit = tp1_hit
+
+
+class _Book:
+    """Niveles abiertos de un símbolo; las entradas de señales cerradas se descartan al llegar a la cima"""
+
+    __slots__ = ('stops', 'targets', 'live')
+
+    def __init__(self):
+        self.stops = []      # (-stop_loss, id): el stop más alto en la cima
+        self.targets = []    # (objetivo, id, 1|2): el objetivo más bajo en la cima
+        self.live = 0
+
+
+class OutcomeTracker:
+    """Libro de niveles SL/TP de las señales abiertas, indexado por símbolo y precio
+
+    Es seguro entre hilos, aunque el bot lo usa solo desde el hilo principal:
+    las entregas confirmadas se aplican con process_deliveries() antes de
+    cada ciclo de análisis.
+    """
+
+    def __init__(self, max_age=172800):
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        self._ids = itertools.count()
+        self._books = {}
+        self._signals = {}
+        self._expiry = []    # (caducidad, id)
+
+    def open(self, symbol, sent_at, entry, risk_levels, tp1_hit=False):
+        """Registra una señal enviada con los niveles de calculate_risk_levels"""
+        signal = OpenSignal(
+            next(self._ids), symbol, sent_at, float(entry),
+            float(risk_levels['stop_loss']),
+            float(risk_levels['take_profit_1']),
+            float(risk_levels['take_profit_2']),
+            tp1_hit
+        )
+        with self._lock:
+            book = self._books.get(symbol)
+            if book is None:
+                book = self._books[symbol] = _Book()
+            self._signals[signal.id] = signal
+            book.live += 1
+            heapq.heappush(book.stops, (-signal.stop_loss, signal.id))
+            if not tp1_hit:
+                heapq.heappush(book.targets, (signal.take_profit_1, signal.id, 1))
+            heapq.heappush(book.targets, (signal.take_profit_2, signal.id, 2))
+            heapq.heappush(self._expiry, (sent_at + self.max_age, signal.id))
+        return signal
+
+    def update(self, symbol, low, high=None, at=None):
+        """Aplica un precio (o el mínimo y máximo de un tramo) y devuelve los Outcome disparados"""
+        high = low if high is None else high
+        outcomes = []
+        with self._lock:
+            book = self._books.get(symbol)
+            if book is None:
+                return outcomes
+            # Stops primero: ante la duda entre stop y objetivo se cuenta el stop
+            stops = book.stops
+            while stops and -stops[0][0] >= low:
+                negative_level, signal_id = heapq.heappop(stops)
+                signal = self._signals.get(signal_id)
+                if signal is not None:
+                    outcomes.append(self._close(signal, 'sl', -negative_level, at))
+
+            targets = book.targets
+            while targets and targets[0][0] <= high:
+                level, signal_id, number = heapq.heappop(targets)
+                signal = self._signals.get(signal_id)
+                if signal is None:
+                    continue
+                if number == 1:
+                    signal.tp1_hit = True
+                    outcomes.append(self._outcome(signal, 'tp1', level, at))
+                else:
+                    outcomes.append(self._close(signal, 'tp2', level, at))
+            self._compact(symbol, book)
+        return outcomes
+
+    def expire(self, now):
+        """Cierra las señales abiertas hace más de max_age; devuelve sus Outcome"""
+        outcomes = []
+        with self._lock:
+            while self._expiry and self._expiry[0][0] <= now:
+                _, signal_id = heapq.heappop(self._expiry)
+                signal = self._signals.get(signal_id)
+                if signal is not None:
+                    outcomes.append(self._close(signal, 'expired', None, now))
+                    self._compact(signal.symbol, self._books[signal.symbol])
+        return outcomes
+
+    def _outcome(self, signal, event, level, at):
+        change = (level - signal.entry) / signal.entry if level is not None and signal.entry else None
+        return Outcome(signal.symbol, signal.sent_at, event, level, signal.entry, change, at)
+
+    def _close(self, signal, event, level, at):
+        del self._signals[signal.id]
+        self._books[signal.symbol].live -= 1
+        return self._outcome(signal, event, level, at)
+
+    def _compact(self, symbol, book):
+        # Las entradas de señales cerradas por el otro lado nunca llegan a la cima
+        # si el precio no vuelve; se purgan cuando superan a las vivas
+        if not book.live:
+            del self._books[symbol]
+            return
+        if len(book.stops) + len(book.targets) > 6 * book.live + 64:
+            book.stops = [entry for entry in book.stops if entry[1] in self._signals]
+            book.targets = [entry for entry in book.targets if entry[1] in self._signals]
+            heapq.heapify(book.stops)
+            heapq.heapify(book.targets)
+
+    def symbols(self):
+        """Símbolos con señales abiertas"""
+        with self._lock:
+            return list(self._books)
+
+    def open_count(self, symbol=None):
+        with self._lock:
+            if symbol is None:
+                return len(self._signals)
+            book = self._books.get(symbol)
+            return book.live if book is not None else 0
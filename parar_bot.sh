@@ -21,8 +21,21 @@ else
     
     echo "🔄 Parando procesos..."
     for PID in $PIDS; do
-        echo "  Matando proceso $PID..."
-        kill -9 $PID 2>/dev/null
+        echo "  Deteniendo proceso $PID..."
+        # SIGTERM: el bot guarda su instantánea y envía los mensajes pendientes
+        kill $PID 2>/dev/null
+    done
+    
+    # Dar hasta 15s para un cierre ordenado antes de forzarlo
+    for _ in $(seq 15); do
+        ps -p $(echo $PIDS | tr ' ' ',') > /dev/null 2>&1 || break
+        sleep 1
+    done
+    for PID in $PIDS; do
+        if ps -p $PID > /dev/null 2>&1; then
+            echo "  Forzando parada del proceso $PID..."
+            kill -9 $PID 2>/dev/null
+        fi
     done
     
     echo "✅ Bot detenido correctamente"
@@ -0,0 +1,256 @@
+#!/usr/bin/env python3
+"""
+Replay acelerado de velas grabadas a través del camino real del bot
+
+Las velas del archivo local (o sintéticas) se sirven con un Client y una
+descarga concurrente falsos que solo devuelven lo ocurrido hasta un reloj
+virtual, y los mensajes van a un sustituto de Telegram. El bot es el mismo
+de producción: check_signals (o get_klines + process_symbol por símbolo),
+indicadores, condiciones, cooldowns y mensajes. Cada paso es el último
+instante de una vela, así que la vela en curso llega completa y sin mirar
+al futuro.
+
+Uso:
+    python replay.py --symbols BTCUSDT ETHUSDT --since 2024-01-01 --until 2024-02-01
+    python replay.py --synthetic 100 --candles 3000 --speed 0      # lo más rápido posible
+    python replay.py --symbols BTCUSDT --speed 600 --mode symbol    # 10 min virtuales por segundo
+"""
+
+import argparse
+import logging
+import os
+import statistics
+import time
+from concurrent.futures import Future
+from datetime import datetime, timezone
+
+import numpy as np
+
+# El bot exige credenciales al importar la configuración; aquí no se usan
+for _name in ('TELEGRAM_TOKEN', 'CHAT_ID', 'BINANCE_API_KEY', 'BINANCE_API_SECRET'):
+    os.environ.setdefault(_name, 'replay')
+
+import advanced_trading_bot as bot_module
+from kline_cache import INTERVAL_MS
+from offline_bot import offline_bot
+
+logger = logging.getLogger(__name__)
+
+OUTCOME_EVENTS = ('tp1', 'tp2', 'sl', 'expired')
+
+
+class VirtualClock:
+    """Reloj del bot durante el replay (segundos UTC)"""
+
+    def __init__(self, now=0.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+class ReplayMarket:
+    """Velas grabadas en formato REST servidas hasta el instante virtual actual"""
+
+    def __init__(self, series):
+        self.series = series
+        self.open_times = {symbol: np.array([row[0] for row in rows], dtype=np.int64)
+                           for symbol, rows in series.items()}
+        self._visible = {symbol: 0 for symbol in series}
+        self.step_started = time.perf_counter()
+        self.requests = 0
+
+    def advance(self, now_ms):
+        """Avanza el reloj: son visibles las velas con open_time <= now_ms; devuelve cuántas avanzaron"""
+        advanced = 0
+        for symbol, open_times in self.open_times.items():
+            visible = int(open_times.searchsorted(now_ms, side="right"))
+            advanced += visible - self._visible[symbol]
+            self._visible[symbol] = visible
+        self.step_started = time.perf_counter()
+        return advanced
+
+    def klines(self, symbol, limit=500, start_time=None):
+        self.requests += 1
+        rows = self.series[symbol]
+        end = self._visible[symbol]
+        if start_time is None:
+            return rows[max(end - limit, 0):end]
+        # Como Binance con startTime: las primeras `limit` velas desde start_time
+        start = int(self.open_times[symbol].searchsorted(start_time, side="left"))
+        return rows[start:min(start + limit, end)]
+
+    def fetch_klines_concurrently(self, symbols, interval, limit=500, start_times=None, limits=None,
+                                  **kwargs):
+        start_times = start_times or {}
+        limits = limits or {}
+        return {
+            symbol: self.klines(symbol, limits.get(symbol, limit), start_times.get(symbol))
+            for symbol in symbols
+        }
+
+
+class ReplaySink:
+    """Sustituto de TelegramDispatcher que mide la latencia de cada señal
+
+    La latencia va desde que el paso hace visibles las velas nuevas hasta
+    que el mensaje llega aquí: descarga, indicadores, condiciones y mensaje.
+    """
+
+    def __init__(self, market):
+        self.market = market
+        self.latencies = []
+        self.messages = []
+
+    def send(self, text, chat_id=None):
+        self.latencies.append(time.perf_counter() - self.market.step_started)
+        self.messages.append(text)
+        future = Future()
+        future.set_result(True)
+        return future
+
+    def pending(self):
+        return 0
+
+    def stop(self, timeout=None):
+        pass
+
+
+def rows_from_archive(archive, symbol, interval, start_ms=None, end_ms=None):
+    """Velas del archivo local en el formato de filas de la API REST"""
+    return archive.read_klines(symbol, interval, start_ms, end_ms)
+
+
+def run_replay(series, interval, speed=0.0, mode="cycle", warmup=None):
+    """Reproduce las velas paso a paso por el bot y devuelve el informe
+
+    speed son segundos virtuales por segundo real (0 = lo más rápido posible).
+    Los pasos empiezan tras `warmup` velas (por defecto KLINE_CACHE_SIZE)
+    para que la primera descarga tenga historia suficiente.
+    """
+    step = INTERVAL_MS[interval]
+    warmup = bot_module.KLINE_CACHE_SIZE if warmup is None else warmup
+    symbols = [symbol for symbol, rows in series.items() if len(rows) > warmup]
+    if not symbols:
+        return {'symbols': 0, 'steps': 0, 'candles': 0, 'elapsed': 0.0, 'virtual_seconds': 0.0,
+                'requests': 0, 'signals': 0, 'latencies': [], 'cycle_times': [],
+                'outcomes': dict.fromkeys(OUTCOME_EVENTS, 0), 'metrics_summary': ''}
+    market = ReplayMarket({symbol: series[symbol] for symbol in symbols})
+
+    # Cada paso es el último milisegundo de una vela (su close_time)
+    open_times = np.unique(np.concatenate([market.open_times[symbol][warmup:] for symbol in symbols]))
+    steps = open_times + step - 1
+
+    clock = VirtualClock(steps[0] / 1000)
+    sink = ReplaySink(market)
+    # Los resultados TP/SL se siguen igual, pero sin mensaje: la latencia medida es la de las señales
+    with offline_bot(market, symbols, sink, clock, OUTCOME_NOTIFY=False) as bot:
+        candles = 0
+        cycle_times = []
+        started = time.perf_counter()
+        for now_ms in steps:
+            if speed:
+                target = started + (now_ms - steps[0]) / 1000 / speed
+                delay = target - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+            clock.now = now_ms / 1000
+            candles += market.advance(int(now_ms))
+
+            cycle_started = time.perf_counter()
+            if mode == "cycle":
+                bot.check_signals()
+            else:
+                frames = {symbol: bot.get_klines(symbol, interval) for symbol in symbols}
+                bot.process_deliveries()
+                bot.track_outcomes(frames)
+                for symbol, df in frames.items():
+                    bot.process_symbol(symbol, df)
+            cycle_times.append(time.perf_counter() - cycle_started)
+        elapsed = time.perf_counter() - started
+        metrics_summary = bot.metrics_summary()
+        outcomes = {event: bot.metrics.value('signal_outcomes_total', event=event) for event in OUTCOME_EVENTS}
+
+    return {
+        'symbols': len(symbols),
+        'steps': len(steps),
+        'candles': candles,
+        'elapsed': elapsed,
+        'virtual_seconds': (steps[-1] - steps[0]) / 1000 + step / 1000,
+        'requests': market.requests,
+        'signals': len(sink.latencies),
+        'latencies': sink.latencies,
+        'cycle_times': cycle_times,
+        'outcomes': outcomes,
+        'metrics_summary': metrics_summary,
+    }
+
+
+def _percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(int(fraction * len(ordered)), len(ordered) - 1)]
+
+
+def _parse_date(value):
+    return int(datetime.strptime(value, "%Y-%m-%d").replace(tzinfo=timezone.utc).timestamp() * 1000)
+
+
+def main():
+    import config_secure as config
+
+    parser = argparse.ArgumentParser(description="Replay acelerado por el camino real del bot")
+    parser.add_argument("--symbols", nargs="+", help="símbolos del archivo local")
+    parser.add_argument("--interval", default=config.INTERVAL)
+    parser.add_argument("--since", help="fecha inicial (YYYY-MM-DD)")
+    parser.add_argument("--until", help="fecha final, excluida (YYYY-MM-DD)")
+    parser.add_argument("--synthetic", type=int, help="usar N símbolos sintéticos en lugar del archivo")
+    parser.add_argument("--candles", type=int, default=2000, help="velas por símbolo sintético")
+    parser.add_argument("--speed", type=float, default=0.0,
+                        help="segundos virtuales por segundo real (0 = lo más rápido posible)")
+    parser.add_argument("--mode", choices=["cycle", "symbol"], default="cycle",
+                        help="check_signals por paso, o get_klines + process_symbol por símbolo")
+    args = parser.parse_args()
+
+    if args.synthetic:
+        from synthetic_data import synthetic_klines
+        end_ms = int(time.time() * 1000)
+        series = {
+            f"SYM{i:04d}USDT": synthetic_klines(f"SYM{i:04d}USDT", args.candles, args.interval, end_ms)
+            for i in range(args.synthetic)
+        }
+    elif args.symbols:
+        from candle_archive import CandleArchive
+        archive = CandleArchive(config.ARCHIVE_DIR)
+        start = _parse_date(args.since) if args.since else None
+        end = _parse_date(args.until) if args.until else None
+        series = {symbol: rows_from_archive(archive, symbol, args.interval, start, end)
+                  for symbol in args.symbols}
+    else:
+        parser.error("indica --symbols (archivo local) o --synthetic N")
+
+    # Los logs por señal no forman parte de lo que se mide
+    logging.disable(logging.INFO)
+    report = run_replay(series, args.interval, args.speed, args.mode)
+    logging.disable(logging.NOTSET)
+
+    if not report['steps']:
+        print("❌ No hay velas suficientes para el replay")
+        return
+    print(f"🎞️  Replay {args.mode}: {report['symbols']} símbolos, {report['steps']} pasos, "
+          f"{report['virtual_seconds'] / 86400:.1f} días virtuales en {report['elapsed']:.1f}s")
+    print(f"• Rendimiento: {report['candles'] / report['elapsed']:,.0f} velas/s "
+          f"({report['virtual_seconds'] / report['elapsed']:,.0f}x tiempo real)")
+    cycles = report['cycle_times']
+    print(f"• Paso: mediana {statistics.median(cycles) * 1000:.1f}ms | "
+          f"p95 {_percentile(cycles, 0.95) * 1000:.1f}ms | máx {max(cycles) * 1000:.1f}ms")
+    latencies = report['latencies']
+    if latencies:
+        print(f"• Señales: {report['signals']} | latencia mediana {statistics.median(latencies) * 1000:.1f}ms | "
+              f"p95 {_percentile(latencies, 0.95) * 1000:.1f}ms | máx {max(latencies) * 1000:.1f}ms")
+    else:
+        print("• Señales: 0")
+    print(report['metrics_summary'])
+
+
+if __name__ == "__main__":
+    main()
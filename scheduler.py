@@ -0,0 +1,75 @@
+"""
+Planificación de ciclos alineada al cierre de vela
+
+En lugar de dormir CHECK_INTERVAL segundos tras cada ciclo (lo que va
+desplazando el análisis respecto a las velas), el planificador despierta
+unos segundos después de cada cierre de vela en UTC y reparte los símbolos
+en tandas escalonadas para no concentrar el peso de la API en un instante.
+"""
+
+import logging
+import time
+
+from kline_cache import INTERVAL_MS
+
+logger = logging.getLogger(__name__)
+
+
+class CandleScheduler:
+    """Despierta justo después de cada cierre de vela y escalona los símbolos en tandas"""
+
+    def __init__(self, interval, check_interval, offset=2.0, stagger=0.0, batches=1,
+                 clock=time.time, sleep=time.sleep):
+        self.step = INTERVAL_MS[interval] / 1000
+        # CHECK_INTERVAL se redondea a un número entero de velas (mínimo una)
+        self.period = self.step * max(1, round(check_interval / self.step))
+        self.offset = offset
+        self.stagger = stagger
+        self.batches = max(1, batches)
+        self.clock = clock
+        self._sleep = sleep
+        self.boundary = None
+        self.missed = 0
+
+    def now(self):
+        """Instante actual (segundos UTC) según el reloj del planificador"""
+        return self.clock()
+
+    def next_boundary(self, now=None):
+        """Próximo cierre (segundos UTC) cuyo momento de despertar aún no ha pasado"""
+        now = now if now is not None else self.now()
+        return ((now - self.offset) // self.period + 1) * self.period
+
+    def sleep_until(self, moment):
+        remaining = moment - self.now()
+        if remaining > 0:
+            self._sleep(remaining)
+
+    def wait(self):
+        """Duerme hasta el siguiente cierre + offset; devuelve ese cierre
+
+        Si el ciclo anterior se alargó más allá de uno o varios cierres, se
+        saltan y se acumulan en `missed`.
+        """
+        boundary = self.next_boundary()
+        if self.boundary is not None:
+            skipped = int(round((boundary - self.boundary) / self.period)) - 1
+            if skipped > 0:
+                self.missed += skipped
+                logger.warning(f"⚠️  {skipped} cierres de vela sin analizar por un ciclo demasiado largo")
+        self.boundary = boundary
+        self.sleep_until(boundary + self.offset)
+        return boundary
+
+    def closed_open_time(self, boundary):
+        """open_time (ms) de la última vela cerrada en `boundary`"""
+        return int(boundary * 1000 - self.step * 1000)
+
+    def slots(self, symbols, boundary):
+        """[(momento, símbolos)] de cada tanda, repartidas a lo largo de `stagger` segundos"""
+        count = min(self.batches, len(symbols)) or 1
+        start = boundary + self.offset
+        return [
+            (start + index * self.stagger / count, symbols[index::count])
+            for index in range(count)
+        ]
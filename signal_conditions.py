@@ -0,0 +1,190 @@
+"""
+Evaluación perezosa de las condiciones LONG de check_long_signal
+
+Cada condición declara los grupos de indicadores que necesita. Se evalúan
+primero las más baratas y selectivas y se abandona en cuanto ya no es
+posible llegar a min_conditions, así que los indicadores caros (ADX,
+estocástico) solo se calculan para los símbolos que siguen en juego. Las
+señales emitidas son las mismas que con la evaluación completa.
+"""
+
+from collections.abc import Mapping
+
+from batch_indicators import CONDITION_NAMES
+
+# Indicadores que se calculan juntos en cada grupo
+INDICATOR_GROUPS = {
+    'volume': ('volume_sma',),
+    'rsi': ('rsi',),
+    'ema': ('ema_fast', 'ema_slow'),
+    'macd': ('macd', 'macd_signal', 'macd_histogram'),
+    'bb': ('bb_upper', 'bb_middle', 'bb_lower', 'bb_width'),
+    'adx': ('adx',),
+    'stoch': ('stoch_k', 'stoch_d'),
+}
+_GROUP_OF = {name: group for group, names in INDICATOR_GROUPS.items() for name in names}
+
+# Coste relativo de cada grupo con `ta` (ADX y estocástico recorren la serie en Python)
+GROUP_COST = {'volume': 1, 'rsi': 2, 'ema': 2, 'bb': 2, 'macd': 3, 'stoch': 4, 'adx': 10}
+
+CONDITION_INDICATORS = {
+    'rsi_oversold': ('rsi',),
+    'rsi_rising': ('rsi',),
+    'price_above_bb_lower': ('bb',),
+    'price_near_support': ('bb',),
+    'stoch_oversold': ('stoch',),
+    'stoch_bullish_cross': ('stoch',),
+    'volume_confirmation': ('volume',),
+    'trend_support': ('adx', 'macd', 'ema'),
+    'macd_bullish': ('macd',),
+    'bb_squeeze': ('bb',),
+}
+
+# Condiciones que rara vez se cumplen: a igual coste van primero porque descartan antes
+SELECTIVE = ('rsi_oversold', 'volume_confirmation', 'stoch_oversold', 'stoch_bullish_cross')
+
+EVALUATION_ORDER = tuple(sorted(
+    CONDITION_NAMES,
+    key=lambda name: (sum(GROUP_COST[group] for group in CONDITION_INDICATORS[name]),
+                      name not in SELECTIVE)
+))
+
+
+class LazyIndicators(Mapping):
+    """Indicadores de `ta` con las claves de calculate_indicators, calculados al pedirlos"""
+
+    def __init__(self, df, rsi_period, ema_fast, ema_slow, ema_signal, bb_period, bb_std,
+                 adx_period, stoch_k, stoch_d):
+        self.df = df
+        self.rsi_period = rsi_period
+        self.ema_fast = ema_fast
+        self.ema_slow = ema_slow
+        self.ema_signal = ema_signal
+        self.bb_period = bb_period
+        self.bb_std = bb_std
+        self.adx_period = adx_period
+        self.stoch_k = stoch_k
+        self.stoch_d = stoch_d
+        self._columns = {}
+        self._values = {}
+
+    def _column(self, name):
+        if name not in self._columns:
+            import pandas as pd
+            self._columns[name] = pd.Series(self.df[name], dtype=float)
+        return self._columns[name]
+
+    def _compute(self, group):
+        # pandas y `ta` solo se importan si se usa este camino (tardan en cargar)
+        from ta.momentum import RSIIndicator, StochasticOscillator
+        from ta.trend import EMAIndicator, MACD, ADXIndicator
+        from ta.volatility import BollingerBands
+
+        values = self._values
+        close = self._column("close")
+        if group == 'volume':
+            values['volume_sma'] = self._column("volume").rolling(window=20).mean()
+        elif group == 'rsi':
+            values['rsi'] = RSIIndicator(close, window=self.rsi_period).rsi()
+        elif group == 'ema':
+            values['ema_fast'] = EMAIndicator(close, window=self.ema_fast).ema_indicator()
+            values['ema_slow'] = EMAIndicator(close, window=self.ema_slow).ema_indicator()
+        elif group == 'macd':
+            macd = MACD(close, window_slow=self.ema_slow, window_fast=self.ema_fast,
+                        window_sign=self.ema_signal)
+            values['macd'] = macd.macd()
+            values['macd_signal'] = macd.macd_signal()
+            values['macd_histogram'] = macd.macd_diff()
+        elif group == 'bb':
+            bb = BollingerBands(close, window=self.bb_period, window_dev=self.bb_std)
+            values['bb_upper'] = bb.bollinger_hband()
+            values['bb_middle'] = bb.bollinger_mavg()
+            values['bb_lower'] = bb.bollinger_lband()
+            values['bb_width'] = (values['bb_upper'] - values['bb_lower']) / values['bb_middle']
+        elif group == 'adx':
+            values['adx'] = ADXIndicator(self._column("high"), self._column("low"), close,
+                                         window=self.adx_period).adx()
+        elif group == 'stoch':
+            stoch = StochasticOscillator(self._column("high"), self._column("low"), close,
+                                         window=self.stoch_k, smooth_window=self.stoch_d)
+            values['stoch_k'] = stoch.stoch()
+            values['stoch_d'] = stoch.stoch_signal()
+
+    def computed(self):
+        """Grupos ya calculados"""
+        return {_GROUP_OF[name] for name in self._values}
+
+    def __getitem__(self, name):
+        if name not in self._values:
+            if name not in _GROUP_OF:
+                raise KeyError(name)
+            self._compute(_GROUP_OF[name])
+        return self._values[name]
+
+    def __iter__(self):
+        return iter(_GROUP_OF)
+
+    def __len__(self):
+        return len(_GROUP_OF)
+
+
+class _Inputs:
+    __slots__ = ('indicators', 'price', 'volume', 'trend', 'rsi_oversold', 'volume_multiplier')
+
+    def __init__(self, indicators, price, volume, trend, rsi_oversold, volume_multiplier):
+        self.indicators = indicators
+        self.price = price
+        self.volume = volume
+        self.trend = trend
+        self.rsi_oversold = rsi_oversold
+        self.volume_multiplier = volume_multiplier
+
+
+def _near_support(c):
+    bb_upper = c.indicators['bb_upper'].iloc[-1]
+    bb_middle = c.indicators['bb_middle'].iloc[-1]
+    return c.price <= bb_middle + (bb_upper - bb_middle) * 0.3
+
+
+def _stoch_cross(c):
+    stoch_k, stoch_d = c.indicators['stoch_k'], c.indicators['stoch_d']
+    return stoch_k.iloc[-1] > stoch_d.iloc[-1] and stoch_k.iloc[-2] <= stoch_d.iloc[-2]
+
+
+# Mismas expresiones que la evaluación completa de check_long_signal
+_CONDITIONS = {
+    'rsi_oversold': lambda c: c.indicators['rsi'].iloc[-1] < c.rsi_oversold,
+    'rsi_rising': lambda c: c.indicators['rsi'].iloc[-1] > c.indicators['rsi'].iloc[-2],
+    'price_above_bb_lower': lambda c: c.price > c.indicators['bb_lower'].iloc[-1],
+    'price_near_support': _near_support,
+    'stoch_oversold': lambda c: c.indicators['stoch_k'].iloc[-1] < 20 and c.indicators['stoch_d'].iloc[-1] < 20,
+    'stoch_bullish_cross': _stoch_cross,
+    'volume_confirmation': lambda c: c.volume > (c.indicators['volume_sma'].iloc[-1] * c.volume_multiplier),
+    'trend_support': lambda c: c.trend()['trend_score'] >= 2,
+    'macd_bullish': lambda c: c.indicators['macd'].iloc[-1] > c.indicators['macd'].iloc[-2],
+    'bb_squeeze': lambda c: c.indicators['bb_width'].iloc[-1] < c.indicators['bb_width'].iloc[-5],
+}
+
+
+def evaluate_conditions(indicators, price, volume, trend, min_conditions, rsi_oversold,
+                        volume_multiplier):
+    """Evalúa las condiciones en EVALUATION_ORDER hasta que el resultado queda decidido
+
+    trend es una función sin argumentos que devuelve analyze_trend_strength
+    (solo se llama si hace falta). Devuelve (condiciones, completa): si
+    completa es False no se alcanza min_conditions y `condiciones` solo
+    tiene las evaluadas; si es True están todas, en el orden de
+    CONDITION_NAMES, porque el mensaje de la señal las muestra todas.
+    """
+    inputs = _Inputs(indicators, price, volume, trend, rsi_oversold, volume_multiplier)
+    evaluated = {}
+    met = 0
+    remaining = len(EVALUATION_ORDER)
+    for name in EVALUATION_ORDER:
+        result = _CONDITIONS[name](inputs)
+        evaluated[name] = result
+        met += bool(result)
+        remaining -= 1
+        if met + remaining < min_conditions:
+            return evaluated, False
+    return {name: evaluated[name] for name in CONDITION_NAMES}, True
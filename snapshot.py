@@ -0,0 +1,60 @@
+"""
+Instantánea del estado en memoria para arrancar en caliente
+
+Guarda en un único fichero las velas en caché, el estado de los indicadores
+incrementales y el de los intervalos mayores. Al arrancar se restaura y el
+primer ciclo solo pide a Binance las velas que faltan, en lugar de
+descargar y recalcular todo. La instantánea se descarta si la configuración
+que afecta a los datos cambió o si es más antigua que el buffer de velas.
+
+El fichero es un pickle escrito por el propio bot: no cargar instantáneas
+de origen desconocido.
+"""
+
+import logging
+import os
+import pickle
+import time
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_VERSION = 1
+
+
+def write_snapshot(path, fingerprint, state):
+    """Escribe {nombre: objeto} de forma atómica; devuelve el tamaño en bytes"""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    payload = {
+        'version': SNAPSHOT_VERSION,
+        'saved_at': time.time(),
+        'fingerprint': fingerprint,
+        'state': state,
+    }
+    temporary = f"{path}.tmp"
+    with open(temporary, "wb") as handle:
+        pickle.dump(payload, handle, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(temporary, path)
+    return os.path.getsize(path)
+
+
+def read_snapshot(path, fingerprint, max_age):
+    """Estado guardado, o None si no existe, está caducado o no corresponde a la configuración"""
+    if not path or not os.path.exists(path):
+        return None
+    try:
+        with open(path, "rb") as handle:
+            payload = pickle.load(handle)
+    except Exception as e:
+        logger.warning(f"Instantánea {path} ilegible, arranque en frío: {e}")
+        return None
+
+    age = time.time() - payload.get('saved_at', 0)
+    if payload.get('version') != SNAPSHOT_VERSION or payload.get('fingerprint') != fingerprint:
+        logger.info("♻️  La configuración cambió desde la última instantánea, arranque en frío")
+        return None
+    if age > max_age:
+        logger.info(f"♻️  Instantánea de hace {age / 60:.0f} min demasiado antigua, arranque en frío")
+        return None
+    return payload['state']
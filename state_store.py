@@ -0,0 +1,327 @@
+#!/usr/bin/env python3
+"""
+Estado persistente del bot y registro de señales en SQLite (modo WAL)
+
+Las escrituras se encolan sin bloquear y un hilo las agrupa en una sola
+transacción cada flush_interval segundos, así que el ciclo de señales no
+espera al disco. Al arrancar se recuperan los cooldowns, los símbolos en
+alerta y las estadísticas; el registro de señales queda indexado por
+símbolo y fecha para consultas sobre meses de historia.
+
+Uso:
+    python state_store.py signals --symbol BTCUSDT --since 2024-01-01
+    python state_store.py summary --since 2024-01-01
+    python state_store.py outcomes --since 2024-01-01
+"""
+
+import argparse
+import json
+import logging
+import os
+import queue
+import sqlite3
+import threading
+import time
+from datetime import datetime, timezone
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS cooldowns (
+    symbol TEXT PRIMARY KEY,
+    sent_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS alerted_symbols (
+    symbol TEXT PRIMARY KEY
+);
+CREATE TABLE IF NOT EXISTS stats (
+    key TEXT PRIMARY KEY,
+    value REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS signals (
+    id INTEGER PRIMARY KEY,
+    symbol TEXT NOT NULL,
+    sent_at REAL NOT NULL,
+    strength TEXT,
+    price REAL,
+    conditions_met INTEGER,
+    delivered INTEGER,
+    conditions TEXT,
+    indicators TEXT,
+    trend TEXT,
+    risk TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_signals_symbol_time ON signals (symbol, sent_at);
+CREATE INDEX IF NOT EXISTS idx_signals_time ON signals (sent_at);
+CREATE TABLE IF NOT EXISTS signal_outcomes (
+    id INTEGER PRIMARY KEY,
+    symbol TEXT NOT NULL,
+    sent_at REAL NOT NULL,
+    event TEXT NOT NULL,
+    price REAL,
+    change REAL,
+    at REAL
+);
+CREATE INDEX IF NOT EXISTS idx_outcomes_signal ON signal_outcomes (symbol, sent_at);
+"""
+
+_STOP = object()
+
+
+def _to_json(value):
+    # Los valores de NumPy (np.float64, np.bool_) se guardan como tipos de Python
+    return json.dumps(value, default=lambda o: o.item() if hasattr(o, "item") else str(o))
+
+
+def connect(path):
+    """Conexión SQLite en modo WAL con el esquema creado"""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    connection = sqlite3.connect(path, timeout=30)
+    connection.execute("PRAGMA journal_mode=WAL")
+    connection.execute("PRAGMA synchronous=NORMAL")
+    connection.executescript(SCHEMA)
+    return connection
+
+
+class StateStore:
+    """Persistencia de cooldowns, alertas, estadísticas y señales enviadas"""
+
+    def __init__(self, path, flush_interval=1.0, batch_size=500):
+        self.path = path
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        connect(path).close()
+        self.queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="state-writer", daemon=True)
+        self._thread.start()
+
+    # ---- Escrituras (no bloquean) ----
+
+    def _write(self, sql, params=()):
+        self.queue.put((sql, params))
+
+    def record_cooldown(self, symbol, sent_at):
+        self._write("INSERT OR REPLACE INTO cooldowns (symbol, sent_at) VALUES (?, ?)", (symbol, sent_at))
+
+    def clear_cooldown(self, symbol, sent_at):
+        self._write("DELETE FROM cooldowns WHERE symbol = ? AND sent_at = ?", (symbol, sent_at))
+
+    def set_alerted(self, symbol, alerted):
+        if alerted:
+            self._write("INSERT OR IGNORE INTO alerted_symbols (symbol) VALUES (?)", (symbol,))
+        else:
+            self._write("DELETE FROM alerted_symbols WHERE symbol = ?", (symbol,))
+
+    def save_stats(self, stats, scope=None):
+        """Guarda los contadores numéricos de stats
+
+        Con scope (el id de un worker del clúster) los contadores se guardan
+        aparte, como "scope:clave", para que los workers no se pisen.
+        """
+        prefix = f"{scope}:" if scope else ""
+        for key, value in stats.items():
+            if isinstance(value, (int, float)):
+                self._write("INSERT OR REPLACE INTO stats (key, value) VALUES (?, ?)", (prefix + key, value))
+
+    def journal_signal(self, symbol, sent_at, signal_data, risk_levels, delivered):
+        """Registra una señal emitida con sus condiciones, indicadores y niveles de riesgo"""
+        self._write(
+            "INSERT INTO signals (symbol, sent_at, strength, price, conditions_met, delivered,"
+            " conditions, indicators, trend, risk) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                symbol, sent_at, signal_data.get('strength'),
+                float(signal_data.get('current_price', 0.0)),
+                int(signal_data.get('conditions_met', 0)), int(bool(delivered)),
+                _to_json(signal_data.get('conditions', {})),
+                _to_json(signal_data.get('indicators', {})),
+                _to_json(signal_data.get('trend_analysis', {})),
+                _to_json(risk_levels),
+            )
+        )
+
+    def record_outcome(self, outcome):
+        """Registra un Outcome del OutcomeTracker (tp1, tp2, sl o expired)"""
+        self._write(
+            "INSERT INTO signal_outcomes (symbol, sent_at, event, price, change, at)"
+            " VALUES (?, ?, ?, ?, ?, ?)",
+            (outcome.symbol, outcome.sent_at, outcome.event, outcome.level, outcome.change, outcome.at)
+        )
+
+    def flush(self):
+        """Espera a que todas las escrituras encoladas estén en disco"""
+        self.queue.join()
+
+    def close(self):
+        self.queue.put(_STOP)
+        self._thread.join()
+
+    def _run(self):
+        connection = connect(self.path)
+        stopping = False
+        while not stopping:
+            item = self.queue.get()
+            batch = [item]
+            # Agrupar lo que llegue durante flush_interval en una sola transacción
+            deadline = time.monotonic() + self.flush_interval
+            while item is not _STOP and len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self.queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                batch.append(item)
+
+            writes = [entry for entry in batch if entry is not _STOP]
+            stopping = len(writes) != len(batch)
+            try:
+                with connection:
+                    for sql, params in writes:
+                        connection.execute(sql, params)
+            except sqlite3.Error as e:
+                logger.error(f"Error guardando el estado en {self.path}: {e}")
+            finally:
+                for _ in batch:
+                    self.queue.task_done()
+        connection.close()
+
+    # ---- Lecturas ----
+
+    def _read(self, sql, params=()):
+        connection = connect(self.path)
+        try:
+            connection.row_factory = sqlite3.Row
+            return connection.execute(sql, params).fetchall()
+        finally:
+            connection.close()
+
+    def load_cooldowns(self, since=None):
+        """{símbolo: sent_at} de las últimas señales (desde `since` si se indica)"""
+        rows = self._read("SELECT symbol, sent_at FROM cooldowns WHERE sent_at >= ?",
+                          (since if since is not None else 0,))
+        return {row["symbol"]: row["sent_at"] for row in rows}
+
+    def load_alerted(self):
+        return {row["symbol"] for row in self._read("SELECT symbol FROM alerted_symbols")}
+
+    def load_stats(self, scope=None):
+        """Contadores guardados con save_stats para el mismo scope"""
+        rows = self._read("SELECT key, value FROM stats")
+        if scope:
+            prefix = f"{scope}:"
+            return {row["key"][len(prefix):]: row["value"] for row in rows if row["key"].startswith(prefix)}
+        return {row["key"]: row["value"] for row in rows if ":" not in row["key"]}
+
+    def load_open_signals(self, since):
+        """Señales entregadas desde `since` aún sin TP2, stop ni caducidad, con sus niveles"""
+        rows = self._read(
+            "SELECT s.symbol, s.sent_at, s.price, s.risk,"
+            " EXISTS (SELECT 1 FROM signal_outcomes o WHERE o.symbol = s.symbol"
+            " AND o.sent_at = s.sent_at AND o.event = 'tp1') AS tp1_hit"
+            " FROM signals s WHERE s.delivered = 1 AND s.sent_at >= ?"
+            " AND NOT EXISTS (SELECT 1 FROM signal_outcomes o WHERE o.symbol = s.symbol"
+            " AND o.sent_at = s.sent_at AND o.event IN ('sl', 'tp2', 'expired'))",
+            (since,)
+        )
+        return [
+            {'symbol': row["symbol"], 'sent_at': row["sent_at"], 'price': row["price"],
+             'risk': json.loads(row["risk"]) if row["risk"] else {}, 'tp1_hit': bool(row["tp1_hit"])}
+            for row in rows
+        ]
+
+    def signals(self, symbol=None, start=None, end=None, limit=None):
+        """Señales registradas, filtradas por símbolo y rango [start, end) de timestamps"""
+        clauses, params = [], []
+        if symbol is not None:
+            clauses.append("symbol = ?")
+            params.append(symbol)
+        if start is not None:
+            clauses.append("sent_at >= ?")
+            params.append(start)
+        if end is not None:
+            clauses.append("sent_at < ?")
+            params.append(end)
+        sql = "SELECT * FROM signals"
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        sql += " ORDER BY sent_at"
+        if limit is not None:
+            sql += f" LIMIT {int(limit)}"
+
+        result = []
+        for row in self._read(sql, params):
+            record = dict(row)
+            for key in ("conditions", "indicators", "trend", "risk"):
+                record[key] = json.loads(record[key]) if record[key] else {}
+            result.append(record)
+        return result
+
+    def summary(self, start=None, end=None):
+        """Señales por símbolo y fuerza en un rango de fechas"""
+        rows = self._read(
+            "SELECT symbol, strength, COUNT(*) AS signals, SUM(delivered) AS delivered"
+            " FROM signals WHERE sent_at >= ? AND sent_at < ?"
+            " GROUP BY symbol, strength ORDER BY signals DESC",
+            (start if start is not None else 0, end if end is not None else float("inf"))
+        )
+        return [dict(row) for row in rows]
+
+    def outcome_summary(self, start=None, end=None):
+        """Resultados por símbolo de las señales enviadas en un rango de fechas"""
+        rows = self._read(
+            "SELECT symbol,"
+            " SUM(event = 'tp1') AS tp1, SUM(event = 'tp2') AS tp2,"
+            " SUM(event = 'sl') AS sl, SUM(event = 'expired') AS expired,"
+            " AVG(CASE WHEN event IN ('sl', 'tp2') THEN change END) AS avg_change"
+            " FROM signal_outcomes WHERE sent_at >= ? AND sent_at < ?"
+            " GROUP BY symbol ORDER BY COUNT(*) DESC",
+            (start if start is not None else 0, end if end is not None else float("inf"))
+        )
+        return [dict(row) for row in rows]
+
+
+def _parse_date(value):
+    return datetime.strptime(value, "%Y-%m-%d").replace(tzinfo=timezone.utc).timestamp()
+
+
+def main():
+    from config_secure import STATE_DB
+
+    parser = argparse.ArgumentParser(description="Consulta del registro de señales")
+    parser.add_argument("command", choices=["signals", "summary", "outcomes"])
+    parser.add_argument("--symbol")
+    parser.add_argument("--since", help="fecha inicial (YYYY-MM-DD)")
+    parser.add_argument("--until", help="fecha final, excluida (YYYY-MM-DD)")
+    parser.add_argument("--limit", type=int, default=100)
+    parser.add_argument("--db", default=STATE_DB)
+    args = parser.parse_args()
+
+    if not args.db or not os.path.exists(args.db):
+        parser.error(f"no existe la base de datos de estado {args.db!r}")
+    start = _parse_date(args.since) if args.since else None
+    end = _parse_date(args.until) if args.until else None
+
+    store = StateStore(args.db)
+    if args.command == "signals":
+        for record in store.signals(args.symbol, start, end, args.limit):
+            sent = datetime.fromtimestamp(record["sent_at"]).strftime("%d/%m/%Y %H:%M:%S")
+            status = "✅" if record["delivered"] else "❌"
+            print(f"{status} {sent} {record['symbol']:<12} {record['strength']:<9} "
+                  f"${record['price']:.4f} ({record['conditions_met']} condiciones)")
+    elif args.command == "outcomes":
+        for row in store.outcome_summary(start, end):
+            average = f"{row['avg_change'] * 100:+.2f}%" if row['avg_change'] is not None else "-"
+            print(f"🎯 {row['symbol']:<12} TP1 {row['tp1']:>4} | TP2 {row['tp2']:>4} | "
+                  f"SL {row['sl']:>4} | caducadas {row['expired']:>4} | media al cierre {average}")
+    else:
+        for row in store.summary(start, end):
+            print(f"📊 {row['symbol']:<12} {row['strength']:<9} {row['signals']:>5} señales "
+                  f"({row['delivered'] or 0} entregadas)")
+    store.close()
+
+
+if __name__ == "__main__":
+    main()
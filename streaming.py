@@ -0,0 +1,149 @@
+"""
+Streams WebSocket de velas de Binance con reconexión automática
+"""
+
+import asyncio
+import json
+import logging
+
+import aiohttp
+
+logger = logging.getLogger(__name__)
+
+# Binance admite como máximo 1024 streams por conexión combinada
+MAX_STREAMS_PER_CONNECTION = 1024
+
+
+def kline_event_to_row(kline):
+    """Convierte el objeto 'k' de un evento kline al formato de fila de la API REST"""
+    return [
+        kline["t"], kline["o"], kline["h"], kline["l"], kline["c"], kline["v"],
+        kline["T"], kline["q"], kline["n"], kline["V"], kline["Q"], kline["B"]
+    ]
+
+
+class KlineStream:
+    """Suscripción a streams combinados de velas para una lista de símbolos
+
+    on_closed_kline(símbolo, fila) se llama al cerrarse cada vela con la fila
+    en el mismo formato que devuelve la API REST. on_connect(símbolos) se llama
+    tras cada (re)conexión, antes de procesar mensajes, para rellenar por REST
+    las velas perdidas. Ambos callbacks son síncronos: se ejecutan en un hilo
+    aparte y de uno en uno. set_symbols() cambia la suscripción reabriendo
+    las conexiones.
+    """
+
+    def __init__(self, symbols, interval, on_closed_kline, on_connect=None,
+                 base_url="wss://stream.binance.com:9443", reconnect_delay=1,
+                 max_reconnect_delay=60, heartbeat=30):
+        self.symbols = list(symbols)
+        self.interval = interval
+        self.on_closed_kline = on_closed_kline
+        self.on_connect = on_connect
+        self.base_url = base_url
+        self.reconnect_delay = reconnect_delay
+        self.max_reconnect_delay = max_reconnect_delay
+        self.heartbeat = heartbeat
+        self._stopped = False
+        self._callback_lock = None
+        self._loop = None
+        self._sockets = set()
+
+    def stream_url(self, symbols):
+        """URL del stream combinado para un grupo de símbolos"""
+        streams = "/".join(f"{symbol.lower()}@kline_{self.interval}" for symbol in symbols)
+        return f"{self.base_url}/stream?streams={streams}"
+
+    def stop(self):
+        """Detiene el stream tras el mensaje en curso"""
+        self._stopped = True
+
+    def set_symbols(self, symbols):
+        """Cambia los símbolos suscritos; las conexiones se reabren con la lista nueva
+
+        Se puede llamar desde cualquier hilo. Al conectar, on_connect rellena
+        las velas de los símbolos nuevos.
+        """
+        symbols = list(dict.fromkeys(symbols))
+        if set(symbols) == set(self.symbols):
+            return
+        self.symbols = symbols
+        if self._loop is not None:
+            asyncio.run_coroutine_threadsafe(self._close_sockets(), self._loop)
+
+    async def _close_sockets(self):
+        for ws in list(self._sockets):
+            await ws.close()
+
+    async def run(self):
+        """Mantiene abiertas todas las conexiones hasta llamar a stop()"""
+        self._callback_lock = asyncio.Lock()
+        self._loop = asyncio.get_running_loop()
+        while not self._stopped:
+            symbols = self.symbols
+            chunks = [
+                symbols[i:i + MAX_STREAMS_PER_CONNECTION]
+                for i in range(0, len(symbols), MAX_STREAMS_PER_CONNECTION)
+            ]
+            await asyncio.gather(*(self._run_connection(chunk, symbols) for chunk in chunks))
+            if not chunks:
+                # Sin símbolos no hay conexión: se espera a que set_symbols traiga alguno
+                await asyncio.sleep(self.reconnect_delay)
+
+    async def _run_connection(self, symbols, subscription):
+        """Bucle de conexión con reconexión y backoff exponencial mientras no cambie la suscripción"""
+        delay = self.reconnect_delay
+        while not self._stopped and self.symbols is subscription:
+            try:
+                async with aiohttp.ClientSession() as session:
+                    async with session.ws_connect(self.stream_url(symbols),
+                                                  heartbeat=self.heartbeat) as ws:
+                        self._sockets.add(ws)
+                        try:
+                            # La suscripción pudo cambiar mientras se conectaba
+                            if self.symbols is subscription:
+                                logger.info(f"🔌 Stream conectado ({len(symbols)} símbolos)")
+                                if self.on_connect:
+                                    async with self._callback_lock:
+                                        await asyncio.to_thread(self.on_connect, symbols)
+                                delay = self.reconnect_delay
+                                await self._consume(ws)
+                        finally:
+                            self._sockets.discard(ws)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Error en stream de velas: {e}")
+
+            if self._stopped or self.symbols is not subscription:
+                break
+            logger.warning(f"🔄 Reconectando stream en {delay}s...")
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, self.max_reconnect_delay)
+
+    async def _consume(self, ws):
+        """Procesa mensajes hasta que se cierre la conexión"""
+        async for msg in ws:
+            if msg.type == aiohttp.WSMsgType.TEXT:
+                await self._handle_message(msg.data)
+            elif msg.type in (aiohttp.WSMsgType.CLOSED, aiohttp.WSMsgType.ERROR):
+                break
+            if self._stopped:
+                await ws.close()
+                break
+
+    async def _handle_message(self, raw):
+        """Despacha los eventos de vela cerrada al callback"""
+        try:
+            payload = json.loads(raw)
+            event = payload.get("data", payload)
+            kline = event.get("k")
+        except (ValueError, AttributeError) as e:
+            logger.warning(f"Mensaje de stream inválido: {e}")
+            return
+
+        if not kline or not kline.get("x"):
+            return
+
+        async with self._callback_lock:
+            await asyncio.to_thread(self.on_closed_kline, kline["s"], kline_event_to_row(kline))
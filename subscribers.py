@@ -0,0 +1,234 @@
+#!/usr/bin/env python3
+"""
+Suscriptores de las alertas: varios chats con su propio filtro de símbolos
+
+Cada suscriptor recibe las señales (y los resultados TP/SL) de los símbolos
+que sigue, o de todos si no indica ninguno. Con digest las señales de un
+mismo ciclo se agrupan en un único mensaje por chat. La lista se guarda en
+SUBSCRIBERS_FILE y se relee sola al modificarse, sin reiniciar el bot; sin
+fichero se usa CHAT_ID con todos los símbolos. El ritmo de envío lo pone
+TelegramDispatcher (límites por chat y global).
+
+Uso:
+    python subscribers.py add 123456789 --symbols BTCUSDT ETHUSDT --digest
+    python subscribers.py add -1001234567890
+    python subscribers.py list
+    python subscribers.py remove 123456789
+"""
+
+import argparse
+import json
+import logging
+import os
+import threading
+from concurrent.futures import Future
+
+logger = logging.getLogger(__name__)
+
+# Límite de longitud de un mensaje de Telegram
+MAX_MESSAGE_LENGTH = 4096
+
+
+class Subscriber:
+    """Chat suscrito: símbolos que sigue (None = todos) y si prefiere resúmenes por ciclo"""
+
+    __slots__ = ('chat_id', 'symbols', 'digest')
+
+    def __init__(self, chat_id, symbols=None, digest=False):
+        self.chat_id = str(chat_id)
+        self.symbols = frozenset(symbols) if symbols else None
+        self.digest = digest
+
+    def wants(self, symbol):
+        return self.symbols is None or symbol in self.symbols
+
+    def to_dict(self):
+        record = {'chat_id': self.chat_id, 'digest': self.digest}
+        if self.symbols is not None:
+            record['symbols'] = sorted(self.symbols)
+        return record
+
+
+def load_subscribers(path):
+    """Suscriptores guardados en `path` (lista JSON); [] si no existe"""
+    if not path or not os.path.exists(path):
+        return []
+    with open(path) as handle:
+        records = json.load(handle)
+    return [Subscriber(record['chat_id'], record.get('symbols'), record.get('digest', False))
+            for record in records]
+
+
+def save_subscribers(path, subscribers):
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    temporary = f"{path}.tmp"
+    with open(temporary, "w") as handle:
+        json.dump([subscriber.to_dict() for subscriber in subscribers], handle, indent=2)
+    os.replace(temporary, path)
+
+
+def _combine(futures):
+    """Future que vale True si al menos uno de `futures` se entregó (None si no hay ninguno)"""
+    combined = Future()
+    if not futures:
+        combined.set_result(None)
+        return combined
+    lock = threading.Lock()
+    state = {'remaining': len(futures), 'delivered': False}
+
+    def done(future):
+        with lock:
+            state['delivered'] |= bool(future.result())
+            state['remaining'] -= 1
+            finished = state['remaining'] == 0
+        if finished:
+            combined.set_result(state['delivered'])
+
+    for future in futures:
+        future.add_done_callback(done)
+    return combined
+
+
+class Broadcaster:
+    """Reparte los mensajes de cada símbolo entre los suscriptores que lo siguen
+
+    publish() devuelve un Future que vale True si el mensaje llegó a algún
+    chat, False si no llegó a ninguno y None si ningún suscriptor sigue el
+    símbolo. Los chats con digest acumulan un resumen de una línea por mensaje
+    hasta flush() (al final de cada ciclo) o, como mucho, digest_window
+    segundos.
+    """
+
+    def __init__(self, dispatcher, path=None, default_chat_id=None, digest_window=5.0):
+        self.dispatcher = dispatcher
+        self.path = path
+        self.default_chat_id = default_chat_id
+        self.digest_window = digest_window
+        self._lock = threading.Lock()
+        self._subscribers = []
+        self._mtime = None
+        self._digests = {}          # chat_id -> [(texto, resumen, future)]
+        self._timers = {}
+        self.reload()
+
+    def reload(self):
+        """Relee el fichero de suscriptores si cambió desde la última lectura"""
+        try:
+            mtime = os.path.getmtime(self.path) if self.path and os.path.exists(self.path) else None
+        except OSError:
+            mtime = None
+        if mtime == self._mtime and self._subscribers:
+            return
+        try:
+            subscribers = load_subscribers(self.path) if mtime is not None else []
+        except (ValueError, KeyError) as e:
+            logger.error(f"Fichero de suscriptores {self.path} inválido, se mantiene la lista anterior: {e}")
+            return
+        if not subscribers and self.default_chat_id:
+            subscribers = [Subscriber(self.default_chat_id)]
+        self._subscribers = subscribers
+        self._mtime = mtime
+        if mtime is not None:
+            logger.info(f"📬 {len(subscribers)} suscriptores cargados de {self.path}")
+
+    @property
+    def subscribers(self):
+        return list(self._subscribers)
+
+    def publish(self, symbol, text, summary=None):
+        """Envía `text` a los suscriptores de `symbol`; los de digest reciben `summary` al agrupar"""
+        futures = []
+        for subscriber in self._subscribers:
+            if not subscriber.wants(symbol):
+                continue
+            if subscriber.digest:
+                futures.append(self._add_to_digest(subscriber.chat_id, text, summary or text))
+            else:
+                futures.append(self.dispatcher.send(text, subscriber.chat_id))
+        return _combine(futures)
+
+    def _add_to_digest(self, chat_id, text, summary):
+        future = Future()
+        with self._lock:
+            entries = self._digests.setdefault(chat_id, [])
+            entries.append((text, summary, future))
+            if len(entries) == 1 and self.digest_window:
+                timer = threading.Timer(self.digest_window, self._flush_chat, args=(chat_id,))
+                timer.daemon = True
+                self._timers[chat_id] = timer
+                timer.start()
+        return future
+
+    def flush(self):
+        """Envía ya los resúmenes acumulados de todos los chats"""
+        with self._lock:
+            chats = list(self._digests)
+        for chat_id in chats:
+            self._flush_chat(chat_id)
+
+    def _flush_chat(self, chat_id):
+        with self._lock:
+            entries = self._digests.pop(chat_id, [])
+            timer = self._timers.pop(chat_id, None)
+        if timer is not None:
+            timer.cancel()
+        if not entries:
+            return
+        if len(entries) == 1:
+            # Una sola alerta: mejor el mensaje completo
+            text, _, future = entries[0]
+            self._chain(self.dispatcher.send(text, chat_id), [future])
+            return
+        # Mensajes de hasta MAX_MESSAGE_LENGTH caracteres, una línea por señal
+        header = f"📬 <b>{len(entries)} alertas</b>\n"
+        chunk, chunk_futures = header, []
+        for _, line, future in entries:
+            if chunk_futures and len(chunk) + len(line) + 1 > MAX_MESSAGE_LENGTH:
+                self._chain(self.dispatcher.send(chunk, chat_id), chunk_futures)
+                chunk, chunk_futures = header, []
+            chunk += f"\n{line}"
+            chunk_futures.append(future)
+        self._chain(self.dispatcher.send(chunk, chat_id), chunk_futures)
+
+    @staticmethod
+    def _chain(source, futures):
+        source.add_done_callback(lambda done: [future.set_result(done.result()) for future in futures])
+
+
+def main():
+    # Solo edita el fichero: no hace falta config_secure (ni sus credenciales)
+    from dotenv import load_dotenv
+    load_dotenv()
+
+    parser = argparse.ArgumentParser(description="Gestión de los chats suscritos a las alertas")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    add = subparsers.add_parser("add", help="añadir o actualizar un chat")
+    add.add_argument("chat_id")
+    add.add_argument("--symbols", nargs="+", help="símbolos que sigue (por defecto todos)")
+    add.add_argument("--digest", action="store_true", help="agrupar las señales de cada ciclo")
+    remove = subparsers.add_parser("remove", help="quitar un chat")
+    remove.add_argument("chat_id")
+    subparsers.add_parser("list", help="listar los chats suscritos")
+    parser.add_argument("--file", default=os.getenv('SUBSCRIBERS_FILE', 'data/subscribers.json'))
+    args = parser.parse_args()
+
+    subscribers = load_subscribers(args.file)
+    if args.command == "list":
+        if not subscribers:
+            print("📭 Sin suscriptores: las alertas van a CHAT_ID")
+        for subscriber in subscribers:
+            symbols = ", ".join(sorted(subscriber.symbols)) if subscriber.symbols else "todos"
+            print(f"📬 {subscriber.chat_id:<16} {'resumen' if subscriber.digest else 'inmediato':<9} {symbols}")
+        return
+
+    subscribers = [subscriber for subscriber in subscribers if subscriber.chat_id != args.chat_id]
+    if args.command == "add":
+        subscribers.append(Subscriber(args.chat_id, [s.upper() for s in args.symbols or []], args.digest))
+    save_subscribers(args.file, subscribers)
+    print(f"✅ {len(subscribers)} suscriptores en {args.file}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,41 @@
+"""
+Velas OHLCV sintéticas y deterministas en el formato de la API REST de Binance
+
+Sin dependencias del bot: las usan el benchmark, el replay, el exchange
+simulado y los tests.
+"""
+
+import time
+import zlib
+
+import numpy as np
+
+from kline_cache import INTERVAL_MS
+
+# Velas de historia sintética por símbolo
+HISTORY = 1000
+
+
+def synthetic_klines(symbol, count=HISTORY, interval='5m', end_ms=None, seed=0):
+    """Velas en formato REST de Binance generadas con un paseo aleatorio
+
+    La serie depende solo del símbolo y la semilla; la última vela es la que
+    contiene end_ms (por defecto, ahora), como la vela abierta de la API.
+    """
+    step = INTERVAL_MS[interval]
+    end_ms = int(time.time() * 1000) if end_ms is None else end_ms
+    first_open = (end_ms // step - count + 1) * step
+
+    rng = np.random.default_rng([seed, zlib.crc32(symbol.encode())])
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.004, count)))
+    open_ = np.concatenate(([close[0]], close[:-1]))
+    high = np.maximum(open_, close) * (1 + np.abs(rng.normal(0, 0.002, count)))
+    low = np.minimum(open_, close) * (1 - np.abs(rng.normal(0, 0.002, count)))
+    volume = rng.lognormal(3, 0.6, count)
+
+    return [
+        [first_open + i * step, f"{open_[i]:.8f}", f"{high[i]:.8f}", f"{low[i]:.8f}",
+         f"{close[i]:.8f}", f"{volume[i]:.8f}", first_open + (i + 1) * step - 1,
+         f"{volume[i] * close[i]:.8f}", 100, "0", "0", "0"]
+        for i in range(count)
+    ]
@@ -0,0 +1,215 @@
+"""
+Cola de envío a Telegram con planificación por chat y global
+
+Los mensajes se encolan sin bloquear y varios hilos los entregan sobre una
+sesión HTTP keep-alive. El planificador respeta los límites de Telegram:
+un mensaje por segundo y chat (uno cada 3 s en grupos) y unos 30 por
+segundo en total, y mantiene el orden dentro de cada chat sin que un chat
+con muchos mensajes retrase a los demás. Un 429 aplaza solo ese chat
+durante `retry_after`; los errores de red / 5xx se reintentan con backoff
+exponencial.
+"""
+
+import heapq
+import itertools
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+
+import requests
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+
+class _Chat:
+    __slots__ = ('messages', 'ready_at', 'busy')
+
+    def __init__(self):
+        self.messages = deque()   # [texto, future, intentos, backoff, encolado]
+        self.ready_at = 0.0
+        # En el heap de listos o en envío: nunca dos mensajes del mismo chat a la vez
+        self.busy = False
+
+
+def is_group(chat_id):
+    """Los grupos y canales de Telegram tienen ids negativos"""
+    return str(chat_id).startswith("-")
+
+
+class TelegramDispatcher:
+    """Envía mensajes a Telegram desde una cola planificada en hilos aparte"""
+
+    def __init__(self, token, chat_id, parse_mode="HTML", base_url="https://api.telegram.org",
+                 timeout=10, max_retries=5, backoff=1.0, max_backoff=60.0, max_queue=1000,
+                 metrics=None, session=None, workers=1, global_rate=30.0, chat_interval=1.0,
+                 group_interval=3.0, clock=time.monotonic):
+        self.url = f"{base_url}/bot{token}/sendMessage"
+        self.chat_id = chat_id
+        self.parse_mode = parse_mode
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.max_queue = max_queue
+        self.metrics = metrics
+        self.global_interval = 1.0 / global_rate
+        self.chat_interval = chat_interval
+        self.group_interval = group_interval
+        self.clock = clock
+
+        # Con session (p. ej. http_client.pooled_session()) se comparten sus conexiones
+        self._owns_session = session is None
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max(4, workers))
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+        self.session = session
+
+        self._condition = threading.Condition()
+        self._chats = {}
+        self._ready = []            # (ready_at, orden, chat_id) de los chats con mensajes
+        self._order = itertools.count()
+        self._next_slot = 0.0       # primer instante libre del límite global
+        self._pending = 0
+        self._stopping = False
+        self._threads = [
+            threading.Thread(target=self._run, name=f"telegram-dispatcher-{i}", daemon=True)
+            for i in range(workers)
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def send(self, text, chat_id=None):
+        """Encola un mensaje y devuelve un Future con True/False según la entrega"""
+        future = Future()
+        chat_id = chat_id or self.chat_id
+        with self._condition:
+            if self._pending >= self.max_queue:
+                logger.error("Cola de Telegram llena, mensaje descartado")
+                future.set_result(False)
+                return future
+            chat = self._chats.get(chat_id)
+            if chat is None:
+                chat = self._chats[chat_id] = _Chat()
+            chat.messages.append([text, future, 0, self.backoff, self.clock()])
+            self._pending += 1
+            if not chat.busy:
+                self._schedule(chat_id, chat)
+            self._condition.notify()
+        return future
+
+    def pending(self):
+        """Mensajes aún en cola"""
+        return self._pending
+
+    def stop(self, timeout=30):
+        """Entrega lo pendiente y detiene los hilos"""
+        with self._condition:
+            self._stopping = True
+            self._condition.notify_all()
+        deadline = time.monotonic() + timeout
+        for thread in self._threads:
+            thread.join(max(0.0, deadline - time.monotonic()))
+        if self._owns_session:
+            self.session.close()
+
+    def _schedule(self, chat_id, chat):
+        chat.busy = True
+        heapq.heappush(self._ready, (chat.ready_at, next(self._order), chat_id))
+
+    def _next_message(self):
+        """Espera al siguiente (chat, mensaje) que se puede enviar; None al parar"""
+        with self._condition:
+            while True:
+                if self._stopping and not self._pending:
+                    return None
+                if not self._ready:
+                    self._condition.wait()
+                    continue
+                now = self.clock()
+                start = max(self._ready[0][0], self._next_slot)
+                if start > now:
+                    self._condition.wait(start - now)
+                    continue
+                _, _, chat_id = heapq.heappop(self._ready)
+                chat = self._chats[chat_id]
+                item = chat.messages.popleft()
+                self._pending -= 1
+                self._next_slot = max(now, self._next_slot) + self.global_interval
+                return chat_id, chat, item
+
+    def _run(self):
+        while True:
+            entry = self._next_message()
+            if entry is None:
+                return
+            chat_id, chat, item = entry
+            text, future, attempts, delay, queued_at = item
+            started = time.perf_counter()
+            try:
+                delivered, wait = self._attempt(chat_id, text, delay)
+            except Exception as e:
+                logger.error(f"Error enviando mensaje: {e}")
+                delivered, wait = False, None
+            if self.metrics is not None:
+                self.metrics.observe("telegram_send_seconds", time.perf_counter() - started)
+
+            retry = wait is not None and attempts < self.max_retries
+            with self._condition:
+                now = self.clock()
+                if retry:
+                    # El mensaje vuelve al principio de su chat: se mantiene el orden
+                    item[2] += 1
+                    item[3] = min(delay * 2, self.max_backoff)
+                    chat.messages.appendleft(item)
+                    self._pending += 1
+                    chat.ready_at = now + wait
+                else:
+                    chat.ready_at = now + (self.group_interval if is_group(chat_id) else self.chat_interval)
+                if chat.messages:
+                    self._schedule(chat_id, chat)
+                else:
+                    chat.busy = False
+                self._condition.notify_all()
+            if retry:
+                continue
+
+            if wait is not None:
+                logger.error("Mensaje de Telegram descartado tras agotar los reintentos")
+            if self.metrics is not None:
+                self.metrics.inc("telegram_messages_total", result="sent" if delivered else "failed")
+                self.metrics.observe("telegram_queue_seconds", self.clock() - queued_at)
+            future.set_result(delivered)
+
+    def _attempt(self, chat_id, text, delay):
+        """Un intento de envío; devuelve (entregado, segundos antes de reintentar o None)"""
+        payload = {"chat_id": chat_id, "text": text, "parse_mode": self.parse_mode}
+        try:
+            response = self.session.post(self.url, json=payload, timeout=self.timeout)
+        except requests.RequestException as e:
+            logger.warning(f"Error de red con Telegram: {e}")
+            return False, delay
+        if response.status_code == 200:
+            return True, None
+        if response.status_code == 429:
+            wait = self._retry_after(response, delay)
+            logger.warning(f"Telegram rate limit en el chat {chat_id}: reintentando en {wait}s")
+            return False, wait
+        if response.status_code >= 500:
+            logger.warning(f"Error Telegram API: {response.status_code}, reintentando")
+            return False, delay
+        logger.error(f"Error Telegram API: {response.status_code}")
+        return False, None
+
+    @staticmethod
+    def _retry_after(response, default):
+        """Segundos de espera indicados por Telegram en una respuesta 429"""
+        try:
+            return float(response.json()["parameters"]["retry_after"])
+        except (ValueError, KeyError, TypeError):
+            header = response.headers.get("Retry-After")
+            return float(header) if header and header.isdigit() else default
@@ -0,0 +1,16 @@
+import os
+import sys
+import tempfile
+
+# config_secure exige credenciales; los tests no tocan Binance ni Telegram
+os.environ.setdefault('TELEGRAM_TOKEN', 'test-token')
+os.environ.setdefault('CHAT_ID', '1')
+os.environ.setdefault('BINANCE_API_KEY', 'test-key')
+os.environ.setdefault('BINANCE_API_SECRET', 'test-secret')
+os.environ.setdefault('STATE_DB', '')
+os.environ.setdefault('SNAPSHOT_FILE', '')
+os.environ.setdefault('SUBSCRIBERS_FILE', '')
+os.environ.setdefault('LOG_FILE', os.path.join(tempfile.mkdtemp(prefix='bot-tests-'), 'trading_bot.log'))
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
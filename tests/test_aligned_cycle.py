@@ -0,0 +1,68 @@
+import pytest
+
+import advanced_trading_bot as bot_module
+from synthetic_data import synthetic_klines
+from kline_cache import INTERVAL_MS
+from offline_bot import offline_bot
+from replay import ReplayMarket, ReplaySink, VirtualClock
+from scheduler import CandleScheduler
+from test_scheduler import FakeClock
+
+STEP = INTERVAL_MS["5m"]
+
+
+@pytest.fixture
+def aligned_bot():
+    """Bot a 3 s del cierre de una vela: Binance ya devuelve la vela siguiente, aún abierta"""
+    rows = synthetic_klines("BTCUSDT", 250, "5m", end_ms=1_700_000_000_000)
+    market = ReplayMarket({"BTCUSDT": rows})
+    open_candle = rows[-1][0]
+    now_ms = open_candle + 3_000
+    market.advance(now_ms)
+    with offline_bot(market, ["BTCUSDT"], ReplaySink(market), VirtualClock(now_ms / 1000)) as bot:
+        yield bot, open_candle - STEP
+
+
+@pytest.mark.parametrize("batch", [False, True])
+def test_aligned_cycle_analyses_the_closed_candle(aligned_bot, monkeypatch, batch):
+    bot, closed_open_time = aligned_bot
+    monkeypatch.setattr(bot_module, "BATCH_INDICATORS", batch)
+    analysed = {}
+    if batch:
+        monkeypatch.setattr(bot, "screen_symbols", lambda frames: analysed.update(frames) or {})
+    else:
+        monkeypatch.setattr(bot, "process_symbol", lambda symbol, df, indicators=None: analysed.update({symbol: df}))
+
+    stale = bot.check_signals(["BTCUSDT"], closed_open_time)
+
+    assert stale == []
+    assert int(analysed["BTCUSDT"]["open_time"][-1]) == closed_open_time
+    assert bot.evaluated["BTCUSDT"] == closed_open_time
+
+
+def test_aligned_cycle_retries_symbols_without_the_closed_candle(aligned_bot):
+    bot, closed_open_time = aligned_bot
+
+    assert bot.check_signals(["BTCUSDT"], closed_open_time + STEP) == ["BTCUSDT"]
+    assert "BTCUSDT" not in bot.evaluated
+
+
+def test_aligned_cycle_retries_late_candles_on_the_scheduler_clock():
+    rows = synthetic_klines("BTCUSDT", 250, "5m", end_ms=1_700_000_000_000)
+    market = ReplayMarket({"BTCUSDT": rows})
+    boundary = rows[-1][0] / 1000
+    # Binance publica las velas con 303 s de retraso: al despertar falta la vela cerrada
+    lag = 303
+    clock = FakeClock(boundary - 100)
+    market.advance((clock.now - lag) * 1000)
+
+    def sleep(seconds):
+        clock.sleep(seconds)
+        market.advance((clock.now - lag) * 1000)
+
+    with offline_bot(market, ["BTCUSDT"], ReplaySink(market), clock) as bot:
+        bot.scheduler = CandleScheduler("5m", 300, offset=2.0, clock=clock, sleep=sleep)
+        bot.run_aligned_cycle()
+
+        assert clock.sleeps == [102, bot_module.SCHEDULER_RETRY_DELAY]
+        assert bot.evaluated["BTCUSDT"] == rows[-2][0]
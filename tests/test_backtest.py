@@ -0,0 +1,135 @@
+import numpy as np
+import pytest
+
+import backtest
+from synthetic_data import synthetic_klines
+
+
+def _candles(count=3000, symbol="BTCUSDT"):
+    rows = synthetic_klines(symbol, count, "5m", end_ms=1_700_000_000_000)
+    columns = np.array([row[:6] for row in rows], dtype=float)
+    return {
+        'open_time': columns[:, 0].astype(np.int64),
+        'open': columns[:, 1], 'high': columns[:, 2], 'low': columns[:, 3],
+        'close': columns[:, 4], 'volume': columns[:, 5],
+    }
+
+
+def _bars(*bars):
+    """Velas (high, low, close) a mano; la primera es la de entrada"""
+    high, low, close = (np.array(values, dtype=float) for values in zip(*bars))
+    return {'open_time': np.arange(len(bars), dtype=np.int64) * 300_000,
+            'high': high, 'low': low, 'close': close}
+
+
+def _simulate(candles, stop, tp1, tp2, max_hold=10):
+    returns, outcomes = backtest.simulate_trades(
+        candles, np.array([0]), np.array([stop]), np.array([tp1]), np.array([tp2]), max_hold)
+    return float(returns[0]), str(outcomes[0])
+
+
+def test_trade_reaches_tp1_then_the_second_half_stops_out():
+    candles = _bars((100, 100, 100), (102.5, 99.5, 102), (101, 97, 97.5))
+
+    returns, outcome = _simulate(candles, stop=98, tp1=102, tp2=104)
+
+    assert outcome == 'tp1'
+    assert returns == pytest.approx(0.5 * 0.02 + 0.5 * -0.02)
+
+
+def test_trade_reaching_tp2_closes_both_halves_in_profit():
+    candles = _bars((100, 100, 100), (102.5, 99.5, 102), (104.5, 101, 104))
+
+    returns, outcome = _simulate(candles, stop=98, tp1=102, tp2=104)
+
+    assert outcome == 'tp2'
+    assert returns == pytest.approx(0.5 * 0.02 + 0.5 * 0.04)
+
+
+def test_stop_and_target_in_the_same_candle_counts_as_stop():
+    candles = _bars((100, 100, 100), (103, 97, 100))
+
+    returns, outcome = _simulate(candles, stop=98, tp1=102, tp2=104)
+
+    assert outcome == 'sl'
+    assert returns == pytest.approx(-0.02)
+
+
+def test_unresolved_trade_exits_at_the_close_of_the_horizon():
+    candles = _bars((100, 100, 100), (101, 99, 100.5), (101, 99, 101), (101, 99, 99))
+
+    returns, outcome = _simulate(candles, stop=98, tp1=102, tp2=104, max_hold=2)
+
+    assert outcome == 'timeout'
+    assert returns == pytest.approx(0.01)
+
+
+def test_cooldown_keeps_the_first_signal_of_each_window():
+    open_time = np.arange(20) * 300_000
+    candidates = np.array([0, 1, 2, 5, 6, 12, 13])
+
+    accepted = backtest.apply_cooldown(candidates, open_time, cooldown_ms=5 * 300_000)
+
+    assert accepted.tolist() == [0, 5, 12]
+
+
+def test_max_drawdown_of_the_cumulative_returns():
+    assert backtest.max_drawdown(np.array([0.02, -0.01, -0.03, 0.05, -0.01])) == pytest.approx(0.04)
+    assert backtest.max_drawdown(np.array([])) == 0.0
+
+
+def test_run_backtest_matches_a_candle_by_candle_reference():
+    candles = _candles()
+    params = {**backtest.default_params(), 'MIN_CONDITIONS_FOR_SIGNAL': 5, 'MIN_TIME_BETWEEN_SIGNALS': 3600}
+    max_hold = 48
+
+    report = backtest.run_backtest(candles, params, max_hold_bars=max_hold)
+
+    # Referencia con bucles: entradas con cooldown y cada operación vela a vela
+    indicators = backtest.compute_signal_indicators(candles, params)
+    met = backtest.conditions_met_series(candles, indicators, params)
+    high, low, close = candles['high'], candles['low'], candles['close']
+    returns, last_entry = [], None
+    for index in np.flatnonzero(met >= params['MIN_CONDITIONS_FOR_SIGNAL']):
+        open_time = candles['open_time'][index]
+        if last_entry is not None and open_time < last_entry + params['MIN_TIME_BETWEEN_SIGNALS'] * 1000:
+            continue
+        last_entry = open_time
+        price = close[index]
+        stop = min(price * (1 - params['STOP_LOSS_PERCENTAGE']), indicators['bb_lower'][index] * 0.99)
+        legs = []
+        for target in (price * (1 + params['TAKE_PROFIT_1_PERCENTAGE']),
+                       price * (1 + params['TAKE_PROFIT_2_PERCENTAGE'])):
+            result = close[min(index + max_hold, len(close) - 1)] / price - 1
+            for bar in range(index + 1, min(index + max_hold, len(close) - 1) + 1):
+                if low[bar] <= stop:
+                    result = stop / price - 1
+                    break
+                if high[bar] >= target:
+                    result = target / price - 1
+                    break
+            legs.append(result)
+        returns.append(0.5 * sum(legs))
+
+    assert report['candles'] == len(close)
+    assert report['trades'] == len(returns) > 0
+    assert report['total_return'] == pytest.approx(sum(returns))
+    assert report['win_rate'] == pytest.approx(np.mean(np.array(returns) > 0))
+    assert report['max_drawdown'] == pytest.approx(backtest.max_drawdown(np.array(returns)))
+
+
+def test_load_klines_csv_sorts_deduplicates_and_converts_microseconds(tmp_path):
+    first = tmp_path / "a.csv"
+    second = tmp_path / "b.csv"
+    first.write_text("open_time,open,high,low,close,volume\n"
+                     "1700000300000,2,3,1,2.5,10\n"
+                     "1700000000000,1,2,0.5,1.5,20\n")
+    # Ficheros recientes de Binance: open_time en microsegundos y una vela repetida
+    second.write_text("1700000300000000,2,3,1,2.5,10\n"
+                      "1700000600000000,3,4,2,3.5,30\n")
+
+    candles = backtest.load_klines_csv([str(first), str(second)])
+
+    assert candles['open_time'].tolist() == [1700000000000, 1700000300000, 1700000600000]
+    assert candles['close'].tolist() == [1.5, 2.5, 3.5]
+    assert candles['volume'].tolist() == [20, 10, 30]
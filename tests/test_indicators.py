@@ -0,0 +1,161 @@
+import numpy as np
+import pandas as pd
+import pytest
+from ta.momentum import RSIIndicator, StochasticOscillator
+from ta.trend import ADXIndicator, EMAIndicator, MACD
+from ta.volatility import BollingerBands
+
+import batch_indicators
+from incremental_indicators import OUTPUTS, IndicatorEngine
+from kline_cache import KlineCache
+from synthetic_data import synthetic_klines
+
+PARAMS = dict(rsi_period=14, ema_fast=12, ema_slow=26, ema_signal=9, bb_period=20, bb_std=2,
+              adx_period=14, stoch_k=14, stoch_d=3)
+
+# Valores recientes que lee check_long_signal (iloc[-1] ... iloc[-5])
+RECENT = 5
+
+
+def candles(symbol, count=300):
+    """Velas sintéticas como array estructurado de la caché"""
+    rows = synthetic_klines(symbol, count, "5m", end_ms=1_700_000_000_000)
+    return KlineCache(capacity=count).update(symbol, "5m", rows)
+
+
+def ta_indicators(df):
+    """calculate_indicators original: todos los indicadores con `ta` sobre series de pandas"""
+    high, low = pd.Series(df["high"], dtype=float), pd.Series(df["low"], dtype=float)
+    close, volume = pd.Series(df["close"], dtype=float), pd.Series(df["volume"], dtype=float)
+    macd = MACD(close, window_slow=PARAMS['ema_slow'], window_fast=PARAMS['ema_fast'],
+                window_sign=PARAMS['ema_signal'])
+    bb = BollingerBands(close, window=PARAMS['bb_period'], window_dev=PARAMS['bb_std'])
+    stoch = StochasticOscillator(high, low, close, window=PARAMS['stoch_k'], smooth_window=PARAMS['stoch_d'])
+    indicators = {
+        'rsi': RSIIndicator(close, window=PARAMS['rsi_period']).rsi(),
+        'ema_fast': EMAIndicator(close, window=PARAMS['ema_fast']).ema_indicator(),
+        'ema_slow': EMAIndicator(close, window=PARAMS['ema_slow']).ema_indicator(),
+        'macd': macd.macd(),
+        'macd_signal': macd.macd_signal(),
+        'macd_histogram': macd.macd_diff(),
+        'bb_upper': bb.bollinger_hband(),
+        'bb_middle': bb.bollinger_mavg(),
+        'bb_lower': bb.bollinger_lband(),
+        'adx': ADXIndicator(high, low, close, window=PARAMS['adx_period']).adx(),
+        'stoch_k': stoch.stoch(),
+        'stoch_d': stoch.stoch_signal(),
+        'volume_sma': volume.rolling(window=20).mean(),
+    }
+    indicators['bb_width'] = (indicators['bb_upper'] - indicators['bb_lower']) / indicators['bb_middle']
+    return indicators
+
+
+def baseline_conditions(df, indicators, rsi_oversold=30, adx_threshold=25, volume_multiplier=1.5):
+    """Condiciones de la versión original de check_long_signal, evaluadas todas"""
+    price, volume = float(df["close"][-1]), float(df["volume"][-1])
+    ind = {name: values.iloc for name, values in indicators.items()}
+    trend_score = sum([
+        ind['adx'][-1] > adx_threshold,
+        ind['macd'][-1] > ind['macd_signal'][-1],
+        ind['macd'][-1] > ind['macd'][-2],
+        ind['ema_fast'][-1] > ind['ema_slow'][-1],
+        (ind['ema_fast'][-1] - ind['ema_slow'][-1]) / ind['ema_slow'][-1] > 0.01,
+    ])
+    return {
+        'rsi_oversold': ind['rsi'][-1] < rsi_oversold,
+        'rsi_rising': ind['rsi'][-1] > ind['rsi'][-2],
+        'price_above_bb_lower': price > ind['bb_lower'][-1],
+        'price_near_support': price <= ind['bb_middle'][-1] + (ind['bb_upper'][-1] - ind['bb_middle'][-1]) * 0.3,
+        'stoch_oversold': ind['stoch_k'][-1] < 20 and ind['stoch_d'][-1] < 20,
+        'stoch_bullish_cross': ind['stoch_k'][-1] > ind['stoch_d'][-1] and ind['stoch_k'][-2] <= ind['stoch_d'][-2],
+        'volume_confirmation': volume > ind['volume_sma'][-1] * volume_multiplier,
+        'trend_support': trend_score >= 2,
+        'macd_bullish': ind['macd'][-1] > ind['macd'][-2],
+        'bb_squeeze': ind['bb_width'][-1] < ind['bb_width'][-5],
+    }
+
+
+def recent(values):
+    """Los RECENT últimos valores de un indicador (Series de `ta` o RecentValues)"""
+    return np.array([values.iloc[-k] for k in range(RECENT, 0, -1)], dtype=float)
+
+
+def assert_matches_ta(indicators, df):
+    expected = ta_indicators(df)
+    for name in OUTPUTS:
+        np.testing.assert_allclose(recent(indicators[name]), recent(expected[name]),
+                                   rtol=1e-9, atol=1e-9, err_msg=name)
+
+
+@pytest.mark.parametrize("symbol", ["BTCUSDT", "ETHUSDT", "XRPUSDT"])
+def test_incremental_engine_matches_ta_on_every_new_candle(symbol):
+    df = candles(symbol)
+    engine = IndicatorEngine(**PARAMS)
+
+    # Como el bot: cada ciclo llega la ventana con una vela más (la última, abierta)
+    for end in range(100, len(df) + 1, 7):
+        assert_matches_ta(engine.update(symbol, df[:end]), df[:end])
+
+
+def test_incremental_engine_rebuilds_after_a_gap():
+    df = candles("BTCUSDT")
+    engine = IndicatorEngine(**PARAMS)
+    engine.update("BTCUSDT", df[:150])
+
+    # La ventana ya no contiene la última vela incorporada: se reconstruye desde cero
+    window = df[160:]
+    assert_matches_ta(engine.update("BTCUSDT", window), window)
+
+
+SYMBOLS = ["BTCUSDT", "ETHUSDT", "XRPUSDT", "SOLUSDT", "ADAUSDT", "DOGEUSDT"]
+
+
+def _stack(frames, column):
+    return np.vstack([np.asarray(df[column], dtype=float) for df in frames])
+
+
+def test_batch_indicators_match_ta_for_every_symbol():
+    frames = [candles(symbol, 200) for symbol in SYMBOLS]
+
+    indicators = batch_indicators.compute_indicators(
+        _stack(frames, "high"), _stack(frames, "low"), _stack(frames, "close"), _stack(frames, "volume"),
+        **PARAMS)
+
+    for row, df in enumerate(frames):
+        expected = ta_indicators(df)
+        for name in OUTPUTS:
+            np.testing.assert_allclose(indicators[name][row], recent(expected[name]),
+                                       rtol=1e-9, atol=1e-9, err_msg=f"{SYMBOLS[row]} {name}")
+
+
+def test_batch_full_series_match_ta_after_warmup():
+    frames = [candles(symbol, 200) for symbol in SYMBOLS[:2]]
+
+    indicators = batch_indicators.compute_indicators(
+        _stack(frames, "high"), _stack(frames, "low"), _stack(frames, "close"), _stack(frames, "volume"),
+        tail=None, **PARAMS)
+
+    for row, df in enumerate(frames):
+        expected = ta_indicators(df)
+        for name in OUTPUTS:
+            # Pasado el calentamiento más largo (ADX, 2 * 14 velas) todas las series coinciden
+            np.testing.assert_allclose(indicators[name][row][-150:], expected[name].to_numpy()[-150:],
+                                       rtol=1e-9, atol=1e-9, err_msg=f"{SYMBOLS[row]} {name}")
+
+
+def test_batch_conditions_match_the_original_check_long_signal():
+    checked = 0
+    for end in range(120, 300, 9):
+        frames = [candles(symbol)[:end] for symbol in SYMBOLS]
+        close, volume = _stack(frames, "close"), _stack(frames, "volume")
+        indicators = batch_indicators.compute_indicators(
+            _stack(frames, "high"), _stack(frames, "low"), close, volume, **PARAMS)
+
+        conditions = batch_indicators.evaluate_long_conditions(
+            indicators, close, volume, rsi_oversold=30, adx_threshold=25, volume_multiplier=1.5)
+
+        for row, df in enumerate(frames):
+            expected = baseline_conditions(df, ta_indicators(df))
+            assert dict(zip(batch_indicators.CONDITION_NAMES, conditions[row].tolist())) == expected
+            checked += 1
+    assert checked == 20 * len(SYMBOLS)
@@ -0,0 +1,69 @@
+import glob
+import gzip
+import json
+import logging
+import queue
+
+import pytest
+
+import log_setup
+
+
+@pytest.fixture
+def restore_logging():
+    yield
+    # Se vuelve al logging del bot (fichero temporal del conftest)
+    import advanced_trading_bot
+    advanced_trading_bot.configure_logging()
+
+
+def test_rotated_files_are_gzipped(tmp_path, restore_logging):
+    path = str(tmp_path / "bot.log")
+    log_setup.setup_logging("INFO", path, max_bytes=2000, backup_count=3, console=False)
+    logger = logging.getLogger("test_rotation")
+    for index in range(200):
+        logger.info(f"línea {index:04d} " + "x" * 40)
+    log_setup.stop_logging()
+
+    rotated = sorted(glob.glob(f"{path}.*"))
+    assert rotated == [f"{path}.{n}.gz" for n in range(1, 4)]
+    for name in rotated:
+        with gzip.open(name, 'rt', encoding='utf-8') as handle:
+            lines = handle.read().splitlines()
+        assert lines and all(" - INFO - línea " in line for line in lines)
+    with open(path, encoding='utf-8') as handle:
+        assert handle.read().splitlines()[-1].endswith("línea 0199 " + "x" * 40)
+
+
+def test_json_lines_carry_the_structured_fields(tmp_path, restore_logging):
+    path = str(tmp_path / "bot.jsonl")
+    log_setup.setup_logging("INFO", path, json_lines=True, console=False)
+    logger = logging.getLogger("test_json")
+    logger.info("análisis %s", "BTCUSDT", extra={'symbol': 'BTCUSDT', 'phase': 'analysis', 'duration': 0.25})
+    logger.warning("sin extras")
+    log_setup.stop_logging()
+
+    with open(path, encoding='utf-8') as handle:
+        entries = [json.loads(line) for line in handle]
+
+    assert entries[0]['msg'] == "análisis BTCUSDT"
+    assert entries[0]['logger'] == "test_json"
+    assert (entries[0]['symbol'], entries[0]['phase'], entries[0]['duration']) == ('BTCUSDT', 'analysis', 0.25)
+    assert entries[1]['level'] == 'WARNING'
+    assert not set(log_setup.STRUCTURED_FIELDS) & set(entries[1])
+
+
+def test_full_queue_drops_and_counts_records():
+    handler = log_setup.DroppingQueueHandler(queue.Queue(maxsize=2))
+    logger = logging.getLogger("test_dropping")
+    logger.propagate = False
+    logger.addHandler(handler)
+    try:
+        for index in range(5):
+            logger.warning("registro %d", index)
+    finally:
+        logger.removeHandler(handler)
+        logger.propagate = True
+
+    assert handler.dropped == 3
+    assert [handler.queue.get_nowait().msg for _ in range(2)] == ["registro 0", "registro 1"]
@@ -0,0 +1,40 @@
+from metrics import MetricsRegistry
+from offline_bot import offline_bot
+from replay import ReplayMarket, ReplaySink, VirtualClock
+from synthetic_data import synthetic_klines
+
+
+def test_retain_drops_series_of_inactive_label_values():
+    metrics = MetricsRegistry()
+    for symbol in ("BTCUSDT", "ETHUSDT", "XRPUSDT"):
+        metrics.observe("rest_latency_seconds", 0.1, symbol=symbol)
+        metrics.inc("requests_total", symbol=symbol)
+    metrics.observe("phase_seconds", 0.2, phase="fetch")
+
+    metrics.retain("symbol", {"BTCUSDT"})
+
+    assert metrics.histogram_totals("rest_latency_seconds")[0] == 1
+    assert metrics.value("requests_total", symbol="ETHUSDT") == 0
+    assert metrics.value("requests_total", symbol="BTCUSDT") == 1
+    # Las series sin esa etiqueta no se tocan
+    assert metrics.histogram_totals("phase_seconds", phase="fetch")[0] == 1
+    assert "XRPUSDT" not in metrics.render()
+
+
+def test_symbol_series_follow_the_active_symbols():
+    end_ms = 1_700_000_000_000
+    symbols = [f"S{i:03d}USDT" for i in range(6)]
+    market = ReplayMarket({symbol: synthetic_klines(symbol, 120, "5m", end_ms) for symbol in symbols})
+    market.advance(end_ms)
+    with offline_bot(market, symbols, ReplaySink(market), VirtualClock(end_ms / 1000)) as bot:
+        # Como el escáner: cada ronda analiza un conjunto distinto de símbolos
+        for start in range(0, 6, 2):
+            active = symbols[start:start + 2]
+            bot.active_symbols = lambda active=active: active
+            bot.check_signals()
+            for symbol in active:
+                bot.get_klines(symbol, "5m")
+
+        rendered = bot.metrics.render()
+    labelled = {symbol for symbol in symbols if f'symbol="{symbol}"' in rendered}
+    assert labelled == set(symbols[4:])
@@ -0,0 +1,39 @@
+import itertools
+
+from optimizer import build_combinations, combination_at
+
+SPACE = {'RSI_OVERSOLD': [25, 30, 35], 'BB_STD': [1.5, 2], 'MIN_CONDITIONS_FOR_SIGNAL': [3, 4, 5, 6]}
+
+
+def test_combination_at_follows_the_product_order():
+    options = list(SPACE.values())
+    for index, values in enumerate(itertools.product(*options)):
+        assert combination_at(index, options) == list(values)
+
+
+def test_full_grid_without_samples():
+    combinations = build_combinations(SPACE, {'EMA_FAST': 12})
+
+    assert len(combinations) == 24
+    assert all(params['EMA_FAST'] == 12 for params in combinations)
+    assert build_combinations(SPACE, {}, samples=100) == build_combinations(SPACE, {})
+
+
+def test_random_sample_is_unique_and_reproducible():
+    sample = build_combinations(SPACE, {}, samples=10, seed=7)
+
+    assert len(sample) == 10
+    assert len({tuple(params.values()) for params in sample}) == 10
+    assert sample == build_combinations(SPACE, {}, samples=10, seed=7)
+    grid = build_combinations(SPACE, {})
+    assert all(params in grid for params in sample)
+
+
+def test_random_sample_of_a_huge_grid_does_not_build_it():
+    # 10^12 combinaciones: construir la rejilla no cabría en memoria
+    space = {f'P{i}': list(range(10)) for i in range(12)}
+
+    sample = build_combinations(space, {}, samples=50, seed=1)
+
+    assert len(sample) == 50
+    assert len({tuple(params.values()) for params in sample}) == 50
@@ -0,0 +1,95 @@
+from order_book import LocalOrderBook, OrderBookService, SyntheticDepthFeed, replay_synthetic
+
+
+def _expected_top(feed, levels=10):
+    return sorted(feed.bids.items(), reverse=True)[:levels], sorted(feed.asks.items())[:levels]
+
+
+def _prices(top):
+    bids, asks = top
+    return [price for price, _ in bids], [price for price, _ in asks]
+
+
+def test_snapshot_applies_only_the_buffered_events_after_it():
+    feed = SyntheticDepthFeed("BTCUSDT", seed=1)
+    book = LocalOrderBook("BTCUSDT")
+
+    early = [feed.next_event() for _ in range(3)]
+    snapshot = feed.snapshot()
+    late = [feed.next_event() for _ in range(3)]
+    assert [book.on_event(event) for event in early + late] == ['buffered'] * 6
+
+    assert book.on_snapshot(snapshot)
+    assert book.synced and book.last_update_id == late[-1]['u']
+    assert _prices(book.top()) == _prices(_expected_top(feed))
+    assert book.on_event(late[-1]) == 'stale'
+
+
+def test_gap_unsyncs_the_book_until_a_new_snapshot():
+    feed = SyntheticDepthFeed("BTCUSDT", seed=2)
+    service = OrderBookService(["BTCUSDT"])
+    assert service.handle_event(feed.next_event())
+    assert service.apply_snapshot("BTCUSDT", feed.snapshot())
+    assert not service.handle_event(feed.next_event())
+
+    feed.next_event()  # evento perdido
+    after_gap = feed.next_event()
+    assert service.handle_event(after_gap)
+    assert service.book("BTCUSDT") is None
+    assert service.synced_count() == 0
+
+    # El evento que reveló el hueco se guarda para aplicarlo tras el snapshot
+    snapshot = feed.snapshot()
+    follow = feed.next_event()
+    service.handle_event(follow)
+    assert service.apply_snapshot("BTCUSDT", snapshot)
+    book = service.book("BTCUSDT")
+    assert book.last_update_id == follow['u']
+    assert _prices(book.top()) == _prices(_expected_top(feed))
+
+
+def test_snapshot_older_than_the_buffer_asks_for_another():
+    feed = SyntheticDepthFeed("BTCUSDT", seed=3)
+    book = LocalOrderBook("BTCUSDT")
+    stale_snapshot = feed.snapshot()
+    feed.next_event()
+    buffered = feed.next_event()
+    book.on_event(buffered)
+
+    assert not book.on_snapshot(stale_snapshot)
+    assert not book.synced
+
+    # Los eventos acumulados se conservan para el siguiente snapshot
+    assert book.on_snapshot(feed.snapshot())
+    assert book.last_update_id == buffered['u']
+
+
+def test_book_keeps_only_the_levels_closest_to_the_price():
+    feed = SyntheticDepthFeed("BTCUSDT", seed=4, levels=60)
+    book = LocalOrderBook("BTCUSDT", max_levels=15)
+    book.on_event(feed.next_event())
+    assert book.on_snapshot(feed.snapshot())
+    for _ in range(500):
+        assert book.on_event(feed.next_event()) == 'applied'
+
+    assert len(book.bids) <= 15 and len(book.asks) <= 15
+    assert _prices(book.top()) == _prices(_expected_top(feed))
+    assert book.best_bid() < book.best_ask()
+    assert book.spread() > 0
+    assert -1 <= book.imbalance() <= 1
+
+
+def test_events_for_unknown_symbols_are_ignored():
+    service = OrderBookService(["BTCUSDT"])
+    event = SyntheticDepthFeed("ETHUSDT").next_event()
+
+    assert not service.handle_event(event)
+    assert service.book("ETHUSDT") is None
+
+
+def test_synthetic_replay_with_gaps_resyncs_every_book():
+    result = replay_synthetic(symbols=5, events=5000, gap_every=400, max_levels=30)
+
+    assert result['resyncs'] > 0
+    assert result['synced'] == 5
+    assert result['mismatched'] == []
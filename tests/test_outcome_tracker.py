@@ -0,0 +1,116 @@
+import random
+from collections import Counter
+
+from outcome_tracker import OutcomeTracker
+
+
+def _levels(stop_loss, take_profit_1, take_profit_2):
+    return {'stop_loss': stop_loss, 'take_profit_1': take_profit_1, 'take_profit_2': take_profit_2}
+
+
+def test_tp1_keeps_the_signal_open_until_tp2():
+    tracker = OutcomeTracker()
+    tracker.open("BTCUSDT", 1000, 100.0, _levels(98, 102, 104))
+
+    assert [o.event for o in tracker.update("BTCUSDT", 99, 102.5, at=1)] == ['tp1']
+    assert tracker.open_count("BTCUSDT") == 1
+
+    outcomes = tracker.update("BTCUSDT", 101, 104, at=2)
+    assert [(o.event, o.level, o.at) for o in outcomes] == [('tp2', 104, 2)]
+    assert outcomes[0].change == 0.04
+    assert tracker.open_count() == 0
+    assert tracker.symbols() == []
+
+
+def test_stop_wins_when_a_range_touches_both_levels():
+    tracker = OutcomeTracker()
+    tracker.open("BTCUSDT", 1000, 100.0, _levels(98, 102, 104))
+
+    outcomes = tracker.update("BTCUSDT", 97, 105)
+
+    assert [o.event for o in outcomes] == ['sl']
+    # Los objetivos de la señal cerrada ya no se disparan
+    assert tracker.update("BTCUSDT", 100, 110) == []
+
+
+def test_only_the_levels_crossed_are_triggered():
+    tracker = OutcomeTracker()
+    for index in range(10):
+        tracker.open("BTCUSDT", index, 100.0, _levels(90 + index, 110 + index, 120 + index))
+    tracker.open("ETHUSDT", 0, 100.0, _levels(99, 101, 102))
+
+    outcomes = tracker.update("BTCUSDT", 95.5, 112.5)
+
+    assert sorted((o.sent_at, o.event) for o in outcomes) == sorted(
+        [(index, 'sl') for index in range(6, 10)] + [(index, 'tp1') for index in range(3)])
+    assert tracker.open_count("BTCUSDT") == 6
+    assert tracker.open_count("ETHUSDT") == 1
+
+
+def test_restored_signal_with_tp1_hit_only_waits_for_tp2_or_stop():
+    tracker = OutcomeTracker()
+    tracker.open("BTCUSDT", 1000, 100.0, _levels(98, 102, 104), tp1_hit=True)
+
+    assert tracker.update("BTCUSDT", 99, 103) == []
+    assert [o.event for o in tracker.update("BTCUSDT", 97.5)] == ['sl']
+
+
+def test_signals_expire_after_max_age():
+    tracker = OutcomeTracker(max_age=3600)
+    tracker.open("BTCUSDT", 1000, 100.0, _levels(98, 102, 104))
+    tracker.open("ETHUSDT", 2000, 100.0, _levels(98, 102, 104))
+
+    assert tracker.expire(4599) == []
+    outcomes = tracker.expire(4600)
+
+    assert [(o.symbol, o.event, o.at) for o in outcomes] == [("BTCUSDT", 'expired', 4600)]
+    assert tracker.symbols() == ["ETHUSDT"]
+
+
+def test_heaps_stay_bounded_when_signals_close_on_the_other_side():
+    tracker = OutcomeTracker()
+    tracker.open("BTCUSDT", 0, 100.0, _levels(50, 1000, 2000))
+    for index in range(1000):
+        tracker.open("BTCUSDT", index, 100.0, _levels(99, 101 + index, 102 + index))
+        tracker.update("BTCUSDT", 98.5, 100.5)
+
+    book = tracker._books["BTCUSDT"]
+    assert tracker.open_count() == 1
+    assert len(book.stops) + len(book.targets) <= 6 * book.live + 64 + 3
+
+
+def _reference(signals, low, high):
+    """Misma regla sin heaps: stop primero y después TP1/TP2 de las señales vivas"""
+    events = []
+    for signal in list(signals):
+        if signal['stop_loss'] >= low:
+            events.append((signal['id'], 'sl'))
+            signals.remove(signal)
+            continue
+        if not signal['tp1_hit'] and signal['take_profit_1'] <= high:
+            signal['tp1_hit'] = True
+            events.append((signal['id'], 'tp1'))
+        if signal['take_profit_2'] <= high:
+            events.append((signal['id'], 'tp2'))
+            signals.remove(signal)
+    return events
+
+
+def test_random_price_path_matches_a_linear_scan():
+    rng = random.Random(3)
+    tracker = OutcomeTracker()
+    signals = []
+    price = 100.0
+    for step in range(2000):
+        if rng.random() < 0.3:
+            levels = _levels(price * (1 - rng.uniform(0.005, 0.03)), price * (1 + rng.uniform(0.005, 0.02)),
+                             price * (1 + rng.uniform(0.02, 0.05)))
+            tracker.open("BTCUSDT", step, price, levels)
+            signals.append({'id': step, 'tp1_hit': False, **levels})
+        price *= 1 + rng.gauss(0, 0.004)
+        low, high = price * (1 - rng.uniform(0, 0.003)), price * (1 + rng.uniform(0, 0.003))
+
+        outcomes = tracker.update("BTCUSDT", low, high)
+
+        assert Counter((o.sent_at, o.event) for o in outcomes) == Counter(_reference(signals, low, high))
+    assert tracker.open_count() == len(signals)
@@ -0,0 +1,74 @@
+import time
+
+from synthetic_data import synthetic_klines
+from candle_archive import CandleArchive
+from replay import rows_from_archive, run_replay
+
+
+def _archive(root, symbols, count, interval="5m"):
+    archive = CandleArchive(str(root))
+    end_ms = int(time.time() * 1000)
+    for symbol in symbols:
+        archive.append(symbol, interval, synthetic_klines(symbol, count, interval, end_ms), now_ms=end_ms)
+    return archive
+
+
+def test_rows_from_archive_matches_rest_format(tmp_path):
+    archive = _archive(tmp_path, ["BTCUSDT"], 50)
+    rows = rows_from_archive(archive, "BTCUSDT", "5m")
+    # La última vela sintética sigue abierta y el archivo no la guarda
+    assert len(rows) == 49
+    assert rows == archive.tail_klines("BTCUSDT", "5m", 49)
+    assert [int(row[0]) for row in rows] == sorted(int(row[0]) for row in rows)
+
+    start = rows[10][0]
+    end = rows[20][0]
+    assert rows_from_archive(archive, "BTCUSDT", "5m", start, end) == rows[10:20]
+    assert rows_from_archive(archive, "ETHUSDT", "5m") == []
+
+
+def test_replay_from_archive(tmp_path):
+    archive = _archive(tmp_path, ["BTCUSDT", "ETHUSDT"], 140)
+    series = {symbol: rows_from_archive(archive, symbol, "5m") for symbol in ["BTCUSDT", "ETHUSDT"]}
+
+    report = run_replay(series, "5m", warmup=100)
+
+    assert report['symbols'] == 2
+    assert report['steps'] == 39
+    # El primer paso carga también las velas de calentamiento
+    assert report['candles'] == 2 * 139
+    assert len(report['cycle_times']) == 39
+
+
+def test_replay_without_enough_history_returns_empty_report(tmp_path):
+    archive = _archive(tmp_path, ["BTCUSDT"], 20)
+    series = {"BTCUSDT": rows_from_archive(archive, "BTCUSDT", "5m")}
+
+    report = run_replay(series, "5m", warmup=100)
+
+    assert report['steps'] == 0
+    assert report['symbols'] == 0
+    assert run_replay({}, "5m")['steps'] == 0
+
+
+def test_symbol_mode_matches_cycle_mode():
+    end_ms = 1_700_000_000_000
+    series = {symbol: synthetic_klines(symbol, 400, "5m", end_ms) for symbol in ["BTCUSDT", "ETHUSDT"]}
+
+    cycle = run_replay(series, "5m", mode="cycle", warmup=200)
+    by_symbol = run_replay(series, "5m", mode="symbol", warmup=200)
+
+    assert by_symbol['steps'] == cycle['steps'] == 200
+    assert by_symbol['signals'] == cycle['signals'] > 0
+    # Los TP/SL se siguen también cuando cada símbolo se analiza por separado
+    assert sum(by_symbol['outcomes'].values()) > 0
+    assert by_symbol['outcomes'] == cycle['outcomes']
+
+
+def test_offline_bot_never_waits_for_api_weight():
+    from offline_bot import offline_bot
+    from replay import ReplayMarket, VirtualClock
+
+    market = ReplayMarket({"BTCUSDT": []})
+    with offline_bot(market, ["BTCUSDT"], clock=VirtualClock(1_700_000_000)) as bot:
+        assert bot.governor.reserve(10 ** 6) == 0.0
@@ -0,0 +1,77 @@
+from scheduler import CandleScheduler
+
+
+class FakeClock:
+    """Reloj y sleep simulados: dormir solo avanza el reloj"""
+
+    def __init__(self, now):
+        self.now = now
+        self.sleeps = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+BOUNDARY = 1_700_000_100.0   # Múltiplo de 300 s: cierre de una vela de 5m
+
+
+def _scheduler(clock, check_interval=300, **kwargs):
+    return CandleScheduler("5m", check_interval, offset=2.0, clock=clock, sleep=clock.sleep, **kwargs)
+
+
+def test_wait_wakes_offset_seconds_after_the_next_candle_close():
+    clock = FakeClock(BOUNDARY + 100)
+    scheduler = _scheduler(clock)
+
+    boundary = scheduler.wait()
+
+    assert boundary == BOUNDARY + 300
+    assert clock.now == boundary + 2
+    assert clock.sleeps == [202]
+    assert scheduler.closed_open_time(boundary) == int((boundary - 300) * 1000)
+
+    # Un ciclo de 30 s no desplaza el siguiente despertar
+    clock.now += 30
+    assert scheduler.wait() == boundary + 300
+    assert clock.now == boundary + 302
+    assert scheduler.missed == 0
+
+
+def test_wait_right_after_the_close_does_not_skip_the_candle():
+    clock = FakeClock(BOUNDARY + 1)
+    scheduler = _scheduler(clock)
+
+    assert scheduler.wait() == BOUNDARY
+    assert clock.now == BOUNDARY + 2
+
+
+def test_long_cycle_counts_missed_closes():
+    clock = FakeClock(BOUNDARY + 100)
+    scheduler = _scheduler(clock)
+    boundary = scheduler.wait()
+
+    clock.now += 3 * 300
+    assert scheduler.wait() == boundary + 4 * 300
+    assert scheduler.missed == 3
+
+
+def test_check_interval_rounds_to_whole_candles():
+    clock = FakeClock(BOUNDARY + 100)
+    scheduler = _scheduler(clock, check_interval=700)
+
+    assert scheduler.period == 600
+    assert scheduler.wait() % 600 == 0
+
+
+def test_slots_spread_batches_over_the_stagger_window():
+    scheduler = _scheduler(FakeClock(BOUNDARY), stagger=10, batches=4)
+    symbols = [f"S{i}USDT" for i in range(6)]
+
+    slots = scheduler.slots(symbols, BOUNDARY)
+
+    assert [moment for moment, _ in slots] == [BOUNDARY + 2, BOUNDARY + 4.5, BOUNDARY + 7, BOUNDARY + 9.5]
+    assert sorted(sum((batch for _, batch in slots), [])) == sorted(symbols)
@@ -0,0 +1,59 @@
+import pytest
+
+import advanced_trading_bot as bot_module
+from offline_bot import offline_bot
+from replay import ReplayMarket
+from test_indicators import SYMBOLS, baseline_conditions, candles, ta_indicators
+
+
+@pytest.fixture
+def bot():
+    with offline_bot(ReplayMarket({}), SYMBOLS) as bot:
+        yield bot
+
+
+def _windows():
+    for symbol in SYMBOLS:
+        df = candles(symbol)
+        for end in range(120, len(df) + 1, 10):
+            yield symbol, df[:end]
+
+
+def _baseline_signal(df, min_conditions):
+    conditions = baseline_conditions(df, ta_indicators(df))
+    return conditions, sum(conditions.values()) >= min_conditions
+
+
+def test_lazy_conditions_give_the_same_signals_as_the_full_evaluation(bot):
+    signals = 0
+    for symbol, df in _windows():
+        expected, expected_signal = _baseline_signal(df, bot_module.MIN_CONDITIONS_FOR_SIGNAL)
+
+        result = bot.check_long_signal(symbol, df, bot.calculate_indicators(df, lazy=True))
+
+        assert result['signal'] == expected_signal
+        if result['signal']:
+            signals += 1
+            # Con señal se evalúan todas para el mensaje, con el mismo resultado
+            assert result['conditions'] == expected
+            assert result['conditions_met'] == sum(expected.values())
+            assert result['total_conditions'] == len(expected)
+    assert signals > 0
+
+
+def test_high_min_conditions_exits_early_without_the_expensive_indicators(bot, monkeypatch):
+    monkeypatch.setattr(bot_module, "MIN_CONDITIONS_FOR_SIGNAL", 9)
+    monkeypatch.setattr(bot_module, "STRONG_SIGNAL_CONDITIONS", 10)
+    skipped_adx = 0
+    for symbol, df in _windows():
+        expected, expected_signal = _baseline_signal(df, 9)
+        indicators = bot.calculate_indicators(df, lazy=True)
+
+        result = bot.check_long_signal(symbol, df, indicators)
+
+        assert result['signal'] == expected_signal
+        # Las condiciones evaluadas antes de abandonar coinciden con las de la evaluación completa
+        assert all(expected[name] == value for name, value in result['conditions'].items())
+        if not result['signal'] and 'adx' not in indicators.computed():
+            skipped_adx += 1
+    assert skipped_adx > 0
@@ -0,0 +1,28 @@
+from state_store import StateStore
+
+
+def test_stats_are_kept_per_worker(tmp_path):
+    store = StateStore(str(tmp_path / "state.db"), flush_interval=0.01)
+    store.save_stats({'signals_sent': 3, 'errors': 1, 'start_time': 'x'})
+    store.save_stats({'signals_sent': 5, 'errors': 0}, 'worker-a')
+    store.save_stats({'signals_sent': 7, 'errors': 2}, 'worker-b')
+    store.flush()
+
+    assert store.load_stats() == {'signals_sent': 3, 'errors': 1}
+    assert store.load_stats('worker-a') == {'signals_sent': 5, 'errors': 0}
+    assert store.load_stats('worker-b') == {'signals_sent': 7, 'errors': 2}
+    assert store.load_stats('worker-c') == {}
+    store.close()
+
+
+def test_close_writes_pending_entries(tmp_path):
+    path = str(tmp_path / "state.db")
+    store = StateStore(path, flush_interval=60)
+    store.record_cooldown("BTCUSDT", 1000.0)
+    store.set_alerted("ETHUSDT", True)
+    store.close()
+
+    reopened = StateStore(path)
+    assert reopened.load_cooldowns() == {"BTCUSDT": 1000.0}
+    assert reopened.load_alerted() == {"ETHUSDT"}
+    reopened.close()
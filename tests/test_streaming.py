@@ -0,0 +1,164 @@
+import asyncio
+import threading
+import time
+
+import numpy as np
+
+from synthetic_data import synthetic_klines
+from kline_cache import INTERVAL_MS
+from mock_stream import MockKlineStream
+from offline_bot import offline_bot
+from replay import ReplayMarket, ReplaySink, VirtualClock
+from streaming import KlineStream
+
+STEP = INTERVAL_MS["5m"]
+
+
+async def _until(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timeout"
+        await asyncio.sleep(0.01)
+
+
+async def _finish(stream, server, task):
+    stream.stop()
+    await server.stop()
+    await asyncio.wait_for(task, 5)
+
+
+def test_stream_dispatches_closed_candles_and_reconnects():
+    rows = synthetic_klines("BTCUSDT", 3, "5m", end_ms=1_700_000_000_000)
+    closed, connects = [], []
+    lock = threading.Lock()
+
+    def on_closed(symbol, row):
+        with lock:
+            closed.append((symbol, int(row[0])))
+
+    async def scenario():
+        server = MockKlineStream("5m")
+        url = await server.start()
+        stream = KlineStream(["BTCUSDT", "ETHUSDT"], "5m", on_closed, connects.append,
+                             base_url=url, reconnect_delay=0.05)
+        task = asyncio.create_task(stream.run())
+        await server.wait_connected()
+
+        # La vela en curso no se despacha; la cerrada sí, con la fila en formato REST
+        await server.publish("BTCUSDT", rows[0], closed=False)
+        await server.publish("BTCUSDT", rows[0], closed=True)
+        await _until(lambda: len(closed) == 1)
+
+        await server.drop_connections()
+        await server.wait_connected(total=2)
+        await server.publish("BTCUSDT", rows[1], closed=True)
+        await _until(lambda: len(closed) == 2)
+        await _finish(stream, server, task)
+
+    asyncio.run(scenario())
+    assert closed == [("BTCUSDT", rows[0][0]), ("BTCUSDT", rows[1][0])]
+    assert connects == [["BTCUSDT", "ETHUSDT"], ["BTCUSDT", "ETHUSDT"]]
+
+
+def test_reconnect_backfills_candles_missed_during_disconnect(monkeypatch):
+    rows = synthetic_klines("BTCUSDT", 260, "5m", end_ms=1_700_000_000_000)
+    market = ReplayMarket({"BTCUSDT": rows})
+    clock = VirtualClock()
+    with offline_bot(market, ["BTCUSDT"], ReplaySink(market), clock) as bot:
+        analysed = []
+        monkeypatch.setattr(bot, "process_symbol",
+                            lambda symbol, df, indicators=None: analysed.append(int(df["open_time"][-1])))
+
+        def close(index):
+            # El mercado (REST) y el reloj del bot llegan al cierre de la vela `index`
+            now_ms = rows[index][6] + 1
+            clock.now = now_ms / 1000
+            market.advance(now_ms)
+
+        async def scenario():
+            server = MockKlineStream("5m")
+            url = await server.start()
+            stream = KlineStream(["BTCUSDT"], "5m", bot.on_closed_kline, bot.backfill_klines,
+                                 base_url=url, reconnect_delay=0.05)
+            close(200)
+            task = asyncio.create_task(stream.run())
+            await server.wait_connected()
+            await _until(lambda: len(analysed) == 1)
+
+            close(201)
+            await server.publish("BTCUSDT", rows[201])
+            await _until(lambda: len(analysed) == 2)
+
+            # Corte: las velas 202-204 se cierran sin stream y llegan por REST al reconectar;
+            # se analiza solo la última (204), las anteriores ya llegarían tarde
+            close(204)
+            await server.drop_connections()
+            await server.wait_connected(total=2)
+            await _until(lambda: len(analysed) == 3)
+            close(205)
+            await server.publish("BTCUSDT", rows[205])
+            await _until(lambda: len(analysed) == 4)
+            await _finish(stream, server, task)
+
+        asyncio.run(scenario())
+        # Al arrancar también se analiza la última vela cerrada descargada (200)
+        assert analysed == [rows[200][0], rows[201][0], rows[204][0], rows[205][0]]
+        open_times = bot.kline_cache.get("BTCUSDT", "5m")["open_time"]
+        assert open_times[-1] == rows[205][0]
+        assert set(np.diff(open_times)) == {STEP}
+
+
+def test_set_symbols_resubscribes_the_stream():
+    rows = synthetic_klines("ETHUSDT", 3, "5m", end_ms=1_700_000_000_000)
+    closed, connects = [], []
+
+    async def scenario():
+        server = MockKlineStream("5m")
+        url = await server.start()
+        stream = KlineStream(["BTCUSDT"], "5m", lambda symbol, row: closed.append(symbol),
+                             connects.append, base_url=url, reconnect_delay=0.05)
+        task = asyncio.create_task(stream.run())
+        await server.wait_connected()
+
+        # ETHUSDT aún no está suscrito: su vela no llega
+        await server.publish("ETHUSDT", rows[0])
+        stream.set_symbols(["BTCUSDT", "ETHUSDT"])
+        await server.wait_connected(total=2)
+        await _until(lambda: len(connects) == 2)
+        await server.publish("ETHUSDT", rows[1])
+        await _until(lambda: closed == ["ETHUSDT"])
+        await _finish(stream, server, task)
+
+    asyncio.run(scenario())
+    assert connects == [["BTCUSDT"], ["BTCUSDT", "ETHUSDT"]]
+
+
+def test_bot_follows_universe_changes_in_streaming_mode():
+    end_ms = 1_700_000_000_000
+    symbols = ["BTCUSDT", "ETHUSDT"]
+    market = ReplayMarket({symbol: synthetic_klines(symbol, 260, "5m", end_ms) for symbol in symbols})
+    market.advance(end_ms)
+    active = [["BTCUSDT"]]
+
+    with offline_bot(market, symbols, ReplaySink(market), VirtualClock(end_ms / 1000)) as bot:
+        bot.active_symbols = lambda: active[0]
+
+        async def scenario():
+            server = MockKlineStream("5m")
+            url = await server.start()
+            stream = KlineStream(["BTCUSDT"], "5m", bot.on_closed_kline, bot.backfill_klines,
+                                 base_url=url, reconnect_delay=0.05)
+            task = asyncio.create_task(stream.run())
+            follower = asyncio.create_task(bot.follow_universe(stream, 0.02))
+            await server.wait_connected()
+
+            active[0] = ["ETHUSDT"]
+            await server.wait_connected(total=2)
+            await _until(lambda: bot.kline_cache.get("ETHUSDT", "5m") is not None)
+            follower.cancel()
+            await _finish(stream, server, task)
+            return stream.symbols
+
+        assert asyncio.run(scenario()) == ["ETHUSDT"]
+        # La vela cerrada descargada al conectar se analiza
+        assert "ETHUSDT" in bot.evaluated
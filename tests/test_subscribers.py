@@ -0,0 +1,113 @@
+from concurrent.futures import Future
+from datetime import datetime
+
+from subscribers import Broadcaster, Subscriber, save_subscribers
+
+
+class FakeDispatcher:
+    def __init__(self, delivered=True):
+        self.delivered = delivered
+        self.sent = []
+
+    def send(self, text, chat_id=None):
+        self.sent.append((chat_id, text))
+        future = Future()
+        future.set_result(self.delivered)
+        return future
+
+
+def _broadcaster(tmp_path, dispatcher, subscribers):
+    path = str(tmp_path / "subscribers.json")
+    save_subscribers(path, subscribers)
+    return Broadcaster(dispatcher, path, default_chat_id="1", digest_window=0)
+
+
+def test_publish_reports_delivery_per_symbol(tmp_path):
+    dispatcher = FakeDispatcher()
+    broadcaster = _broadcaster(tmp_path, dispatcher, [Subscriber("10", ["BTCUSDT"]), Subscriber("20", ["BTCUSDT"])])
+
+    assert broadcaster.publish("BTCUSDT", "señal").result() is True
+    assert sorted(chat for chat, _ in dispatcher.sent) == ["10", "20"]
+    # Nadie sigue ETHUSDT: no es un fallo de entrega
+    assert broadcaster.publish("ETHUSDT", "señal").result() is None
+    assert len(dispatcher.sent) == 2
+
+
+def test_publish_reports_failed_delivery(tmp_path):
+    broadcaster = _broadcaster(tmp_path, FakeDispatcher(delivered=False), [Subscriber("10")])
+
+    assert broadcaster.publish("BTCUSDT", "señal").result() is False
+
+
+def test_signal_without_subscribers_keeps_cooldown(tmp_path):
+    from offline_bot import offline_bot
+    from replay import ReplayMarket, ReplaySink, VirtualClock
+    from state_store import StateStore
+
+    market = ReplayMarket({"BTCUSDT": []})
+    with offline_bot(market, ["BTCUSDT"], ReplaySink(market), VirtualClock(1_700_000_000)) as bot:
+        bot.state = StateStore(str(tmp_path / "state.db"), flush_interval=0.01)
+        sent_at = datetime.fromtimestamp(1_700_000_000)
+        bot.last_signals["BTCUSDT"] = sent_at
+        bot.alerted_symbols.add("BTCUSDT")
+
+        bot._on_signal_delivered("BTCUSDT", {'strength': 'MODERADA', 'current_price': 100.0}, {}, sent_at, None)
+        bot.state.flush()
+
+    assert bot.last_signals["BTCUSDT"] == sent_at
+    assert "BTCUSDT" in bot.alerted_symbols
+    assert bot.state.signals() == []
+    assert bot.session_stats['signals_sent'] == 0
+    bot.state.close()
+
+
+class PendingDispatcher(FakeDispatcher):
+    """Deja los envíos pendientes para resolverlos desde otro hilo, como el de Telegram"""
+
+    def __init__(self):
+        super().__init__()
+        self.futures = []
+
+    def send(self, text, chat_id=None):
+        self.sent.append((chat_id, text))
+        future = Future()
+        self.futures.append(future)
+        return future
+
+    def pending(self):
+        return sum(not future.done() for future in self.futures)
+
+    def stop(self, timeout=None):
+        pass
+
+
+def test_delivery_results_are_applied_on_the_main_thread():
+    import threading
+
+    from offline_bot import offline_bot
+    from replay import ReplayMarket, VirtualClock
+    from synthetic_data import synthetic_klines
+
+    rows = synthetic_klines("BTCUSDT", 400, "5m", end_ms=1_700_000_000_000)
+    market = ReplayMarket({"BTCUSDT": rows})
+    clock = VirtualClock()
+    dispatcher = PendingDispatcher()
+    with offline_bot(market, ["BTCUSDT"], dispatcher, clock) as bot:
+        for row in rows[200:]:
+            clock.now = (row[6] + 1) / 1000
+            market.advance(row[6] + 1)
+            bot.check_signals()
+            if dispatcher.futures:
+                break
+        assert dispatcher.futures
+
+        resolver = threading.Thread(target=lambda: [future.set_result(True) for future in dispatcher.futures])
+        resolver.start()
+        resolver.join()
+        # El hilo de Telegram solo encola el resultado
+        assert bot.session_stats['signals_sent'] == 0
+        assert bot.outcomes.open_count() == 0
+
+        bot.process_deliveries()
+        assert bot.session_stats['signals_sent'] == len(dispatcher.futures)
+        assert bot.outcomes.open_count() == 1
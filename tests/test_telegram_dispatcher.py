@@ -0,0 +1,94 @@
+import pytest
+
+from mock_telegram import MockTelegram, start_mock_telegram
+from telegram_dispatcher import TelegramDispatcher
+
+
+@pytest.fixture
+def telegram():
+    fake = MockTelegram()
+    server, base_url = start_mock_telegram(fake)
+    fake.base_url = base_url
+    yield fake
+    server.shutdown()
+
+
+def _dispatcher(telegram, **kwargs):
+    options = dict(workers=4, global_rate=1000, chat_interval=0, group_interval=0, backoff=0.1)
+    options.update(kwargs)
+    return TelegramDispatcher("token", "1", base_url=telegram.base_url, **options)
+
+
+def _attempt_times(telegram, chat_id):
+    return [at for at, chat, _ in telegram.attempts if chat == chat_id]
+
+
+def test_rate_limit_waits_retry_after_without_delaying_other_chats(telegram):
+    telegram.script("10", (429, 1))
+    dispatcher = _dispatcher(telegram)
+
+    first = dispatcher.send("a1", "10")
+    second = dispatcher.send("a2", "10")
+    other = dispatcher.send("b1", "20")
+    assert other.result(timeout=5) is True
+    assert first.result(timeout=5) is True and second.result(timeout=5) is True
+    dispatcher.stop()
+
+    attempts = _attempt_times(telegram, "10")
+    assert attempts[1] - attempts[0] >= 1.0
+    # El otro chat no espera al retry_after
+    assert _attempt_times(telegram, "20")[0] - attempts[0] < 0.5
+    assert telegram.messages("10") == ["a1", "a2"]
+
+
+def test_server_errors_back_off_exponentially(telegram):
+    telegram.script("10", 500, 502)
+    dispatcher = _dispatcher(telegram)
+
+    assert dispatcher.send("hola", "10").result(timeout=5) is True
+    dispatcher.stop()
+
+    first, second, third = _attempt_times(telegram, "10")
+    assert second - first >= 0.1
+    assert third - second >= 0.2
+    assert [status for _, _, status in telegram.attempts] == [500, 502, 200]
+
+
+def test_retries_are_bounded(telegram):
+    telegram.script("10", 500, 500, 500)
+    dispatcher = _dispatcher(telegram, max_retries=2, backoff=0.01)
+
+    assert dispatcher.send("hola", "10").result(timeout=5) is False
+    dispatcher.stop()
+    assert len(telegram.attempts) == 3
+    assert telegram.messages() == []
+
+
+def test_per_chat_order_is_kept_across_retries(telegram):
+    telegram.script("10", 500, (429, 1), 503)
+    dispatcher = _dispatcher(telegram)
+
+    futures = [dispatcher.send(f"m{i}", "10") for i in range(6)]
+    futures += [dispatcher.send(f"g{i}", "-100") for i in range(3)]
+    assert all(future.result(timeout=10) for future in futures)
+    dispatcher.stop()
+
+    assert telegram.messages("10") == [f"m{i}" for i in range(6)]
+    assert telegram.messages("-100") == [f"g{i}" for i in range(3)]
+
+
+def test_global_and_chat_rate_limits(telegram):
+    dispatcher = _dispatcher(telegram, global_rate=20, chat_interval=0.2)
+
+    futures = [dispatcher.send(f"{chat}-{i}", str(chat)) for i in range(2) for chat in range(10, 20)]
+    assert all(future.result(timeout=10) for future in futures)
+    dispatcher.stop()
+
+    times = sorted(at for at, _, _ in telegram.received)
+    gaps = [b - a for a, b in zip(times, times[1:])]
+    # 20 mensajes a 20/s: ~0.95 s, sin ráfagas por encima del límite global
+    assert times[-1] - times[0] >= 0.9
+    assert min(gaps) >= 0.03
+    for chat in range(10, 20):
+        first, second = [at for at, sent_to, _ in telegram.received if sent_to == str(chat)]
+        assert second - first >= 0.2
@@ -0,0 +1,71 @@
+import pytest
+
+from http_client import USED_WEIGHT_HEADER, WeightGovernor, kline_weight, pooled_session
+from mock_exchange import MockExchange, start_mock_exchange
+from test_scheduler import FakeClock
+
+LIMIT = 500
+
+
+@pytest.fixture
+def exchange():
+    # Reloj compartido por el exchange y el governor: las pausas no esperan de verdad
+    clock = FakeClock(1_000_020.0)
+    exchange = MockExchange(weight_limit=100, window=60.0, retry_after=5, clock=clock)
+    server, exchange.base_url = start_mock_exchange(exchange)
+    exchange.session = pooled_session()
+    yield exchange
+    server.shutdown()
+
+
+def _get_klines(exchange, symbol="BTCUSDT", limit=LIMIT):
+    response = exchange.session.get(f"{exchange.base_url}/api/v3/klines",
+                                    params={"symbol": symbol, "interval": "5m", "limit": limit})
+    return response.status_code, response.headers
+
+
+def test_used_weight_header_shrinks_the_bucket(exchange):
+    governor = WeightGovernor(100, window=60.0, headroom=0.8, clock=exchange.clock)
+    exchange.charge(50)  # otra herramienta con la misma IP
+
+    status, headers = _get_klines(exchange)
+    governor.observe(status, headers)
+
+    assert status == 200 and headers[USED_WEIGHT_HEADER] == str(50 + kline_weight(LIMIT))
+    assert governor.available() == pytest.approx(80 - 55)
+    assert governor.reserve(kline_weight(LIMIT)) == 0.0
+    assert governor.reserve(30) == pytest.approx(10 / governor.rate)
+
+
+def test_429_and_418_pause_every_request(exchange):
+    governor = WeightGovernor(100, window=60.0, headroom=0.8, clock=exchange.clock)
+    exchange.charge(98)
+
+    status, headers = _get_klines(exchange)
+    governor.observe(status, headers)
+    assert status == 429 and headers["Retry-After"] == "5"
+    assert governor.blocked_until == exchange.clock() + 5
+    assert governor.reserve(1) >= 5
+
+    # Insistir durante la pausa es un 418; sin Retry-After se aplica la espera por defecto
+    exchange.clock.sleep(1)
+    status, headers = _get_klines(exchange)
+    assert status == 418
+    governor.observe(status, {})
+    assert governor.blocked_until == exchange.clock() + 120
+
+
+def test_reserve_spaces_requests_below_the_limit(exchange):
+    governor = WeightGovernor(100, window=60.0, headroom=0.8, clock=exchange.clock)
+    # El margen (20 de 100) cubre lo que el bucket se adelanta a la ventana
+    # fija del exchange mientras las peticiones pesan poco frente al límite
+    limit = 99
+
+    for index in range(200):
+        exchange.clock.sleep(governor.reserve(kline_weight(limit)))
+        status, headers = _get_klines(exchange, f"SYM{index:03d}USDT", limit)
+        governor.observe(status, headers)
+
+    assert exchange.status_counts == {200: 200}
+    # 200 de peso con 80 por minuto: el governor tuvo que esperar más de un minuto
+    assert sum(exchange.clock.sleeps) > 60
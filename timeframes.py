@@ -0,0 +1,168 @@
+"""
+Análisis multi-timeframe a partir de un único intervalo base
+
+Las velas cerradas del intervalo base (p. ej. 5m) se agregan en memoria en
+velas de intervalos mayores (15m, 1h, 4h...) alineadas en UTC, igual que
+las de Binance. Los indicadores de cada intervalo mayor se actualizan solo
+cuando su vela se cierra, sin ninguna petición adicional a la API.
+"""
+
+import logging
+import time
+
+import numpy as np
+
+from incremental_indicators import RecentValues, SymbolIndicators
+from kline_cache import INTERVAL_MS
+
+logger = logging.getLogger(__name__)
+
+# Intervalo máximo agregable: por encima Binance no alinea las velas en múltiplos de época
+MAX_AGGREGATED_MS = INTERVAL_MS["1d"]
+
+
+def is_bullish(indicators):
+    """Tendencia alcista en un intervalo: EMA rápida sobre la lenta y MACD sobre su señal"""
+    return bool(
+        indicators['ema_fast'].iloc[-1] > indicators['ema_slow'].iloc[-1]
+        and indicators['macd'].iloc[-1] > indicators['macd_signal'].iloc[-1]
+    )
+
+
+class TimeframeAggregator:
+    """Construye las velas de un intervalo mayor y alimenta sus indicadores"""
+
+    def __init__(self, interval, indicator_params):
+        self.step = INTERVAL_MS[interval]
+        self.indicators = SymbolIndicators(**indicator_params)
+        self.closed = 0
+        self.bucket = None
+        self.high = self.low = self.close = self.volume = None
+
+    def add(self, open_time, high, low, close, volume, close_time):
+        """Incorpora una vela base cerrada; devuelve True si se cierra una vela mayor"""
+        bucket = open_time - open_time % self.step
+        closed = False
+        if self.bucket is not None and bucket != self.bucket:
+            # Faltaban velas base al final del bucket anterior
+            self._close_bucket()
+            closed = True
+
+        if self.bucket is None:
+            self.bucket = bucket
+            self.high, self.low, self.close, self.volume = high, low, close, volume
+        else:
+            self.high = max(self.high, high)
+            self.low = min(self.low, low)
+            self.close = close
+            self.volume += volume
+
+        if close_time + 1 >= bucket + self.step:
+            self._close_bucket()
+            closed = True
+        return closed
+
+    def _close_bucket(self):
+        self.indicators.commit(self.high, self.low, self.close, self.volume)
+        self.closed += 1
+        self.bucket = None
+
+
+class MultiTimeframe:
+    """Agregadores de intervalos mayores por símbolo a partir de las velas base"""
+
+    def __init__(self, base_interval, intervals, **indicator_params):
+        base_step = INTERVAL_MS[base_interval]
+        self.base_interval = base_interval
+        self.intervals = []
+        for interval in intervals:
+            step = INTERVAL_MS.get(interval)
+            if step is None or step <= base_step or step % base_step or step > MAX_AGGREGATED_MS:
+                logger.warning(f"⚠️  Intervalo {interval} no agregable desde {base_interval}, se ignora")
+                continue
+            self.intervals.append(interval)
+
+        self.indicator_params = indicator_params
+        # Velas mayores necesarias para que MACD, ADX y Bollinger estén definidos
+        self.min_candles = max(
+            indicator_params['ema_slow'] + indicator_params['ema_signal'],
+            2 * indicator_params['adx_period'],
+            indicator_params['bb_period'],
+        )
+        self._aggregators = {}
+        self._last_open_time = {}
+        # Indicadores y tendencia de cada símbolo; solo cambian al cerrar una vela mayor
+        self._snapshots = {}
+        self._bullish = {}
+
+    def warmup_start(self, now_ms=None):
+        """open_time (ms) desde el que hacen falta velas base para tener todos los intervalos listos"""
+        if not self.intervals:
+            return None
+        now_ms = now_ms if now_ms is not None else int(time.time() * 1000)
+        longest = max(INTERVAL_MS[interval] for interval in self.intervals)
+        return now_ms - (self.min_candles + 1) * longest
+
+    def update(self, symbol, candles, now_ms=None):
+        """Agrega las velas base cerradas aún no procesadas
+
+        candles es cualquier estructura con columnas open_time, high, low,
+        close, volume y close_time (array estructurado de la caché o columnas
+        del archivo local), ordenada por open_time.
+        """
+        if not self.intervals or candles is None or len(candles) == 0:
+            return
+        now_ms = now_ms if now_ms is not None else int(time.time() * 1000)
+
+        open_times = np.asarray(candles["open_time"])
+        close_times = np.asarray(candles["close_time"])
+        last = self._last_open_time.get(symbol)
+        start = 0 if last is None else int(open_times.searchsorted(last, side="right"))
+        end = int(close_times.searchsorted(now_ms, side="left"))
+        if start >= end:
+            return
+
+        aggregators = self._aggregators.get(symbol)
+        if aggregators is None:
+            aggregators = self._aggregators[symbol] = [
+                TimeframeAggregator(interval, self.indicator_params) for interval in self.intervals
+            ]
+
+        rows = zip(
+            open_times[start:end].tolist(),
+            np.asarray(candles["high"][start:end], dtype=float).tolist(),
+            np.asarray(candles["low"][start:end], dtype=float).tolist(),
+            np.asarray(candles["close"][start:end], dtype=float).tolist(),
+            np.asarray(candles["volume"][start:end], dtype=float).tolist(),
+            close_times[start:end].tolist(),
+        )
+        closed = False
+        for row in rows:
+            for aggregator in aggregators:
+                closed |= aggregator.add(*row)
+        self._last_open_time[symbol] = int(open_times[end - 1])
+        if closed:
+            self._refresh(symbol, aggregators)
+
+    def _refresh(self, symbol, aggregators):
+        snapshot = {}
+        for interval, aggregator in zip(self.intervals, aggregators):
+            if aggregator.closed >= self.min_candles:
+                snapshot[interval] = {
+                    name: RecentValues(list(values))
+                    for name, values in aggregator.indicators.history.items()
+                }
+        self._snapshots[symbol] = snapshot
+        self._bullish[symbol] = sum(is_bullish(values) for values in snapshot.values())
+
+    def indicators(self, symbol):
+        """{intervalo: indicadores (con .iloc[-k])} de los intervalos con historia suficiente"""
+        return self._snapshots.get(symbol, {})
+
+    def bullish_count(self, symbol):
+        """Intervalos mayores listos con tendencia alcista"""
+        return self._bullish.get(symbol, 0)
+
+    def reset(self, symbol):
+        for state in (self._aggregators, self._last_open_time, self._snapshots, self._bullish):
+            state.pop(symbol, None)
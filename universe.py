@@ -0,0 +1,111 @@
+"""
+Escáner del universo de pares: una sola petición al ticker 24h de todos los
+símbolos y filtro barato por volumen, variación de precio y spread antes del
+análisis completo de velas e indicadores.
+"""
+
+import logging
+import time
+
+import requests
+
+from http_client import pooled_session
+
+logger = logging.getLogger(__name__)
+
+TICKER_ENDPOINT = "/api/v3/ticker/24hr"
+
+# Peso del ticker 24h sin parámetro symbol (todos los pares)
+TICKER_WEIGHT = 80
+
+# Tokens apalancados y similares que no se quieren analizar
+EXCLUDED_SUFFIXES = ("UPUSDT", "DOWNUSDT", "BULLUSDT", "BEARUSDT")
+
+
+def fetch_tickers(base_url="https://api.binance.com", timeout=10, session=None, governor=None):
+    """Ticker 24h de todos los símbolos (una petición)"""
+    session = session or requests
+    response = session.get(f"{base_url}{TICKER_ENDPOINT}", timeout=timeout)
+    if governor is not None:
+        governor.observe(response.status_code, response.headers)
+    response.raise_for_status()
+    return response.json()
+
+
+def select_candidates(tickers, quote_asset="USDT", top_n=40, min_quote_volume=0.0,
+                      max_spread=None, min_price_change=None, max_price_change=None,
+                      exclude=()):
+    """Filtra y ordena los tickers; devuelve los top_n símbolos por volumen en quote
+
+    max_spread es relativo al precio (0.002 = 0.2%) y los límites de
+    variación están en porcentaje, como priceChangePercent de Binance.
+    """
+    candidates = []
+    for ticker in tickers:
+        symbol = ticker.get("symbol", "")
+        if not symbol.endswith(quote_asset) or symbol in exclude or symbol.endswith(EXCLUDED_SUFFIXES):
+            continue
+        try:
+            quote_volume = float(ticker["quoteVolume"])
+            change = float(ticker["priceChangePercent"])
+            bid = float(ticker["bidPrice"])
+            ask = float(ticker["askPrice"])
+        except (KeyError, TypeError, ValueError):
+            continue
+
+        # Sin libro (par suspendido o delistado)
+        if bid <= 0 or ask <= 0 or int(ticker.get("count", 1)) == 0:
+            continue
+        if quote_volume < min_quote_volume:
+            continue
+        if max_spread is not None and (ask - bid) / ask > max_spread:
+            continue
+        if min_price_change is not None and change < min_price_change:
+            continue
+        if max_price_change is not None and change > max_price_change:
+            continue
+        candidates.append((quote_volume, symbol))
+
+    candidates.sort(reverse=True)
+    return [symbol for _, symbol in candidates[:top_n]]
+
+
+class UniverseScanner:
+    """Mantiene la lista de candidatos y la renueva cada refresh_interval segundos"""
+
+    def __init__(self, base_url="https://api.binance.com", timeout=10, refresh_interval=900,
+                 fallback=(), governor=None, **filters):
+        self.base_url = base_url
+        self.timeout = timeout
+        self.refresh_interval = refresh_interval
+        self.filters = filters
+        self.governor = governor
+        self.session = pooled_session()
+        self._symbols = list(fallback)
+        self._refreshed_at = None
+
+    def symbols(self, now=None):
+        """Candidatos actuales; si la lista está caducada se vuelve a pedir el ticker"""
+        now = now if now is not None else time.monotonic()
+        if self._refreshed_at is None or now - self._refreshed_at >= self.refresh_interval:
+            self.refresh(now)
+        return self._symbols
+
+    def refresh(self, now=None):
+        """Renueva los candidatos; si falla la petición se mantiene la lista anterior"""
+        self._refreshed_at = now if now is not None else time.monotonic()
+        try:
+            if self.governor is not None:
+                self.governor.acquire(TICKER_WEIGHT)
+            tickers = fetch_tickers(self.base_url, self.timeout, self.session, self.governor)
+        except Exception as e:
+            logger.error(f"Error obteniendo el ticker 24h: {e}")
+            return self._symbols
+
+        symbols = select_candidates(tickers, **self.filters)
+        if symbols:
+            logger.info(f"🔭 Universo: {len(symbols)} candidatos de {len(tickers)} pares")
+            self._symbols = symbols
+        else:
+            logger.warning("⚠️  Ningún par supera los filtros del escáner, se mantiene la lista anterior")
+        return self._symbols